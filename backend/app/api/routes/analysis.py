@@ -2,25 +2,101 @@
 Rotas de análise de texto
 """
 
+import asyncio
+import orjson
+from contextlib import nullcontext
 from fastapi import APIRouter, HTTPException, Request
-from typing import Dict
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.requests import HTTPConnection
+from pydantic import ValidationError
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-from app.core.models import AnalysisRequest, AnalysisResponse
-from app.core.exceptions import TextTooLongException, InvalidTextException, NLPModelException
+from app.core.models import (
+    AnalysisRequest,
+    AnalysisResponse,
+    BatchAnalysisItem,
+    BatchAnalysisRequest,
+    BatchAnalysisResult,
+)
+from app.core.payloads import UNCERTAINTY_WARNING, build_payload, error_payload
+from app.core.exceptions import (
+    VeritasException,
+    TextTooLongException,
+    InvalidTextException,
+    NLPModelException,
+)
+from app.core import metrics
 from app.core.config import settings
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Limite de uma linha NDJSON: cada caractere pode virar um escape \uXXXX (6 bytes)
+NDJSON_BYTES_PER_CHAR = 6
+NDJSON_LINE_OVERHEAD_BYTES = 4096
+
+
+def _get_nlp_service(app_request: Request):
+    """Obtém o serviço NLP do estado da aplicação"""
+    nlp_service = getattr(app_request.app.state, "nlp_service", None)
+    
+    if not nlp_service:
+        raise HTTPException(
+            status_code=503,
+            detail="Serviço de análise não está disponível. Tente novamente em alguns instantes."
+        )
+    
+    return nlp_service
+
+
+def _identify_client(admission, connection: HTTPConnection):
+    """Cliente da requisição ou do WebSocket (chave de API ou IP)"""
+    return admission.identify(
+        connection.headers.get(settings.API_KEY_HEADER),
+        connection.client.host if connection.client else None
+    )
+
+
+def _admission(app_request: HTTPConnection, scope: str, max_wait: float = 0.0) -> Callable[[], AsyncContextManager]:
+    """
+    Admissão de análises do cliente da requisição (limite de taxa e fila justa)
+    
+    Retorna uma fábrica de context managers, um por análise; sem controle de
+    admissão configurado, as análises passam direto. Serve também ao
+    WebSocket de análise incremental.
+    """
+    admission = getattr(app_request.app.state, "admission", None)
+    if admission is None:
+        return nullcontext
+    
+    client = _identify_client(admission, app_request)
+    return lambda: admission.admit(client, scope, max_wait)
+
+
+def _build_response(analysis_result: Dict) -> AnalysisResponse:
+    """Constrói a resposta da API a partir do resultado do serviço NLP"""
+    return AnalysisResponse(
+        reliability_score=analysis_result["reliability_score"],
+        reliability_level=analysis_result["reliability_level"],
+        explanation=analysis_result["explanation"],
+        suspicious_phrases=analysis_result["suspicious_phrases"],
+        confidence=analysis_result["confidence"],
+        uncertainty_warning=UNCERTAINTY_WARNING,
+        metadata=analysis_result.get("metadata", {})
+    )
+
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_text(
     request: AnalysisRequest,
     app_request: Request
-) -> AnalysisResponse:
+) -> ORJSONResponse:
     """
     Analisa um texto e retorna métricas de confiabilidade
     
     - **text**: Texto a ser analisado (mínimo 10 caracteres)
+    - **explain**: Atribuições por trecho do modelo de sentimento (opcional, mais lento)
     
     Retorna:
     - Score de confiabilidade (0-100)
@@ -39,43 +115,291 @@ async def analyze_text(
     if not request.text or not request.text.strip():
         raise InvalidTextException()
     
-    # Obter serviço NLP do estado da aplicação
-    nlp_service = app_request.app.state.nlp_service
+    nlp_service = _get_nlp_service(app_request)
+    admit = _admission(app_request, "analyze")
     
-    if not nlp_service:
-        raise HTTPException(
-            status_code=503,
-            detail="Serviço de análise não está disponível. Tente novamente em alguns instantes."
+    try:
+        # Realizar análise (429 imediato se o cliente estiver acima do limite)
+        async with admit():
+            analysis_result = await nlp_service.analyze_text(request.text, explain=request.explain)
+        
+        # `response_model` só documenta o schema: uma Response é enviada sem revalidação
+        with metrics.stage("serialization"):
+            payload = build_payload(analysis_result)
+        return ORJSONResponse(payload)
+    
+    except Exception as e:
+        if isinstance(e, VeritasException):
+            raise
+        
+        raise NLPModelException({"error": str(e)})
+
+
+def _validate_batch_text(text) -> str:
+    """Valida o texto de um item do lote (mesmas regras de /analyze)"""
+    if not isinstance(text, str) or len(text.strip()) < 10:
+        raise InvalidTextException()
+    
+    text = text.strip()
+    if len(text) > settings.MAX_TEXT_LENGTH:
+        raise TextTooLongException(
+            max_length=settings.MAX_TEXT_LENGTH,
+            actual_length=len(text)
         )
     
+    return text
+
+
+def _max_ndjson_line_bytes() -> int:
+    """Tamanho máximo de uma linha NDJSON: texto no limite, todo escapado, mais id e chaves"""
+    return settings.MAX_TEXT_LENGTH * NDJSON_BYTES_PER_CHAR + NDJSON_LINE_OVERHEAD_BYTES
+
+
+async def _iter_ndjson_items(app_request: Request) -> AsyncIterator[Tuple[Optional[str], object]]:
+    """
+    Lê itens NDJSON do corpo da requisição de forma incremental
+    
+    Só o trecho recebido é procurado por quebras de linha, e a linha
+    pendente nunca passa de `_max_ndjson_line_bytes()`: uma linha maior vira
+    um item de erro e o restante dela é descartado até a próxima quebra.
+    """
+    max_line = _max_ndjson_line_bytes()
+    pending = bytearray()
+    discarding = False
+    index = 0
+    
+    async for chunk in app_request.stream():
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            end = len(chunk) if newline < 0 else newline
+            if not discarding:
+                pending += chunk[start:end]
+                if len(pending) > max_line:
+                    yield str(index), VeritasException(
+                        "Linha NDJSON muito longa",
+                        status_code=413,
+                        details={"line": index, "max_bytes": max_line}
+                    )
+                    index += 1
+                    pending.clear()
+                    discarding = True
+            if newline < 0:
+                break
+            
+            if not discarding and pending.strip():
+                yield _parse_ndjson_line(bytes(pending), index)
+                index += 1
+            pending.clear()
+            discarding = False
+            start = newline + 1
+    
+    if not discarding and pending.strip():
+        yield _parse_ndjson_line(bytes(pending), index)
+
+
+def _parse_ndjson_line(line: bytes, index: int) -> Tuple[Optional[str], object]:
+    """Converte uma linha NDJSON em (id, texto ou erro)"""
     try:
-        # Realizar análise
-        analysis_result = await nlp_service.analyze_text(request.text)
-        
-        # Gerar aviso de incerteza
-        uncertainty_warning = (
-            "⚠️ Esta análise é uma estimativa baseada em padrões linguísticos e técnicas de "
-            "processamento de linguagem natural. Não é uma afirmação absoluta sobre a veracidade "
-            "do conteúdo. Sempre verifique informações importantes através de fontes confiáveis "
-            "e múltiplas referências. O modelo pode ter limitações e não substitui o pensamento crítico."
+        item = BatchAnalysisItem.model_validate_json(line)
+        return item.id, item.text
+    except ValidationError as e:
+        return str(index), VeritasException(
+            "Linha NDJSON inválida",
+            status_code=400,
+            # Sem `input`: é a própria linha (bytes, no caso de JSON inválido)
+            details={"line": index, "errors": e.errors(include_url=False, include_context=False, include_input=False)}
         )
-        
-        # Construir resposta
-        response = AnalysisResponse(
-            reliability_score=analysis_result["reliability_score"],
-            reliability_level=analysis_result["reliability_level"],
-            explanation=analysis_result["explanation"],
-            suspicious_phrases=analysis_result["suspicious_phrases"],
-            confidence=analysis_result["confidence"],
-            uncertainty_warning=uncertainty_warning,
-            metadata=analysis_result.get("metadata", {})
+
+
+async def _load_json_items(app_request: Request) -> List[Tuple[Optional[str], object]]:
+    """Lê e valida itens de um corpo JSON (lista ou objeto com `items`)"""
+    try:
+        payload = await app_request.json()
+        if isinstance(payload, list):
+            payload = {"items": payload}
+        batch = BatchAnalysisRequest.model_validate(payload)
+    except (ValueError, ValidationError) as e:
+        raise VeritasException(
+            "Corpo da requisição em lote inválido",
+            status_code=400,
+            details={"error": str(e)}
         )
+    
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise VeritasException(
+            f"Lote muito grande. Máximo: {settings.BATCH_MAX_ITEMS} itens. "
+            f"Use {NDJSON_MEDIA_TYPE} para lotes maiores.",
+            status_code=413,
+            details={"max_items": settings.BATCH_MAX_ITEMS, "actual_items": len(batch.items)}
+        )
+    
+    return [(item.id, item.text) for item in batch.items]
+
+
+async def _iter_items(items: List[Tuple[Optional[str], object]]) -> AsyncIterator[Tuple[Optional[str], object]]:
+    """Adapta uma lista de itens para a interface assíncrona do streaming"""
+    for item in items:
+        yield item
+
+
+def _batch_features(nlp_service, items: List[Tuple[Optional[str], object]]) -> List[Optional[Dict]]:
+    """Características dos itens válidos, extraídas em uma passada (None nos demais)"""
+    texts = {}
+    for index, (_, text) in enumerate(items):
+        try:
+            texts[index] = _validate_batch_text(text)
+        except VeritasException:
+            pass
+    features = dict(zip(texts, nlp_service.linguistic_features_batch(list(texts.values()))))
+    return [features.get(index) for index in range(len(items))]
+
+
+async def _analyze_batch_item(
+    nlp_service,
+    item_id: Optional[str],
+    text,
+    admit: Callable[[], AsyncContextManager] = nullcontext,
+    linguistic_features: Optional[Dict] = None
+) -> bytes:
+    """Analisa um item do lote sem propagar erros para os demais (linha NDJSON de BatchAnalysisResult)"""
+    try:
+        if isinstance(text, VeritasException):
+            raise text
         
-        return response
-        
+        text = _validate_batch_text(text)
+        async with admit():
+            analysis_result = await nlp_service.analyze_text(text, linguistic_features=linguistic_features)
+        with metrics.stage("serialization"):
+            line = {"id": item_id, "result": build_payload(analysis_result), "error": None}
+    except VeritasException as e:
+        line = {"id": item_id, "result": None, "error": error_payload(e)}
     except Exception as e:
-        if isinstance(e, (TextTooLongException, InvalidTextException)):
-            raise
+        line = {"id": item_id, "result": None, "error": error_payload(NLPModelException({"error": str(e)}))}
+    
+    return orjson.dumps(line, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que não escuta desconexões em paralelo
+    
+    O StreamingResponse padrão consome `receive()` enquanto transmite, o que
+    descartaria o corpo NDJSON ainda não lido. Aqui a desconexão é detectada
+    pelo próprio gerador, depois que o corpo foi totalmente consumido.
+    """
+    
+    media_type = NDJSON_MEDIA_TYPE
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
         
-        raise NLPModelException({"error": str(e)})
+        if self.background is not None:
+            await self.background()
+
+
+async def _stream_batch_results(
+    nlp_service,
+    items: AsyncIterator,
+    app_request: Request
+) -> AsyncIterator[bytes]:
+    """
+    Processa os itens com uma janela limitada de tarefas concorrentes
+    
+    As tarefas em andamento alimentam a fila de micro-batching do serviço,
+    de modo que as chamadas de sentimento são agrupadas em lotes. As
+    características linguísticas dos itens que entram na janela são
+    extraídas juntas, em uma passada vetorizada. Os resultados são emitidos
+    na ordem em que ficam prontos.
+    
+    Cada item conta no limite de taxa do cliente. Sem tokens, o item aguarda
+    a reposição por até RATE_LIMIT_BATCH_MAX_WAIT_SECONDS e, depois disso,
+    vira uma linha de erro 429, sem interromper o restante do lote.
+    """
+    admit = _admission(app_request, "batch_item", settings.RATE_LIMIT_BATCH_MAX_WAIT_SECONDS)
+    pending = set()
+    iterator = items.__aiter__()
+    exhausted = False
+    
+    try:
+        while True:
+            # Completar a janela antes de aguardar resultados
+            arrived = []
+            while not exhausted and len(pending) + len(arrived) < settings.BATCH_MAX_CONCURRENCY:
+                try:
+                    arrived.append(await iterator.__anext__())
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+            for (item_id, text), features in zip(arrived, _batch_features(nlp_service, arrived)):
+                pending.add(asyncio.ensure_future(_analyze_batch_item(nlp_service, item_id, text, admit, features)))
+            
+            if not pending:
+                break
+            
+            # Corpo já consumido: é seguro verificar se o cliente desconectou
+            if exhausted and await app_request.is_disconnected():
+                break
+            
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Cliente desconectou ou ocorreu erro: não deixar tarefas órfãs
+        for task in pending:
+            task.cancel()
+
 
+@router.post(
+    "/analyze/batch",
+    response_class=NDJSONStreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "model": BatchAnalysisResult}},
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": BatchAnalysisRequest.model_json_schema()},
+                NDJSON_MEDIA_TYPE: {"schema": BatchAnalysisItem.model_json_schema()},
+            },
+            "required": True,
+        }
+    },
+)
+async def analyze_batch(app_request: Request) -> NDJSONStreamingResponse:
+    """
+    Analisa vários textos e retorna os resultados em streaming (NDJSON)
+    
+    Aceita um corpo JSON (`{"items": [{"id": ..., "text": ...}]}` ou uma lista
+    de itens) ou um corpo `application/x-ndjson` com um item por linha, que é
+    lido de forma incremental e não tem limite de itens.
+    
+    Cada linha da resposta contém o `id` do item e `result` (um
+    AnalysisResponse) ou `error`. Erros de validação, como textos acima de
+    MAX_TEXT_LENGTH, afetam apenas o próprio item.
+    """
+    nlp_service = _get_nlp_service(app_request)
+    
+    content_type = app_request.headers.get("content-type", "")
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        items = _iter_ndjson_items(app_request)
+    else:
+        # Corpo JSON é validado antes de iniciar a resposta
+        items = _iter_items(await _load_json_items(app_request))
+    
+    return NDJSONStreamingResponse(_stream_batch_results(nlp_service, items, app_request))
+
+
+@router.get("/stats")
+async def get_stats(app_request: Request) -> Dict:
+    """
+    Métricas operacionais do serviço de análise
+    
+    Inclui profundidade da fila de inferência e distribuição dos tamanhos de lote.
+    """
+    nlp_service = _get_nlp_service(app_request)
+    
+    stats = nlp_service.get_stats()
+    job_scheduler = getattr(app_request.app.state, "job_scheduler", None)
+    stats["jobs"] = job_scheduler.get_stats() if job_scheduler else None
+    admission = getattr(app_request.app.state, "admission", None)
+    stats["admission"] = admission.get_stats() if admission else None
+    return stats
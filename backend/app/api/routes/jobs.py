@@ -0,0 +1,192 @@
+"""
+Rotas de jobs assíncronos de análise
+"""
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict
+
+from app.api.routes.analysis import NDJSON_MEDIA_TYPE, _build_response, _identify_client
+from app.core.models import (
+    JobBatchSubmitRequest,
+    JobBatchSubmitResponse,
+    JobStatusResponse,
+    JobSubmitRequest,
+    JobSubmitResponse,
+)
+from app.core.exceptions import (
+    VeritasException,
+    TextTooLongException,
+    InvalidTextException,
+    JobNotFoundException,
+)
+from app.core.config import settings
+from app.services.jobs import TERMINAL_STATUSES
+
+router = APIRouter()
+
+# Intervalo máximo entre linhas do streaming de estado (mantém a conexão viva)
+EVENTS_HEARTBEAT_SECONDS = 15.0
+
+
+def _get_job_scheduler(app_request: Request):
+    """Obtém o agendador de jobs do estado da aplicação"""
+    scheduler = getattr(app_request.app.state, "job_scheduler", None)
+    
+    if not scheduler:
+        raise HTTPException(
+            status_code=503,
+            detail="Jobs assíncronos não estão disponíveis."
+        )
+    
+    return scheduler
+
+
+def _validate_job_text(text: str) -> str:
+    """Valida o texto de um job (limite maior que o de /analyze)"""
+    text = text.strip() if isinstance(text, str) else ""
+    if len(text) < 10:
+        raise InvalidTextException()
+    
+    if len(text) > settings.JOBS_MAX_TEXT_LENGTH:
+        raise TextTooLongException(
+            max_length=settings.JOBS_MAX_TEXT_LENGTH,
+            actual_length=len(text)
+        )
+    
+    return text
+
+
+def _build_status(job: Dict) -> JobStatusResponse:
+    """Constrói a resposta de estado a partir do registro do job"""
+    return JobStatusResponse(
+        **{key: value for key, value in job.items() if key != "result"},
+        result=_build_response(job["result"]) if job["result"] else None
+    )
+
+
+async def _charge_submission(app_request: Request, count: int):
+    """
+    Cobra cada documento enviado no limite de taxa do cliente
+    
+    Um job equivale a uma análise; sem tokens, a submissão inteira recebe
+    429 com Retry-After e nenhum job é criado. Lotes maiores que
+    RATE_LIMIT_BURST passam com o balde cheio e deixam o cliente em débito.
+    """
+    admission = getattr(app_request.app.state, "admission", None)
+    if admission is not None:
+        await admission.charge(_identify_client(admission, app_request), "jobs", cost=count)
+
+
+async def _get_job(scheduler, job_id: str) -> Dict:
+    job = await scheduler.get(job_id)
+    if job is None:
+        raise JobNotFoundException(job_id)
+    return job
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_job(request: JobSubmitRequest, app_request: Request) -> JobSubmitResponse:
+    """
+    Envia um documento para análise assíncrona
+    
+    Retorna imediatamente o `job_id`; o resultado é obtido em
+    `GET /jobs/{job_id}` ou acompanhado em `GET /jobs/{job_id}/events`.
+    Aceita textos de até JOBS_MAX_TEXT_LENGTH caracteres e conta uma
+    análise no limite de taxa do cliente.
+    """
+    scheduler = _get_job_scheduler(app_request)
+    text = _validate_job_text(request.text)
+    await _charge_submission(app_request, 1)
+    
+    jobs = await scheduler.submit([(request.id, text)], request.priority)
+    return JobSubmitResponse(**jobs[0])
+
+
+@router.post("/jobs/batch", response_model=JobBatchSubmitResponse, status_code=202)
+async def submit_jobs(request: JobBatchSubmitRequest, app_request: Request) -> JobBatchSubmitResponse:
+    """
+    Envia vários documentos de uma vez (padrão: faixa `bulk`)
+    
+    Todos os itens são validados antes de qualquer job ser criado; cada
+    item conta uma análise no limite de taxa do cliente.
+    """
+    scheduler = _get_job_scheduler(app_request)
+    
+    if len(request.items) > settings.JOBS_BATCH_MAX_ITEMS:
+        raise VeritasException(
+            f"Lote muito grande. Máximo: {settings.JOBS_BATCH_MAX_ITEMS} itens.",
+            status_code=413,
+            details={"max_items": settings.JOBS_BATCH_MAX_ITEMS, "actual_items": len(request.items)}
+        )
+    
+    items = []
+    for index, item in enumerate(request.items):
+        try:
+            items.append((item.id, _validate_job_text(item.text)))
+        except VeritasException as e:
+            e.details = {**e.details, "item": index, "id": item.id}
+            raise
+    
+    await _charge_submission(app_request, len(items))
+    jobs = await scheduler.submit(items, request.priority)
+    return JobBatchSubmitResponse(jobs=[JobSubmitResponse(**job) for job in jobs])
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, app_request: Request) -> JobStatusResponse:
+    """Estado do job e, quando concluído, o resultado da análise"""
+    scheduler = _get_job_scheduler(app_request)
+    return _build_status(await _get_job(scheduler, job_id))
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "model": JobStatusResponse}},
+)
+async def stream_job(job_id: str, app_request: Request) -> StreamingResponse:
+    """
+    Acompanha o job em streaming (NDJSON)
+    
+    Emite uma linha com o estado atual a cada mudança (e periodicamente,
+    como heartbeat) e encerra após o estado final, que inclui o resultado.
+    """
+    scheduler = _get_job_scheduler(app_request)
+    await _get_job(scheduler, job_id)
+    
+    async def events() -> AsyncIterator[bytes]:
+        while True:
+            # Registrar o interesse antes de ler evita perder uma transição
+            changed = scheduler.watch(job_id)
+            job = await scheduler.get(job_id)
+            if job is None:
+                return
+            
+            yield _build_status(job).model_dump_json().encode("utf-8") + b"\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            
+            try:
+                await asyncio.wait_for(changed.wait(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    
+    return StreamingResponse(events(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.delete("/jobs/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str, app_request: Request) -> JobStatusResponse:
+    """Cancela um job que ainda está na fila"""
+    scheduler = _get_job_scheduler(app_request)
+    job = await _get_job(scheduler, job_id)
+    
+    if not await scheduler.cancel(job_id):
+        raise VeritasException(
+            "Apenas jobs na fila podem ser cancelados.",
+            status_code=409,
+            details={"job_id": job_id, "status": job["status"]}
+        )
+    
+    return _build_status(await _get_job(scheduler, job_id))
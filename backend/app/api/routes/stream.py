@@ -0,0 +1,85 @@
+"""
+Rota de análise incremental (WebSocket)
+"""
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.api.routes.analysis import _admission
+from app.core.models import StreamMessage, StreamMessageType
+from app.core.exceptions import VeritasException
+from app.core.config import settings
+from app.core.payloads import error_payload
+from app.services.streaming import StreamingSession
+
+router = APIRouter()
+
+# Código de fechamento "tente novamente mais tarde" (RFC 6455)
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+@router.websocket("/analyze/stream")
+async def analyze_stream(websocket: WebSocket):
+    """
+    Analisa um texto enquanto ele é digitado ou transcrito
+    
+    O cliente envia alterações em JSON:
+    - `{"type": "delta", "text": "...", "start": 10, "end": 15}` substitui
+      o trecho [start, end) (sem `start`/`end`, acrescenta ao fim)
+    - `{"type": "flush"}` repontua o sentimento imediatamente
+    - `{"type": "reset"}` limpa o documento
+    
+    Cada alteração responde na hora com `type: "update"` (score, frases
+    suspeitas novas e removidas, características). O sentimento é
+    repontuado só nas janelas afetadas, após uma pausa na digitação, e
+    gera outra atualização; até lá, `sentiment_pending` é verdadeiro.
+    Cada repontuação conta uma análise no limite de taxa do cliente e
+    passa pela fila justa.
+    Mensagens inválidas recebem `type: "error"` sem encerrar a sessão.
+    """
+    await websocket.accept()
+    
+    nlp_service = getattr(websocket.app.state, "nlp_service", None)
+    if not nlp_service or not nlp_service.initialized:
+        await websocket.send_json({
+            "type": "error",
+            "error": "Serviço de análise não está disponível. Tente novamente em alguns instantes.",
+            "status_code": 503
+        })
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+    
+    session = StreamingSession(
+        nlp_service,
+        websocket.send_json,
+        max_length=settings.STREAM_MAX_TEXT_LENGTH,
+        debounce_seconds=settings.STREAM_RESCORE_DEBOUNCE_MS / 1000,
+        max_delay_seconds=settings.STREAM_RESCORE_MAX_DELAY_MS / 1000,
+        rescan_margin=settings.STREAM_RESCAN_MARGIN,
+        admit=_admission(websocket, "stream")
+    )
+    
+    try:
+        while True:
+            raw_message = await websocket.receive_text()
+            try:
+                message = StreamMessage.model_validate_json(raw_message)
+                if message.type == StreamMessageType.DELTA:
+                    await session.apply_delta(message.text, message.start, message.end)
+                elif message.type == StreamMessageType.FLUSH:
+                    await session.flush()
+                else:
+                    await session.reset()
+            except ValidationError as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "error": "Mensagem inválida",
+                    "details": {"errors": e.errors(include_url=False, include_context=False)},
+                    "status_code": 400
+                })
+            except VeritasException as e:
+                await websocket.send_json({"type": "error", **error_payload(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
@@ -0,0 +1,554 @@
+"""
+Linha de comando do Veritas
+Reprocessamento offline de arquivos (JSONL, CSV ou Parquet) com o pipeline
+de `NLPService`, sem subir a API, e treinamento/avaliação do pontuador linear
+
+Uso (a partir de backend/):
+    python -m app.cli score arquivo.jsonl --output resultados.jsonl --workers 4
+    python -m app.cli score arquivo.jsonl --output resultados.jsonl --resume
+    python -m app.cli train-scorer rotulados.jsonl --output models/scorer.json
+    python -m app.cli evaluate-scorer rotulados.jsonl --scorer models/scorer.json
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.core.config import settings
+from app.core.exceptions import (
+    InvalidTextException, NLPModelException, ServiceOverloadedException, TextTooLongException, VeritasException
+)
+from app.core.payloads import build_payload, error_payload
+
+
+# Item de entrada: (id, texto ou erro de leitura da linha)
+Row = Tuple[str, object]
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+
+def detect_format(path: str) -> str:
+    """Formato pela extensão (.jsonl/.ndjson/.json, .csv, .parquet)"""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Formato não reconhecido para '{path}'; use --format {'/'.join(FORMATS)}")
+
+
+def _row(index: int, item: object, id_field: str, text_field: str) -> Row:
+    """Id e texto de um registro lido (o índice da linha quando não há id)"""
+    if not isinstance(item, dict):
+        return str(index), VeritasException(
+            "Registro inválido", status_code=400, details={"line": index, "error": "esperado um objeto"}
+        )
+    item_id = item.get(id_field)
+    return str(index) if item_id is None else str(item_id), item.get(text_field)
+
+
+def iter_jsonl(path: str, id_field: str, text_field: str, skip: int = 0) -> Iterator[Row]:
+    """Registros de um arquivo JSONL, linha a linha (linhas em branco não contam)"""
+    with open(path, "rb") as f:
+        lines = (line for line in f if line.strip())
+        for index, line in enumerate(lines):
+            if index < skip:
+                continue
+            try:
+                item = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield str(index), VeritasException(
+                    "Linha JSONL inválida", status_code=400, details={"line": index, "error": str(e)}
+                )
+                continue
+            yield _row(index, item, id_field, text_field)
+
+
+def iter_csv(path: str, id_field: str, text_field: str, skip: int = 0) -> Iterator[Row]:
+    """Registros de um arquivo CSV com cabeçalho"""
+    csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+    with open(path, newline="", encoding="utf-8") as f:
+        for index, item in enumerate(csv.DictReader(f)):
+            if index >= skip:
+                yield _row(index, item, id_field, text_field)
+
+
+def iter_parquet(path: str, id_field: str, text_field: str, skip: int = 0, batch_size: int = 1024) -> Iterator[Row]:
+    """Registros de um arquivo Parquet, lidos em lotes de linhas (requer pyarrow)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Leitura de Parquet requer pyarrow: pip install pyarrow")
+    
+    parquet = pq.ParquetFile(path)
+    columns = [name for name in (id_field, text_field) if name in parquet.schema_arrow.names]
+    index = 0
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        if index + batch.num_rows <= skip:
+            index += batch.num_rows
+            continue
+        for item in batch.to_pylist():
+            if index >= skip:
+                yield _row(index, item, id_field, text_field)
+            index += 1
+
+
+READERS = {"jsonl": iter_jsonl, "csv": iter_csv, "parquet": iter_parquet}
+
+
+def chunked(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_service = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_options: Dict = {}
+
+
+def _create_service():
+    from app.services.nlp_service import NLPService
+    return NLPService()
+
+
+def _init_worker(threads: int, max_windows: Optional[int], max_length: int):
+    """Carrega o modelo uma vez por processo"""
+    global _service, _loop, _options
+    
+    # Limitar as bibliotecas numéricas antes de carregar o modelo (o PyTorch
+    # só é importado em NLPService.initialize e lê estas variáveis)
+    if threads > 0:
+        for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[variable] = str(threads)
+    
+    # Offline: inferência neste processo e resultados que não dependem da
+    # ordem nem da divisão entre processos (sem respostas degradadas por
+    # latência nem sentimento reaproveitado de quase-duplicatas já vistas)
+    settings.INFERENCE_WORKERS = 0
+    settings.OVERLOAD_CONTROL_ENABLED = False
+    settings.NEAR_DUPLICATE_ENABLED = False
+    # Um bloco inteiro entra de uma vez na fila de micro-batching (até
+    # --chunk-size registros x janelas): sem limite, nada é rejeitado com 429
+    settings.INFERENCE_QUEUE_MAX_SIZE = 0
+    
+    _options = {"max_windows": max_windows, "max_length": max_length}
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _service = _create_service()
+    _loop.run_until_complete(_service.initialize())
+
+
+def _validate_text(text: object, max_length: int) -> str:
+    """Mesmas regras dos itens de /analyze/batch, com limite de tamanho próprio"""
+    if isinstance(text, VeritasException):
+        raise text
+    if not isinstance(text, str) or len(text.strip()) < 10:
+        raise InvalidTextException()
+    text = text.strip()
+    if len(text) > max_length:
+        raise TextTooLongException(max_length=max_length, actual_length=len(text))
+    return text
+
+
+async def _analyze(text: str, max_windows: Optional[int] = None, linguistic_features: Optional[Dict] = None) -> Dict:
+    """
+    Analisa o texto; sobrecarga não é resultado final
+    
+    Um 429 da fila de inferência é temporário: espera o Retry-After e tenta
+    de novo, em vez de gravar o erro (e registrá-lo no checkpoint como
+    concluído).
+    """
+    while True:
+        try:
+            return await _service.analyze_text(text, max_windows, linguistic_features=linguistic_features)
+        except ServiceOverloadedException as e:
+            await asyncio.sleep(float(e.headers.get("Retry-After", settings.INFERENCE_RETRY_AFTER_SECONDS)))
+
+
+async def _score_row(item_id: str, text: object, linguistic_features: Optional[Dict]) -> Tuple[bytes, bool]:
+    """Linha de resultado (formato de BatchAnalysisResult) e se houve erro"""
+    try:
+        result = await _analyze(
+            _validate_text(text, _options["max_length"]), _options["max_windows"], linguistic_features
+        )
+        line = {"id": item_id, "result": build_payload(result), "error": None}
+    except VeritasException as e:
+        line = {"id": item_id, "result": None, "error": error_payload(e)}
+    except Exception as e:
+        line = {"id": item_id, "result": None, "error": error_payload(NLPModelException({"error": str(e)}))}
+    return orjson.dumps(line, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n", line["error"] is not None
+
+
+def _chunk_features(texts: List[object]) -> List[Optional[Dict]]:
+    """Características dos textos válidos do bloco, em lote (None nos inválidos)"""
+    valid = {}
+    for index, text in enumerate(texts):
+        try:
+            valid[index] = _validate_text(text, _options["max_length"])
+        except VeritasException:
+            pass
+    features = dict(zip(valid, _service.linguistic_features_batch(list(valid.values()))))
+    return [features.get(index) for index in range(len(texts))]
+
+
+def _score_chunk(chunk: List[Row]) -> Tuple[bytes, int]:
+    """
+    Pontua um bloco de registros: (linhas de resultado, número de erros)
+    
+    Os registros do bloco são analisados ao mesmo tempo, de modo que a fila
+    de micro-batching do serviço agrupa as janelas em lotes do modelo, e as
+    características linguísticas do bloco são extraídas em uma passada.
+    """
+    features = _chunk_features([text for _, text in chunk])
+    lines = _loop.run_until_complete(asyncio.gather(
+        *[_score_row(item_id, text, row) for (item_id, text), row in zip(chunk, features)]
+    ))
+    return b"".join(line for line, _ in lines), sum(1 for _, error in lines if error)
+
+
+def _input_fingerprint(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoint(path: str, input_path: str) -> Optional[Dict]:
+    """Checkpoint de uma execução anterior sobre o mesmo arquivo de entrada"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        checkpoint = orjson.loads(f.read())
+    fingerprint = _input_fingerprint(input_path)
+    if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+        raise SystemExit(f"O checkpoint '{path}' é de outro arquivo de entrada (ou ele foi alterado)")
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    """Grava o checkpoint de forma atômica (arquivo temporário + rename)"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(orjson.dumps(checkpoint, option=orjson.OPT_INDENT_2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def score(args: argparse.Namespace):
+    """
+    Pontua o arquivo de entrada e grava um JSONL de resultados
+    
+    Blocos de `--chunk-size` registros são distribuídos entre os processos;
+    no máximo dois blocos por processo ficam em andamento, e os resultados
+    são gravados na ordem de entrada. Após cada bloco gravado, o checkpoint
+    registra quantos registros e bytes de saída estão completos: com
+    `--resume`, a saída é truncada nesse ponto e a leitura continua do
+    registro seguinte.
+    """
+    input_format = args.format or detect_format(args.input)
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.json"
+    
+    checkpoint = load_checkpoint(checkpoint_path, args.input) if args.resume else None
+    rows_done = checkpoint["rows"] if checkpoint else 0
+    errors = checkpoint["errors"] if checkpoint else 0
+    
+    output = open(args.output, "r+b" if checkpoint else "wb")
+    if checkpoint:
+        output.truncate(checkpoint["output_bytes"])
+        output.seek(checkpoint["output_bytes"])
+        print(f"Retomando após {rows_done} registros", file=sys.stderr)
+    
+    rows = READERS[input_format](args.input, args.id_field, args.text_field, skip=rows_done)
+    fingerprint = _input_fingerprint(args.input)
+    
+    if args.workers > 0:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(args.threads_per_worker, args.max_windows, args.max_length)
+        )
+        submit = lambda chunk: executor.submit(_score_chunk, chunk)
+        max_in_flight = 2 * args.workers
+    else:
+        executor = None
+        _init_worker(args.threads_per_worker, args.max_windows, args.max_length)
+        
+        def submit(chunk):
+            future = Future()
+            future.set_result(_score_chunk(chunk))
+            return future
+        max_in_flight = 1
+    
+    start = time.perf_counter()
+    last_report = start
+    rows_this_run = 0
+    in_flight: deque = deque()
+    
+    def write_oldest():
+        nonlocal rows_done, rows_this_run, errors, last_report
+        future, size = in_flight.popleft()
+        lines, chunk_errors = future.result()
+        output.write(lines)
+        output.flush()
+        os.fsync(output.fileno())
+        
+        rows_done += size
+        rows_this_run += size
+        errors += chunk_errors
+        save_checkpoint(checkpoint_path, {
+            **fingerprint,
+            "output": os.path.abspath(args.output),
+            "rows": rows_done,
+            "output_bytes": output.tell(),
+            "errors": errors
+        })
+        
+        now = time.perf_counter()
+        if now - last_report >= args.progress_seconds:
+            last_report = now
+            rate = rows_this_run / (now - start)
+            print(f"{rows_done} registros, {rate:.1f} registros/s, {errors} erros", file=sys.stderr)
+    
+    try:
+        for chunk in chunked(rows, args.chunk_size):
+            in_flight.append((submit(chunk), len(chunk)))
+            while len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+    finally:
+        output.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        elif _service is not None:
+            _loop.run_until_complete(_service.cleanup())
+    
+    elapsed = time.perf_counter() - start
+    rate = rows_this_run / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Concluído: {rows_done} registros ({rows_this_run} nesta execução) em {elapsed:.1f} s, "
+        f"{rate:.1f} registros/s, {errors} erros",
+        file=sys.stderr
+    )
+
+
+# Rótulos aceitos nos conjuntos rotulados (1 = confiável)
+LABELS = {
+    "1": 1, "true": 1, "reliable": 1, "confiavel": 1, "confiável": 1,
+    "0": 0, "false": 0, "unreliable": 0, "questionable": 0, "duvidoso": 0
+}
+
+
+def _label(value: object) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return int(value)
+    if isinstance(value, str):
+        return LABELS.get(value.strip().lower())
+    return None
+
+
+def load_labeled(path: str, input_format: str, text_field: str, label_field: str) -> Tuple[List[str], List[int], int]:
+    """Textos e rótulos de um JSONL ou CSV rotulado (e quantos registros foram ignorados)"""
+    if input_format == "jsonl":
+        with open(path, "rb") as f:
+            records = [orjson.loads(line) for line in f if line.strip()]
+    elif input_format == "csv":
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        with open(path, newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+    else:
+        raise SystemExit("Conjuntos rotulados devem ser JSONL ou CSV")
+    
+    texts, labels = [], []
+    for record in records:
+        label = _label(record.get(label_field)) if isinstance(record, dict) else None
+        if label is not None and isinstance(record.get(text_field), str):
+            texts.append(record[text_field])
+            labels.append(label)
+    return texts, labels, len(records) - len(texts)
+
+
+async def _feature_row(text: str, linguistic_features: Optional[Dict] = None) -> Optional[np.ndarray]:
+    """Vetor de características de um texto pelo pipeline completo (None se inválido)"""
+    from app.services import scoring
+    from app.services.scorer import feature_matrix
+    
+    try:
+        result = await _analyze(_validate_text(text, _options["max_length"]), None, linguistic_features)
+    except VeritasException:
+        return None
+    sentiment = result["metadata"]["sentiment"]
+    return feature_matrix(
+        len(result["suspicious_phrases"]),
+        result["metadata"]["linguistic_features"],
+        scoring.is_strong_sentiment(sentiment.get("label"), sentiment.get("score", 0.5))
+    )[0]
+
+
+def labeled_features(args: argparse.Namespace) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz de características e rótulos do conjunto rotulado
+    
+    Os textos passam pelo pipeline no processo atual, em blocos analisados
+    ao mesmo tempo (o micro-batching agrupa a inferência). A cascata é
+    desligada para que todo texto tenha o sentimento do modelo principal.
+    """
+    texts, labels, skipped = load_labeled(
+        args.input, args.format or detect_format(args.input), args.text_field, args.label_field
+    )
+    settings.CASCADE_ENABLED = False
+    _init_worker(args.threads, None, args.max_length)
+    
+    rows: List[Optional[np.ndarray]] = []
+    start = time.perf_counter()
+    try:
+        for chunk in chunked(iter(texts), args.chunk_size):
+            rows.extend(_loop.run_until_complete(asyncio.gather(*map(_feature_row, chunk, _chunk_features(chunk)))))
+            print(f"{len(rows)}/{len(texts)} textos analisados", file=sys.stderr)
+    finally:
+        _loop.run_until_complete(_service.cleanup())
+    
+    valid = [index for index, row in enumerate(rows) if row is not None]
+    skipped += len(rows) - len(valid)
+    print(f"{len(valid)} textos rotulados em {time.perf_counter() - start:.1f} s ({skipped} ignorados)", file=sys.stderr)
+    if not valid:
+        raise SystemExit("Nenhum texto rotulado válido")
+    return np.vstack([rows[index] for index in valid]), np.array([labels[index] for index in valid], dtype=np.int64)
+
+
+def _print_comparison(report: Dict):
+    """Resumo das métricas das regras e do modelo"""
+    for name, title in (("rules", "regras"), ("model", "modelo")):
+        metrics = report[name]
+        print(
+            f"{title:>7}: acurácia {metrics['accuracy']}, AUC {metrics['roc_auc']}, "
+            f"Brier {metrics['brier']}, ECE {metrics['ece']} ({metrics['samples']} textos)",
+            file=sys.stderr
+        )
+
+
+def train_scorer(args: argparse.Namespace):
+    """
+    Treina, calibra e grava o pontuador linear
+    
+    Os textos são divididos (com semente) em treino, calibração e teste; as
+    métricas do teste, para o modelo e para as regras atuais, ficam no
+    próprio artefato. O arquivo é substituído de forma atômica: um serviço
+    com SCORER_MODEL_PATH apontando para ele passa a usá-lo sem reiniciar.
+    """
+    from app.services.calibration import compare_scorers, save_artifact, split_indices, train_linear_scorer
+    from app.services.scorer import LinearScorer
+    
+    features, labels = labeled_features(args)
+    train, calibration, test = split_indices(len(labels), args.test_size, args.calibration_size, args.seed)
+    artifact = train_linear_scorer(
+        features[train], labels[train], features[calibration], labels[calibration],
+        calibration=args.calibration, regularization=args.regularization
+    )
+    artifact["metrics"] = {
+        "input": os.path.abspath(args.input),
+        "split": {"train": int(train.size), "calibration": int(calibration.size), "test": int(test.size), "seed": args.seed},
+        "test": compare_scorers(features[test], labels[test], LinearScorer(artifact))
+    }
+    save_artifact(args.output, artifact)
+    
+    print(f"Modelo '{artifact['version']}' gravado em {args.output}", file=sys.stderr)
+    _print_comparison(artifact["metrics"]["test"])
+
+
+def evaluate_scorer(args: argparse.Namespace):
+    """Compara o pontuador gravado com as regras atuais em um conjunto rotulado"""
+    from app.services.calibration import compare_scorers
+    from app.services.scorer import LinearScorer
+    
+    scorer = LinearScorer.from_file(args.scorer)
+    features, labels = labeled_features(args)
+    report = {"scorer": scorer.version, **compare_scorers(features, labels, scorer)}
+    
+    output = orjson.dumps(report, option=orjson.OPT_INDENT_2)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(output)
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+    _print_comparison(report)
+
+
+def _add_labeled_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("input", help="JSONL ou CSV com texto e rótulo (1 = confiável, 0 = não confiável)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="Formato da entrada (padrão: pela extensão)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Textos analisados ao mesmo tempo")
+    parser.add_argument("--threads", type=int, default=0, help="Threads de inferência (0 = padrão)")
+    parser.add_argument("--max-length", type=int, default=settings.MAX_TEXT_LENGTH,
+                        help="Tamanho máximo do texto (padrão: MAX_TEXT_LENGTH)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Ferramentas de linha de comando do Veritas")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    score_parser = commands.add_parser("score", help="Pontua um arquivo JSONL/CSV/Parquet sem subir a API")
+    score_parser.add_argument("input", help="Arquivo de entrada")
+    score_parser.add_argument("--output", required=True, help="JSONL de resultados (uma linha por registro)")
+    score_parser.add_argument("--format", choices=FORMATS, help="Formato da entrada (padrão: pela extensão)")
+    score_parser.add_argument("--id-field", default="id", help="Campo de identificação (padrão: índice do registro)")
+    score_parser.add_argument("--text-field", default="text")
+    score_parser.add_argument("--chunk-size", type=int, default=256, help="Registros por bloco enviado a um processo")
+    score_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                              help="Processos de pontuação (0 = no processo atual)")
+    score_parser.add_argument("--threads-per-worker", type=int, default=1)
+    score_parser.add_argument("--max-windows", type=int, default=None,
+                              help="Janelas de sentimento por texto (padrão: SENTIMENT_MAX_WINDOWS)")
+    score_parser.add_argument("--max-length", type=int, default=settings.MAX_TEXT_LENGTH,
+                              help="Tamanho máximo do texto (padrão: MAX_TEXT_LENGTH)")
+    score_parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: <output>.checkpoint.json)")
+    score_parser.add_argument("--resume", action="store_true", help="Continua do último checkpoint")
+    score_parser.add_argument("--progress-seconds", type=float, default=10.0)
+    score_parser.set_defaults(handler=score)
+    
+    train_parser = commands.add_parser("train-scorer", help="Treina e calibra o pontuador linear")
+    _add_labeled_arguments(train_parser)
+    train_parser.add_argument("--output", required=True, help="Arquivo do modelo (JSON; SCORER_MODEL_PATH)")
+    train_parser.add_argument("--calibration", choices=("isotonic", "platt", "none"), default="isotonic")
+    train_parser.add_argument("--test-size", type=float, default=0.2, help="Fração reservada para o teste")
+    train_parser.add_argument("--calibration-size", type=float, default=0.25,
+                              help="Fração do restante reservada para a calibração")
+    train_parser.add_argument("--regularization", type=float, default=1.0, help="Parâmetro C da regressão logística")
+    train_parser.add_argument("--seed", type=int, default=0)
+    train_parser.set_defaults(handler=train_scorer)
+    
+    evaluate_parser = commands.add_parser(
+        "evaluate-scorer", help="Compara um pontuador treinado com as regras em um conjunto rotulado"
+    )
+    _add_labeled_arguments(evaluate_parser)
+    evaluate_parser.add_argument("--scorer", required=True, help="Arquivo do modelo gerado por train-scorer")
+    evaluate_parser.add_argument("--output", help="Relatório JSON (padrão: saída padrão)")
+    evaluate_parser.set_defaults(handler=evaluate_scorer)
+    
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
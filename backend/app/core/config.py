@@ -3,7 +3,7 @@ Configurações da aplicação
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -14,6 +14,10 @@ class Settings(BaseSettings):
     PORT: int = 8000
     DEBUG: bool = True
     
+    # Servidor prefork (python -m app.serve): só o worker primário (índice 0)
+    # recupera e executa jobs e grava o snapshot de quase-duplicatas
+    PRIMARY_WORKER: bool = True
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -22,9 +26,147 @@ class Settings(BaseSettings):
     ]
     
     # NLP Settings
-    NLP_MODEL_NAME: str = "pierreguillou/bert-base-cased-pt-lenerbr"
+    NLP_MODEL_NAME: str = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
     MAX_TEXT_LENGTH: int = 2000
     CONFIDENCE_THRESHOLD: float = 0.6
+    PATTERN_RULES_PATH: Optional[str] = None  # regras em português; padrão: app/data/suspicious_patterns.json
+    
+    # Pontuação: regras fixas (padrão) ou modelo linear calibrado treinado com
+    # `python -m app.cli train-scorer`; o arquivo é relido quando muda, sem reiniciar
+    SCORER_MODEL_PATH: Optional[str] = None
+    SCORER_RELOAD_INTERVAL_SECONDS: float = 5.0  # intervalo entre verificações do arquivo; 0 = não recarrega
+    
+    # Inicialização (cold start)
+    NLP_MODEL_PATH: Optional[str] = None  # diretório local fixado; sem consultas ao Hugging Face Hub
+    STARTUP_WARMUP_BATCH_SIZE: int = 4  # janelas no lote de aquecimento; 0 desativa
+    STARTUP_IN_BACKGROUND: bool = False  # aceita conexões enquanto carrega; /ready indica o fim
+    
+    # Backend de inferência: "torch" (padrão) ou "onnx" (requirements-onnx.txt)
+    INFERENCE_BACKEND: str = "torch"
+    ONNX_MODEL_DIR: str = "models/onnx"
+    ONNX_QUANTIZE: bool = False  # quantização dinâmica int8
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = padrão do onnxruntime
+    ONNX_INTER_OP_THREADS: int = 1
+    
+    # Workers de inferência (processos separados, cada um com uma cópia do modelo)
+    INFERENCE_WORKERS: int = 0  # 0 = inferência no processo da API
+    INFERENCE_THREADS_PER_WORKER: int = 1
+    INFERENCE_PIN_CPUS: bool = True
+    INFERENCE_QUEUE_MAX_SIZE: int = 512  # janelas aguardando; acima disso responde 429
+    INFERENCE_RETRY_AFTER_SECONDS: int = 1
+    
+    # Cascata de modelos: regras e um modelo pequeno primeiro; o modelo principal
+    # só roda quando o nível de confiabilidade ainda depende do sentimento
+    CASCADE_ENABLED: bool = False
+    CASCADE_MODEL_NAME: Optional[str] = None  # ex.: classificador destilado; sem ele, regras -> principal
+    CASCADE_SENTIMENT_MARGIN: float = 0.1  # distância mínima do limiar de sentimento forte
+    
+    # Idiomas: identificação por trigramas de caracteres antes das demais etapas;
+    # cada idioma suportado tem suas regras e, opcionalmente, seu modelo de sentimento
+    LANGUAGE_DETECTION_ENABLED: bool = True
+    LANGUAGES_SUPPORTED: List[str] = ["pt", "es", "en"]  # demais idiomas respondem 422
+    LANGUAGE_DEFAULT: str = "pt"  # textos curtos ou ambíguos
+    LANGUAGE_PROFILES_PATH: Optional[str] = None  # padrão: app/data/language_profiles.json
+    LANGUAGE_MAX_CHARS: int = 300  # prefixo examinado
+    LANGUAGE_MIN_TRIGRAMS: int = 12
+    LANGUAGE_MIN_MARGIN: float = 0.1  # vantagem mínima por trigrama sobre o segundo idioma
+    LANGUAGE_MIN_COVERAGE: float = 0.6  # fração mínima dos trigramas presente nos perfis
+    LANGUAGE_MIN_EVIDENCE: float = 15.0  # log da razão de verossimilhança mínima contra o idioma padrão
+    LANGUAGE_RULES_PATHS: Dict[str, str] = {}  # padrão: app/data/suspicious_patterns.<idioma>.json
+    LANGUAGE_MODELS: Dict[str, str] = {}  # sem entrada, o idioma usa o modelo principal (multilíngue)
+    LANGUAGE_MODEL_SLOTS: int = 1  # modelos por idioma carregados ao mesmo tempo (LRU dos ociosos)
+    LANGUAGE_MODEL_IDLE_SECONDS: float = 600.0  # descarrega modelos sem uso; 0 = só por LRU
+    
+    # Explicações com atribuições por token do modelo (opt-in por requisição: `explain`)
+    EXPLAIN_MAX_SPANS: int = 48  # oclusões por análise; acima disso, palavras vizinhas são agrupadas
+    EXPLAIN_TOP_SPANS: int = 5
+    
+    # Controle de admissão em /analyze, /analyze/batch, /jobs e /analyze/stream: limite de
+    # taxa por cliente (chave de API ou IP) e fila justa entre clientes na frente do serviço
+    API_KEY_HEADER: str = "X-API-Key"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_SECOND: float = 10.0  # análises por segundo por cliente (itens de lote e jobs contam um a um)
+    RATE_LIMIT_BURST: int = 100
+    RATE_LIMIT_BATCH_MAX_WAIT_SECONDS: float = 30.0  # itens de lote aguardam tokens; depois, erro 429 no item
+    RATE_LIMIT_SQLITE_PATH: Optional[str] = None  # estado compartilhado pelos workers do mesmo host
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    FAIR_SCHEDULING_ENABLED: bool = True
+    FAIR_MAX_CONCURRENCY: int = 32  # análises em andamento; as demais aguardam a vez do cliente
+    CLIENT_WEIGHTS: Dict[str, int] = {}  # peso na fila justa por chave de API (padrão: 1)
+    
+    # Controle de sobrecarga pela latência de inferência (espera na fila + forward):
+    # acima do primeiro limiar responde só com as regras; acima do segundo, 429.
+    # Sem limiares fixos, eles vêm da latência medida no aquecimento deste hardware
+    OVERLOAD_CONTROL_ENABLED: bool = True
+    OVERLOAD_DEGRADE_LATENCY_MS: Optional[float] = None  # padrão: fator x lote cheio medido no aquecimento
+    OVERLOAD_SHED_LATENCY_MS: Optional[float] = None  # padrão: 4 x limiar de degradação; 0 = nunca rejeitar
+    OVERLOAD_WARMUP_FACTOR: float = 3.0  # lotes cheios de espera tolerados antes de degradar
+    OVERLOAD_WARMUP_RUNS: int = 3  # lotes medidos no aquecimento (p95)
+    OVERLOAD_MIN_LATENCY_MS: float = 250.0  # piso dos limiares derivados
+    OVERLOAD_RECOVERY_RATIO: float = 0.5  # volta quando a latência cai abaixo de limiar * razão
+    OVERLOAD_EWMA_ALPHA: float = 0.2  # peso de cada lote na média da latência
+    OVERLOAD_DECAY_SECONDS: float = 5.0  # esquecimento da latência sem novas medidas
+    OVERLOAD_MIN_STATE_SECONDS: float = 1.0
+    OVERLOAD_CONFIDENCE_PENALTY: float = 0.2  # redução da confiança no modo degradado
+    
+    # Micro-batching da inferência de sentimento
+    SENTIMENT_BATCH_MAX_SIZE: int = 16
+    SENTIMENT_BATCH_MAX_WAIT_MS: float = 10.0
+    
+    # Janelas deslizantes de sentimento (texto completo, em tokens)
+    SENTIMENT_WINDOW_TOKENS: int = 512  # inclui tokens especiais
+    SENTIMENT_WINDOW_OVERLAP: int = 64
+    SENTIMENT_MAX_WINDOWS: int = 8  # limita a latência de documentos longos
+    
+    # Análise em lote (/api/v1/analyze/batch)
+    BATCH_MAX_ITEMS: int = 1000  # limite para corpos JSON; NDJSON é lido em streaming
+    BATCH_MAX_CONCURRENCY: int = 32  # itens em processamento simultâneo por requisição
+    
+    # Jobs assíncronos (/api/v1/jobs): documentos longos e reprocessamentos em massa
+    JOBS_ENABLED: bool = True
+    JOBS_DB_PATH: str = "data/jobs.db"
+    JOBS_MAX_TEXT_LENGTH: int = 200000
+    JOBS_MAX_WINDOWS: int = 128  # janelas de sentimento por documento (cobre textos longos)
+    JOBS_BATCH_MAX_ITEMS: int = 10000
+    JOBS_CONCURRENCY: int = 4  # jobs em execução simultânea
+    JOBS_BULK_MAX_CONCURRENCY: int = 2  # o restante fica reservado para jobs interativos
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_RESULT_TTL_SECONDS: float = 7 * 24 * 3600.0
+    JOBS_LEASE_SECONDS: float = 30.0  # prazo de um job em execução sem renovação do processo dono
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0  # busca no banco jobs enviados por outros workers; 0 desativa
+    
+    # Análise incremental (WebSocket /api/v1/analyze/stream)
+    STREAM_MAX_TEXT_LENGTH: int = 20000
+    STREAM_RESCORE_DEBOUNCE_MS: int = 300  # pausa na digitação antes de repontuar o sentimento
+    STREAM_RESCORE_MAX_DELAY_MS: int = 2000  # atraso máximo do sentimento com digitação contínua
+    STREAM_RESCAN_MARGIN: int = 128  # caracteres revarridos em volta de cada alteração
+    
+    # Análises idênticas simultâneas aguardam uma única execução (single-flight)
+    COALESCING_ENABLED: bool = True
+    
+    # Cache de resultados (LRU + TTL em memória, SQLite opcional entre workers)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 10000
+    RESULT_CACHE_TTL_SECONDS: float = 3600.0
+    RESULT_CACHE_SQLITE_PATH: Optional[str] = None
+    RESULT_CACHE_SQLITE_MAX_ENTRIES: int = 100000
+    
+    # Cache de tokenizações (textos repetidos não passam de novo pelo tokenizer)
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_TOKENS: int = 2_000_000  # total de tokens guardados (~12 bytes cada)
+    
+    # Quase-duplicatas (MinHash/LSH): textos muito parecidos com um já analisado
+    # reaproveitam o resultado do modelo em vez de repetir a inferência
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7  # similaridade de Jaccard estimada mínima
+    NEAR_DUPLICATE_MAX_ENTRIES: int = 50000
+    NEAR_DUPLICATE_NUM_PERM: int = 128
+    NEAR_DUPLICATE_BANDS: int = 32  # num_perm / bands linhas por banda
+    NEAR_DUPLICATE_SHINGLE_SIZE: int = 5  # k-gramas de caracteres
+    NEAR_DUPLICATE_SNAPSHOT_PATH: Optional[str] = "data/near_duplicates.npz"  # carregado na inicialização
+    
+    # Métricas (tempos por etapa em metadata.timings_ms e GET /metrics)
+    METRICS_ENABLED: bool = True
     
     # Explainable AI Settings
     MIN_EXPLANATION_LENGTH: int = 50
@@ -6,10 +6,11 @@ Exceções customizadas da aplicação
 class VeritasException(Exception):
     """Exceção base para erros da aplicação Veritas"""
     
-    def __init__(self, message: str, status_code: int = 400, details: dict = None):
+    def __init__(self, message: str, status_code: int = 400, details: dict = None, headers: dict = None):
         self.message = message
         self.status_code = status_code
         self.details = details or {}
+        self.headers = headers or {}
         super().__init__(self.message)
 
 
@@ -44,3 +45,48 @@ class NLPModelException(VeritasException):
             details=details or {}
         )
 
+
+class ServiceOverloadedException(VeritasException):
+    """Fila de inferência cheia; o cliente deve tentar novamente mais tarde"""
+    
+    def __init__(self, retry_after: int, details: dict = None):
+        super().__init__(
+            "Serviço sobrecarregado. Tente novamente em alguns instantes.",
+            status_code=429,
+            details=details or {},
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class RateLimitedException(VeritasException):
+    """Cliente acima do limite de taxa de análises"""
+    
+    def __init__(self, retry_after: int, limit_per_second: float):
+        super().__init__(
+            "Limite de requisições excedido. Tente novamente em alguns instantes.",
+            status_code=429,
+            details={"reason": "rate_limit", "limit_per_second": limit_per_second, "retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class UnsupportedLanguageException(VeritasException):
+    """Texto em um idioma sem regras nem modelo configurados"""
+    
+    def __init__(self, language: str, supported: list):
+        super().__init__(
+            f"Idioma não suportado: {language}. Suportados: {', '.join(supported)}",
+            status_code=422,
+            details={"language": language, "supported": supported}
+        )
+
+
+class JobNotFoundException(VeritasException):
+    """Job de análise inexistente ou já removido"""
+    
+    def __init__(self, job_id: str):
+        super().__init__(
+            "Job não encontrado.",
+            status_code=404,
+            details={"job_id": job_id}
+        )
@@ -0,0 +1,383 @@
+"""
+Métricas de desempenho no formato de texto do Prometheus
+Instrumentação por etapa do pipeline, sem dependências externas
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Limites dos histogramas de duração (segundos)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    """Escapa o valor de um label conforme o formato de texto"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    """Formata `{nome="valor",...}` (vazio se não houver labels)"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Formata um valor numérico (inteiros sem casa decimal)"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base das métricas: nome, descrição e séries por combinação de labels"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+    
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def collect(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Valor instantâneo (atualizado na coleta)"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+    
+    def collect(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos, soma e contagem"""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por série: [contagens por bucket..., soma, contagem]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    def collect(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(series[-1])}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas exportadas em /metrics"""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "veritas_stage_duration_seconds",
+    "Duração de cada etapa do pipeline de análise",
+    ("stage",)
+))
+ANALYSES_TOTAL = REGISTRY.register(Counter(
+    "veritas_analyses_total",
+    "Análises concluídas por resultado (computed, cached, coalesced, near_duplicate, degraded, fallback, overloaded, shed, unsupported_language)",
+    ("outcome",)
+))
+INFERENCE_BATCH_SIZE = REGISTRY.register(Histogram(
+    "veritas_inference_batch_size",
+    "Janelas por lote de inferência",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "veritas_http_request_duration_seconds",
+    "Duração das requisições HTTP (inclui serialização da resposta)",
+    ("method", "path", "status")
+))
+CASCADE_RESOLVED_TOTAL = REGISTRY.register(Counter(
+    "veritas_cascade_resolved_total",
+    "Análises resolvidas por camada da cascata (rules, small, full)",
+    ("tier",)
+))
+RATE_LIMITED_TOTAL = REGISTRY.register(Counter(
+    "veritas_rate_limited_total",
+    "Análises rejeitadas pelo limite de taxa por cliente (analyze, batch_item, jobs, stream)",
+    ("scope",)
+))
+SERVICE_STATE = REGISTRY.register(Gauge(
+    "veritas_service_state",
+    "Estado atual do serviço (fila de inferência, cache, workers)",
+    ("metric",)
+))
+
+
+def update_service_state(stats: Dict):
+    """Atualiza os gauges de estado a partir de NLPService.get_stats()"""
+    SERVICE_STATE.set(1.0 if stats.get("initialized") else 0.0, metric="ready")
+    
+    batching = stats.get("sentiment_batching") or {}
+    for key in ("queue_depth", "batches_in_flight", "rejected_total"):
+        if key in batching:
+            SERVICE_STATE.set(batching[key], metric=f"inference_{key}")
+    
+    cache = stats.get("result_cache") or {}
+    for key in ("size", "hit_ratio"):
+        if key in cache:
+            SERVICE_STATE.set(cache[key], metric=f"result_cache_{key}")
+    
+    scorer = stats.get("scorer") or {}
+    for key in ("loads", "errors"):
+        if key in scorer:
+            SERVICE_STATE.set(scorer[key], metric=f"scorer_{key}")
+    
+    token_cache = stats.get("token_cache") or {}
+    for key in ("tokens", "hit_ratio"):
+        if key in token_cache:
+            SERVICE_STATE.set(token_cache[key], metric=f"token_cache_{key}")
+    
+    coalescing = stats.get("coalescing") or {}
+    for key in ("in_flight", "coalesced_ratio"):
+        if key in coalescing:
+            SERVICE_STATE.set(coalescing[key], metric=f"coalescing_{key}")
+    
+    overload = stats.get("overload") or {}
+    if overload:
+        SERVICE_STATE.set(("normal", "degraded", "shedding").index(overload["state"]), metric="overload_state")
+        SERVICE_STATE.set(overload["inference_latency_ms"], metric="overload_inference_latency_ms")
+        SERVICE_STATE.set(overload["transitions"], metric="overload_transitions")
+    
+    near_duplicates = stats.get("near_duplicates") or {}
+    for key in ("size", "match_ratio"):
+        if key in near_duplicates:
+            SERVICE_STATE.set(near_duplicates[key], metric=f"near_duplicates_{key}")
+    
+    cascade = stats.get("cascade") or {}
+    for tier, ratio in cascade.get("hit_ratio", {}).items():
+        SERVICE_STATE.set(ratio, metric=f"cascade_{tier}_hit_ratio")
+    
+    language = stats.get("language") or {}
+    for code, count in language.get("identified", {}).items():
+        SERVICE_STATE.set(count, metric=f"language_{code}_total")
+    
+    language_models = stats.get("language_models") or {}
+    if language_models:
+        SERVICE_STATE.set(len(language_models["loaded"]), metric="language_models_loaded")
+        SERVICE_STATE.set(language_models["evictions"], metric="language_models_evictions")
+    
+    process = stats.get("process") or {}
+    for key in ("rss_mb", "pss_mb", "shared_mb"):
+        if key in process:
+            SERVICE_STATE.set(process[key], metric=f"process_{key}")
+    
+    admission = stats.get("admission") or {}
+    fair_scheduling = admission.get("fair_scheduling") or {}
+    for key in ("running", "waiting", "clients_waiting"):
+        if key in fair_scheduling:
+            SERVICE_STATE.set(fair_scheduling[key], metric=f"fair_scheduling_{key}")
+    rate_limit = admission.get("rate_limit") or {}
+    if rate_limit:
+        SERVICE_STATE.set(rate_limit["clients"], metric="rate_limit_clients")
+    
+    workers = stats.get("inference_workers") or {}
+    if workers:
+        alive = sum(1 for worker in workers.get("per_worker", []) if worker.get("alive"))
+        SERVICE_STATE.set(alive, metric="inference_workers_alive")
+        SERVICE_STATE.set(workers.get("restarts", 0), metric="inference_workers_restarts")
+
+
+# Tempos por etapa da requisição atual, em ms (None quando desativado)
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "veritas_request_timings", default=None
+)
+
+_NOOP_TIMER = nullcontext()
+
+
+def enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+def begin_request() -> Optional[Dict[str, float]]:
+    """
+    Inicia a coleta de tempos por etapa para a requisição atual
+    
+    O dicionário é compartilhado com as tarefas filhas criadas a partir
+    daqui (asyncio.gather copia o contexto, não o dicionário).
+    """
+    if not settings.METRICS_ENABLED:
+        return None
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    return _request_timings.get()
+
+
+def record_stage(name: str, seconds: float):
+    """Registra a duração de uma etapa no histograma e na requisição atual"""
+    STAGE_DURATION.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0.0) + seconds * 1000.0, 3)
+
+
+def record_request_max(timings: Optional[Dict[str, float]], name: str, seconds: float):
+    """Registra na requisição o maior valor observado (etapas paralelas, ex.: janelas)"""
+    if timings is not None:
+        timings[name] = round(max(timings.get(name, 0.0), seconds * 1000.0), 3)
+
+
+class _StageTimer:
+    """Context manager que mede uma etapa"""
+    
+    __slots__ = ("name", "start")
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name: str):
+    """Mede a etapa `name`; sem custo além de um if quando as métricas estão desativadas"""
+    if not settings.METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(name)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede a duração das requisições HTTP por rota"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope.get("method", ""),
+                path=getattr(route, "path", "unmatched"),
+                status=str(status["code"])
+            )
@@ -2,8 +2,8 @@
 Modelos de dados (Pydantic) para a API
 """
 
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Any, List, Optional, Dict
 from enum import Enum
 
 
@@ -16,6 +16,9 @@ class ReliabilityLevel(str, Enum):
 
 class SuspiciousPhrase(BaseModel):
     """Frase suspeita identificada no texto"""
+    # Aceita as PhraseMatch internas (app/core/payloads.py) sem conversão
+    model_config = ConfigDict(from_attributes=True)
+    
     text: str = Field(..., description="Texto da frase suspeita")
     start_index: int = Field(..., description="Índice inicial no texto original")
     end_index: int = Field(..., description="Índice final no texto original")
@@ -26,6 +29,10 @@ class SuspiciousPhrase(BaseModel):
 class AnalysisRequest(BaseModel):
     """Requisição de análise de texto"""
     text: str = Field(..., min_length=10, description="Texto a ser analisado")
+    explain: bool = Field(
+        False,
+        description="Inclui os trechos que mais pesaram no modelo (metadata.explanation); mais lento"
+    )
     
     @field_validator('text')
     @classmethod
@@ -45,7 +52,7 @@ class AnalysisResponse(BaseModel):
     suspicious_phrases: List[SuspiciousPhrase] = Field(default_factory=list, description="Frases suspeitas identificadas")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confiança geral da análise")
     uncertainty_warning: str = Field(..., description="Aviso sobre limitações e incertezas")
-    metadata: Dict[str, any] = Field(default_factory=dict, description="Metadados adicionais da análise")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Metadados adicionais da análise")
     
     class Config:
         json_schema_extra = {
@@ -66,8 +73,107 @@ class AnalysisResponse(BaseModel):
                 "uncertainty_warning": "Esta análise é uma estimativa baseada em padrões linguísticos. Não é uma afirmação absoluta sobre a veracidade do conteúdo.",
                 "metadata": {
                     "text_length": 250,
-                    "processing_time": 1.2
+                    "processing_time": 1.2,
+                    "timings_ms": {
+                        "tokenization": 0.9,
+                        "windowing": 0.05,
+                        "queue_wait": 10.5,
+                        "model_forward": 38.2,
+                        "pattern_scan": 0.2,
+                        "features": 0.1,
+                        "scoring": 0.05,
+                        "serialization": 0.07
+                    }
                 }
             }
         }
 
+
+
+class BatchAnalysisItem(BaseModel):
+    """Item de uma requisição de análise em lote"""
+    id: str = Field(..., description="Identificador do item definido pelo cliente")
+    text: str = Field(..., description="Texto a ser analisado")
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Requisição de análise em lote (JSON)"""
+    items: List[BatchAnalysisItem] = Field(..., description="Textos a serem analisados")
+
+
+class BatchAnalysisResult(BaseModel):
+    """Linha de resultado da análise em lote (NDJSON)"""
+    id: Optional[str] = Field(None, description="Identificador do item definido pelo cliente")
+    result: Optional[AnalysisResponse] = Field(None, description="Resultado da análise, se bem-sucedida")
+    error: Optional[Dict[str, Any]] = Field(None, description="Erro do item, se a análise falhou")
+
+
+class JobPriority(str, Enum):
+    """Faixas de prioridade dos jobs assíncronos"""
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+
+class JobStatus(str, Enum):
+    """Estados de um job assíncrono"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobSubmitRequest(BaseModel):
+    """Submissão de um documento para análise assíncrona"""
+    text: str = Field(..., description="Texto a ser analisado (até JOBS_MAX_TEXT_LENGTH)")
+    id: Optional[str] = Field(None, description="Identificador opcional definido pelo cliente")
+    priority: JobPriority = Field(JobPriority.INTERACTIVE, description="Faixa de prioridade")
+
+
+class JobBatchSubmitRequest(BaseModel):
+    """Submissão de vários documentos (reprocessamentos em massa)"""
+    items: List[BatchAnalysisItem] = Field(..., description="Textos a serem analisados")
+    priority: JobPriority = Field(JobPriority.BULK, description="Faixa de prioridade")
+
+
+class JobSubmitResponse(BaseModel):
+    """Job criado"""
+    job_id: str = Field(..., description="Identificador do job")
+    client_id: Optional[str] = Field(None, description="Identificador definido pelo cliente")
+    status: JobStatus = Field(..., description="Estado do job")
+    priority: JobPriority = Field(..., description="Faixa de prioridade")
+
+
+class JobBatchSubmitResponse(BaseModel):
+    """Jobs criados por uma submissão em lote"""
+    jobs: List[JobSubmitResponse] = Field(..., description="Um job por item, na ordem enviada")
+
+
+class JobStatusResponse(BaseModel):
+    """Estado e, quando concluído, resultado de um job"""
+    job_id: str = Field(..., description="Identificador do job")
+    client_id: Optional[str] = Field(None, description="Identificador definido pelo cliente")
+    status: JobStatus = Field(..., description="Estado do job")
+    priority: JobPriority = Field(..., description="Faixa de prioridade")
+    text_length: int = Field(..., description="Tamanho do texto em caracteres")
+    attempts: int = Field(..., description="Tentativas de execução")
+    created_at: float = Field(..., description="Criação (timestamp Unix)")
+    started_at: Optional[float] = Field(None, description="Início da última tentativa")
+    finished_at: Optional[float] = Field(None, description="Conclusão")
+    result: Optional[AnalysisResponse] = Field(None, description="Resultado, se concluído")
+    error: Optional[Dict[str, Any]] = Field(None, description="Erro, se falhou")
+
+
+class StreamMessageType(str, Enum):
+    """Tipos de mensagem aceitos pela análise incremental (WebSocket)"""
+    DELTA = "delta"
+    FLUSH = "flush"
+    RESET = "reset"
+
+
+class StreamMessage(BaseModel):
+    """Mensagem do cliente na análise incremental"""
+    type: StreamMessageType = Field(..., description="delta, flush ou reset")
+    text: str = Field("", description="Texto inserido (delta)")
+    start: Optional[int] = Field(None, ge=0, description="Início do trecho substituído; padrão: fim do documento")
+    end: Optional[int] = Field(None, ge=0, description="Fim (exclusivo) do trecho substituído; padrão: start")
@@ -0,0 +1,65 @@
+"""
+Estruturas internas dos resultados (dataclasses com slots)
+Serializadas direto pelo orjson, com o mesmo JSON dos modelos Pydantic
+de `app/core/models.py`, que continuam descrevendo o schema na documentação.
+Também monta as respostas e os erros de item usados pelas rotas e pela CLI
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from app.core.exceptions import VeritasException
+from app.core.models import ReliabilityLevel
+
+
+UNCERTAINTY_WARNING = (
+    "⚠️ Esta análise é uma estimativa baseada em padrões linguísticos e técnicas de "
+    "processamento de linguagem natural. Não é uma afirmação absoluta sobre a veracidade "
+    "do conteúdo. Sempre verifique informações importantes através de fontes confiáveis "
+    "e múltiplas referências. O modelo pode ter limitações e não substitui o pensamento crítico."
+)
+
+
+@dataclass(slots=True)
+class PhraseMatch:
+    """Frase suspeita encontrada no texto (campos de SuspiciousPhrase)"""
+    text: str
+    start_index: int
+    end_index: int
+    reason: str
+    confidence: float
+
+
+@dataclass(slots=True)
+class AnalysisPayload:
+    """Resposta de uma análise (campos e ordem de AnalysisResponse)"""
+    reliability_score: int
+    reliability_level: ReliabilityLevel
+    explanation: str
+    suspicious_phrases: List[PhraseMatch]
+    confidence: float
+    uncertainty_warning: str
+    metadata: Dict[str, Any]
+
+
+def build_payload(analysis_result: Dict) -> AnalysisPayload:
+    """
+    Resposta sem validação, serializada direto pelo orjson
+    
+    Os valores vêm do NLPService já nos tipos do schema; validar de novo
+    com AnalysisResponse (e com o `response_model` da rota) só custaria CPU.
+    """
+    return AnalysisPayload(
+        reliability_score=analysis_result["reliability_score"],
+        reliability_level=analysis_result["reliability_level"],
+        explanation=analysis_result["explanation"],
+        suspicious_phrases=analysis_result["suspicious_phrases"],
+        confidence=analysis_result["confidence"],
+        uncertainty_warning=UNCERTAINTY_WARNING,
+        metadata=analysis_result.get("metadata", {})
+    )
+
+
+def error_payload(exc: VeritasException) -> Dict:
+    """Formata um erro de item no mesmo formato do handler global"""
+    return {"error": exc.message, "details": exc.details, "status_code": exc.status_code}
@@ -0,0 +1,302 @@
+"""
+Servidor com vários workers e pesos do modelo compartilhados
+O processo pai carrega o modelo de sentimento uma única vez e faz fork dos
+workers do uvicorn depois disso: os pesos ficam em páginas compartilhadas
+por cópia na escrita, em vez de uma cópia por worker
+
+Cada worker executa o lifespan completo, mas só o de índice 0 (primário,
+`settings.PRIMARY_WORKER`) recupera e executa os jobs assíncronos e grava o
+snapshot de quase-duplicatas ao encerrar. Os demais aceitam submissões e
+consultas de jobs: gravam no banco compartilhado, e o primário os recolhe a
+cada `JOBS_POLL_INTERVAL_SECONDS`. Um worker 0 reiniciado continua primário.
+
+Uso (a partir de backend/; somente Linux/macOS):
+    python -m app.serve --workers 8 --port 8000
+"""
+
+import argparse
+import gc
+import os
+import select
+import signal
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.services.memory import read_process_memory
+
+
+# Worker que morre logo após o fork é reiniciado com atraso (evita laço de reinícios)
+MIN_WORKER_LIFETIME_SECONDS = 5.0
+RESTART_DELAY_SECONDS = 1.0
+
+# Tempo para os workers encerrarem após SIGTERM antes do SIGKILL
+SHUTDOWN_TIMEOUT_SECONDS = 30.0
+
+
+def _limit_threads(threads: int):
+    """Threads de inferência por worker (antes de importar torch no processo pai)"""
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    # O tokenizer rápido desativa o paralelismo após o fork; evitar o aviso
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def preload() -> Optional[str]:
+    """
+    Carrega o modelo principal no processo pai (retorna a origem carregada)
+    
+    Com o backend ONNX, cada worker carrega a própria sessão: o onnxruntime
+    cria pools de threads que não sobrevivem ao fork.
+    """
+    from app.services.backends import preload_transformers_model, resolve_model_source
+    
+    if settings.INFERENCE_BACKEND == "onnx":
+        print("Backend ONNX: o modelo é carregado em cada worker (sem pré-carregamento)")
+        return None
+    
+    source, local_only = resolve_model_source(settings)
+    start = time.perf_counter()
+    try:
+        preload_transformers_model(source, local_only=local_only)
+    except Exception as e:
+        # Os workers tentam de novo (e aplicam o fallback do NLPService)
+        print(f"Erro ao pré-carregar modelo '{source}': {e}")
+        return None
+    print(f"Modelo '{source}' carregado no processo pai em {(time.perf_counter() - start) * 1000:.0f} ms")
+    return source
+
+
+async def _report_when_ready(app, server, index: int, report_fd: int):
+    """Envia ao processo pai a memória do worker depois que o serviço fica pronto"""
+    import asyncio
+    
+    while not server.started:
+        await asyncio.sleep(0.05)
+    nlp_service = getattr(app.state, "nlp_service", None)
+    while nlp_service is not None and not nlp_service.initialized and nlp_service.startup_error is None:
+        await asyncio.sleep(0.1)
+    
+    report = {"worker": index, **read_process_memory()}
+    os.write(report_fd, orjson.dumps(report) + b"\n")
+
+
+async def _watch_parent(server, parent_pid: int):
+    """Encerra o worker se o processo pai morrer (sem supervisor, ninguém o reiniciaria)"""
+    import asyncio
+    
+    while os.getppid() == parent_pid:
+        await asyncio.sleep(1.0)
+    print(f"Processo pai {parent_pid} encerrou; finalizando worker {os.getpid()}")
+    server.should_exit = True
+
+
+async def _serve(app, server, sock, index: int, report_fd: int, parent_pid: int):
+    import asyncio
+    
+    tasks = [
+        asyncio.create_task(_report_when_ready(app, server, index, report_fd)),
+        asyncio.create_task(_watch_parent(server, parent_pid))
+    ]
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _run_worker(index: int, config, sock, report_fd: int, parent_pid: int):
+    """Corpo do processo filho: um servidor uvicorn no socket herdado"""
+    import asyncio
+    import uvicorn
+    
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)
+    # Objetos herdados continuam congelados; só os novos entram na coleta
+    gc.enable()
+    # Jobs e snapshot de quase-duplicatas ficam com um único worker
+    settings.PRIMARY_WORKER = index == 0
+    
+    config.setup_event_loop()
+    server = uvicorn.Server(config)
+    asyncio.run(_serve(config.app, server, sock, index, report_fd, parent_pid))
+
+
+class PreforkSupervisor:
+    """Faz fork dos workers a partir do processo pai e os reinicia se morrerem"""
+    
+    def __init__(self, config, num_workers: int):
+        self.config = config
+        self.num_workers = num_workers
+        self.sock = config.bind_socket()
+        self._read_fd, self._write_fd = os.pipe()
+        self.workers: Dict[int, int] = {}  # pid -> índice
+        self._started_at: Dict[int, float] = {}
+        self._reports: Dict[int, Dict] = {}
+        self._buffer = b""
+        self._reported_all = False
+        self.stopping = False
+    
+    def _spawn(self, index: int):
+        parent_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(self._read_fd)
+                _run_worker(index, self.config, self.sock, self._write_fd, parent_pid)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        
+        self.workers[pid] = index
+        self._started_at[index] = time.monotonic()
+    
+    def _handle_signal(self, signum, frame):
+        self.stopping = True
+    
+    def run(self) -> int:
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        
+        # Objetos do processo pai (incluindo o modelo) ficam fora da coleta de
+        # lixo, que de outro modo escreveria nos cabeçalhos e copiaria as páginas
+        gc.freeze()
+        for index in range(self.num_workers):
+            self._spawn(index)
+        print(f"{self.num_workers} workers iniciados em "
+              f"http://{self.config.host}:{self.config.port} (pai: PID {os.getpid()})")
+        
+        while not self.stopping:
+            self._read_reports(timeout=0.5)
+            self._reap()
+        
+        self._shutdown()
+        return 0
+    
+    def _reap(self):
+        """Recolhe workers encerrados e inicia substitutos"""
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            index = self.workers.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            
+            print(f"Worker {index} (PID {pid}) encerrou com código {os.waitstatus_to_exitcode(status)}; reiniciando")
+            if time.monotonic() - self._started_at[index] < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(RESTART_DELAY_SECONDS)
+            self._spawn(index)
+    
+    def _read_reports(self, timeout: float):
+        readable, _, _ = select.select([self._read_fd], [], [], timeout)
+        if not readable:
+            return
+        
+        self._buffer += os.read(self._read_fd, 65536)
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            report = orjson.loads(line)
+            self._reports[report["worker"]] = report
+            if self._reported_all:
+                print(f"Worker {report['worker']} (PID {report['pid']}) pronto: "
+                      f"RSS {report.get('rss_mb', 0):.0f} MB, PSS {report.get('pss_mb', 0):.0f} MB")
+        
+        if not self._reported_all and len(self._reports) == self.num_workers:
+            self._reported_all = True
+            print(format_memory_report(
+                read_process_memory(), [self._reports[index] for index in sorted(self._reports)]
+            ))
+    
+    def _shutdown(self):
+        """Encerra os workers (SIGTERM e, após o prazo, SIGKILL)"""
+        print("Encerrando workers...")
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS
+        while self.workers and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.clear()
+        self.sock.close()
+
+
+def format_memory_report(parent: Dict, workers: List[Dict]) -> str:
+    """Tabela de memória por processo; a soma dos PSS é a ocupação real"""
+    rows = [("pai", parent)] + [(str(report["worker"]), report) for report in workers]
+    lines = [
+        "Memória por processo (MB):",
+        f"  {'worker':>6} {'PID':>8} {'RSS':>9} {'PSS':>9} {'compart.':>9} {'privada':>9}"
+    ]
+    for name, report in rows:
+        lines.append(
+            f"  {name:>6} {report['pid']:>8} {report.get('rss_mb', 0):>9.1f} {report.get('pss_mb', 0):>9.1f} "
+            f"{report.get('shared_mb', 0):>9.1f} {report.get('private_mb', 0):>9.1f}"
+        )
+    total_rss = sum(report.get("rss_mb", 0) for _, report in rows)
+    total_pss = sum(report.get("pss_mb", 0) for _, report in rows)
+    lines.append(f"  Total: PSS {total_pss:.1f} MB (soma dos RSS: {total_rss:.1f} MB)")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.serve",
+        description="Servidor com vários workers que compartilham os pesos do modelo"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos do uvicorn")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--threads", type=int, default=None,
+        help="threads de inferência por worker (padrão: CPUs / workers)"
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not hasattr(os, "fork"):
+        print("O modo prefork exige fork() (Linux/macOS); use uvicorn --workers")
+        return 2
+    
+    # O coletor fica desligado até o fork: objetos criados no carregamento
+    # não são movidos entre gerações (o que também escreveria nas páginas)
+    gc.disable()
+    workers = max(1, args.workers)
+    _limit_threads(args.threads or max(1, (os.cpu_count() or 1) // workers))
+    
+    if settings.INFERENCE_WORKERS > 0:
+        print("Modo prefork: INFERENCE_WORKERS ignorado (a inferência roda em cada worker)")
+        settings.INFERENCE_WORKERS = 0
+    
+    preload()
+    
+    import uvicorn
+    import main as api
+    
+    config = uvicorn.Config(api.app, host=args.host, port=args.port, log_level=args.log_level)
+    return PreforkSupervisor(config, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
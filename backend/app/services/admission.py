@@ -0,0 +1,371 @@
+"""
+Controle de admissão das análises
+Limite de taxa por cliente (token bucket) e fila justa entre clientes
+(round-robin ponderado) na frente de NLPService.analyze_text
+"""
+
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass
+from typing import AsyncContextManager, AsyncIterator, Dict, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.exceptions import RateLimitedException
+
+
+@dataclass(slots=True)
+class Client:
+    """Cliente identificado pela chave de API (resumida) ou pelo IP"""
+    key: str
+    weight: int = 1
+
+
+def identify_client(api_key: Optional[str], host: Optional[str], weights: Dict[str, int]) -> Client:
+    """
+    Cliente de uma requisição
+    
+    A chave de API não é guardada: o estado usa um resumo SHA-256 dela.
+    Sem chave, o cliente é o IP de origem.
+    """
+    if api_key:
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return Client(f"key:{digest}", max(1, weights.get(api_key, 1)))
+    return Client(f"ip:{host or 'desconhecido'}")
+
+
+def _refill(tokens: float, updated_at: float, rate: float, burst: float, cost: float, now: float) -> Tuple[float, float]:
+    """
+    Saldo do balde após a retirada e espera até haver tokens (0 se admitido)
+    
+    Um custo acima de `burst` (lotes de jobs) é admitido com o balde cheio
+    e deixa o saldo negativo: o cliente paga a diferença esperando a reposição.
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return tokens - cost, 0.0
+    return tokens, (needed - tokens) / rate
+
+
+class MemoryRateLimitBackend:
+    """Baldes em memória do processo, limitados aos clientes mais recentes"""
+    
+    def __init__(self, max_clients: int = 100000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+    
+    def take(self, key: str, rate: float, burst: float, cost: float, now: float) -> float:
+        """Retira `cost` tokens do balde; retorna os segundos de espera (0 se admitido)"""
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens, wait = _refill(tokens, updated_at, rate, burst, cost, now)
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            # O cliente mais antigo volta com o balde cheio
+            self._buckets.popitem(last=False)
+        return wait
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def close(self):
+        self._buckets.clear()
+
+
+class SQLiteRateLimitBackend:
+    """
+    Baldes em um arquivo SQLite local, compartilhados pelos workers do uvicorn
+    
+    Cada retirada é uma transação `BEGIN IMMEDIATE`, então processos
+    concorrentes não gastam o mesmo token duas vezes.
+    """
+    
+    def __init__(self, path: str, max_clients: int = 100000):
+        self.path = path
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+    
+    def take(self, key: str, rate: float, burst: float, cost: float, now: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, wait = _refill(*(row or (burst, now)), rate, burst, cost, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune(now - burst / rate)
+        return wait
+    
+    def _prune(self, full_before: float):
+        """Remove baldes que já estariam cheios e os mais antigos acima do limite"""
+        self._conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (full_before,))
+        self._conn.execute(
+            "DELETE FROM rate_limit_buckets WHERE key IN ("
+            " SELECT key FROM rate_limit_buckets ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_clients,)
+        )
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Token bucket por cliente: `rate` análises por segundo, rajadas de até `burst`"""
+    
+    def __init__(self, rate: float, burst: int, backend=None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.shared = isinstance(self.backend, SQLiteRateLimitBackend)
+        
+        # Métricas
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+    
+    async def _take(self, client: Client, cost: float) -> float:
+        now = time.time()
+        if self.shared:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.backend.take, client.key, self.rate, self.burst, cost, now)
+        return self.backend.take(client.key, self.rate, self.burst, cost, now)
+    
+    async def acquire(self, client: Client, max_wait: float = 0.0, cost: int = 1):
+        """
+        Consome `cost` tokens do cliente (um por análise)
+        
+        Sem tokens, aguarda a reposição por até `max_wait` segundos; se a
+        espera necessária for maior, levanta RateLimitedException.
+        """
+        deadline = time.monotonic() + max_wait
+        delayed = False
+        while True:
+            wait = await self._take(client, float(cost))
+            if wait <= 0:
+                self.admitted += cost
+                self.delayed += delayed
+                return
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                raise RateLimitedException(retry_after=max(1, math.ceil(wait)), limit_per_second=self.rate)
+            delayed = True
+            await asyncio.sleep(wait)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "backend": "sqlite" if self.shared else "memory",
+            "clients": len(self.backend),
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": self.rejected
+        }
+    
+    def close(self):
+        self.backend.close()
+
+
+class FairScheduler:
+    """
+    Fila justa entre clientes na frente do serviço de análise
+    
+    No máximo `max_concurrency` análises ficam em andamento; as demais
+    aguardam em uma fila por cliente. A cada análise concluída, a vez passa
+    ao próximo cliente em round-robin, e cada cliente é atendido até `weight`
+    vezes por rodada. Um cliente com milhares de itens de lote na fila atrasa
+    os demais em no máximo uma rodada, em vez de ocupar toda a fila de
+    inferência. O estado é do processo (cada worker do uvicorn tem o seu).
+    """
+    
+    def __init__(self, max_concurrency: int = 32):
+        self.max_concurrency = max(1, max_concurrency)
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._credits: Dict[str, int] = {}
+        self._weights: Dict[str, int] = {}
+        self._running = 0
+        
+        # Métricas
+        self.immediate = 0
+        self.queued = 0
+    
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+    
+    @asynccontextmanager
+    async def slot(self, client: Client) -> AsyncIterator[None]:
+        """Aguarda a vez do cliente e ocupa uma vaga até o fim do bloco"""
+        if self._running < self.max_concurrency and not self._queues:
+            self._running += 1
+            self.immediate += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            queue = self._queues.get(client.key)
+            if queue is None:
+                queue = self._queues[client.key] = deque()
+                self._credits[client.key] = client.weight
+            self._weights[client.key] = client.weight
+            queue.append(future)
+            self.queued += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # A vaga foi concedida junto com o cancelamento: devolvê-la
+                    self._release()
+                else:
+                    self._discard(client.key, future)
+                raise
+        
+        try:
+            yield
+        finally:
+            self._release()
+    
+    def _discard(self, key: str, future: asyncio.Future):
+        queue = self._queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._queues[key]
+                del self._credits[key]
+    
+    def _release(self):
+        self._running -= 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        """Concede as vagas livres aos clientes na ordem do round-robin"""
+        while self._running < self.max_concurrency and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._credits[key] -= 1
+            if not queue:
+                del self._queues[key]
+                del self._credits[key]
+            elif self._credits[key] <= 0:
+                # Créditos da rodada esgotados: o cliente vai para o fim
+                self._queues.move_to_end(key)
+                self._credits[key] = self._weights[key]
+            
+            if future.cancelled():
+                continue
+            self._running += 1
+            future.set_result(None)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "waiting": self.waiting,
+            "clients_waiting": len(self._queues),
+            "immediate": self.immediate,
+            "queued": self.queued
+        }
+
+
+class AdmissionController:
+    """Limite de taxa seguido da fila justa, por cliente"""
+    
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        scheduler: Optional[FairScheduler] = None,
+        weights: Optional[Dict[str, int]] = None
+    ):
+        self.limiter = limiter
+        self.scheduler = scheduler
+        self.weights = weights or {}
+    
+    def identify(self, api_key: Optional[str], host: Optional[str]) -> Client:
+        return identify_client(api_key, host, self.weights)
+    
+    async def charge(self, client: Client, scope: str, cost: int = 1, max_wait: float = 0.0):
+        """Cobra `cost` análises do limite de taxa do cliente, sem ocupar a fila justa"""
+        if self.limiter:
+            try:
+                await self.limiter.acquire(client, max_wait, cost)
+            except RateLimitedException:
+                metrics.RATE_LIMITED_TOTAL.inc(scope=scope)
+                raise
+    
+    @asynccontextmanager
+    async def admit(self, client: Client, scope: str = "analyze", max_wait: float = 0.0) -> AsyncIterator[None]:
+        """
+        Admite uma análise do cliente
+        
+        O token é retirado antes da fila, para que requisições acima do
+        limite sejam rejeitadas sem ocupar lugar nela.
+        """
+        await self.charge(client, scope, max_wait=max_wait)
+        
+        if self.scheduler:
+            async with self.scheduler.slot(client):
+                yield
+        else:
+            yield
+    
+    def slot(self, client: Client) -> AsyncContextManager:
+        """Vaga na fila justa sem cobrar o limite de taxa (já cobrado na submissão)"""
+        return self.scheduler.slot(client) if self.scheduler else nullcontext()
+    
+    def get_stats(self) -> Dict:
+        return {
+            "rate_limit": self.limiter.get_stats() if self.limiter else None,
+            "fair_scheduling": self.scheduler.get_stats() if self.scheduler else None
+        }
+    
+    def close(self):
+        if self.limiter:
+            self.limiter.close()
+
+
+def create_admission_controller() -> Optional[AdmissionController]:
+    """Controle de admissão conforme as configurações (None se tudo desativado)"""
+    limiter = None
+    if settings.RATE_LIMIT_ENABLED:
+        backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_CLIENTS)
+        if settings.RATE_LIMIT_SQLITE_PATH:
+            try:
+                backend = SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_MAX_CLIENTS)
+            except Exception as e:
+                print(f"Erro ao abrir estado compartilhado do limite de taxa: {e}")
+        limiter = RateLimiter(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST, backend)
+    
+    scheduler = FairScheduler(settings.FAIR_MAX_CONCURRENCY) if settings.FAIR_SCHEDULING_ENABLED else None
+    if limiter is None and scheduler is None:
+        return None
+    return AdmissionController(limiter, scheduler, settings.CLIENT_WEIGHTS)
@@ -0,0 +1,114 @@
+"""
+Atribuições por token do modelo de sentimento (oclusão em lote)
+Cada trecho de uma janela é substituído pelo token de máscara e a queda na
+probabilidade do rótulo previsto mede quanto o trecho contribuiu para ele
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.payloads import PhraseMatch
+
+
+# Versão do método; alterar invalida as explicações em cache
+ATTRIBUTION_VERSION = "occlusion-1"
+
+
+def occlusion_token_id(tokenizer) -> int:
+    """Token que substitui o trecho ocluído (máscara, desconhecido ou padding)"""
+    for name in ("mask_token_id", "unk_token_id", "pad_token_id"):
+        token_id = getattr(tokenizer, name, None)
+        if token_id is not None:
+            return token_id
+    return 0
+
+
+def word_spans(offsets: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Agrupa tokens em palavras: (token inicial, token final exclusivo)
+    
+    Um token começa uma nova palavra quando há espaço entre ele e o
+    anterior; subpalavras e pontuação colada ficam na mesma palavra.
+    """
+    spans = []
+    start = 0
+    for index in range(1, len(offsets)):
+        if offsets[index, 0] > offsets[index - 1, 1]:
+            spans.append((start, index))
+            start = index
+    if len(offsets):
+        spans.append((start, len(offsets)))
+    return spans
+
+
+def group_spans(spans: List[Tuple[int, int]], max_spans: int) -> Tuple[List[Tuple[int, int]], int]:
+    """Junta palavras vizinhas para no máximo `max_spans` trechos (trechos, palavras por trecho)"""
+    words_per_span = max(1, -(-len(spans) // max(1, max_spans)))
+    if words_per_span == 1:
+        return spans, 1
+    grouped = [
+        (spans[index][0], spans[min(index + words_per_span, len(spans)) - 1][1])
+        for index in range(0, len(spans), words_per_span)
+    ]
+    return grouped, words_per_span
+
+
+def occluded_inputs(
+    body_ids: Sequence[int],
+    spans: List[Tuple[int, int]],
+    mask_id: int,
+    tokenizer
+) -> List[List[int]]:
+    """Entrada original seguida de uma variante por trecho ocluído (com tokens especiais)"""
+    body = list(body_ids)
+    inputs = [tokenizer.build_inputs_with_special_tokens(body)]
+    for start, end in spans:
+        occluded = body[:start] + [mask_id] * (end - start) + body[end:]
+        inputs.append(tokenizer.build_inputs_with_special_tokens(occluded))
+    return inputs
+
+
+def span_attributions(scores: List[Dict[str, float]]) -> Tuple[str, float, np.ndarray]:
+    """
+    Rótulo previsto na entrada original, sua probabilidade e a queda
+    dessa probabilidade em cada variante (positivo: o trecho sustenta o rótulo)
+    """
+    original = scores[0]
+    label = max(original, key=original.get)
+    occluded = np.fromiter((variant[label] for variant in scores[1:]), dtype=np.float64, count=len(scores) - 1)
+    return label, original[label], original[label] - occluded
+
+
+def merge_with_phrases(
+    spans: List[Dict],
+    suspicious_phrases: List[PhraseMatch]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Cruza os trechos pontuados com as frases suspeitas
+    
+    Cada trecho recebe as razões das frases suspeitas que o sobrepõem; cada
+    frase suspeita dentro da janela recebe a soma das atribuições dos
+    trechos que a sobrepõem.
+    """
+    for span in spans:
+        span["suspicious_reasons"] = list(dict.fromkeys(
+            phrase.reason for phrase in suspicious_phrases
+            if phrase.start_index < span["end_index"] and span["start_index"] < phrase.end_index
+        ))
+    
+    phrases = []
+    for phrase in suspicious_phrases:
+        overlapping = [
+            span["attribution"] for span in spans
+            if phrase.start_index < span["end_index"] and span["start_index"] < phrase.end_index
+        ]
+        if overlapping:
+            phrases.append({
+                "text": phrase.text,
+                "start_index": phrase.start_index,
+                "end_index": phrase.end_index,
+                "reason": phrase.reason,
+                "attribution": round(float(sum(overlapping)), 4)
+            })
+    return spans, phrases
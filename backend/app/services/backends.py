@@ -0,0 +1,302 @@
+"""
+Backends de inferência do modelo de sentimento
+PyTorch (padrão) ou ONNX Runtime com quantização int8 opcional para CPU
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    """Softmax numericamente estável por linha"""
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def pad_batch(batch_ids: List[List[int]], pad_token_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Monta as matrizes input_ids/attention_mask com padding à direita"""
+    max_length = max(len(ids) for ids in batch_ids)
+    input_ids = np.full((len(batch_ids), max_length), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(batch_ids), max_length), dtype=np.int64)
+    
+    for row, ids in enumerate(batch_ids):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    
+    return input_ids, attention_mask
+
+
+def _to_label_scores(probabilities: np.ndarray, id2label: Dict[int, str]) -> List[Dict[str, float]]:
+    """Converte a matriz de probabilidades em dicionários rótulo -> score"""
+    return [
+        {id2label[index]: float(score) for index, score in enumerate(row)}
+        for row in probabilities
+    ]
+
+
+class TorchSentimentBackend:
+    """Executa o modelo PyTorch diretamente sobre lotes de token ids"""
+    
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.name = "torch"
+        self.model.eval()
+    
+    def predict(self, batch_ids: List[List[int]]) -> List[Dict[str, float]]:
+        """Retorna as probabilidades por rótulo de cada sequência do lote"""
+        import torch
+        
+        input_ids, attention_mask = pad_batch(batch_ids, self.tokenizer.pad_token_id)
+        
+        with torch.inference_mode():
+            logits = self.model(
+                input_ids=torch.from_numpy(input_ids).to(self.model.device),
+                attention_mask=torch.from_numpy(attention_mask).to(self.model.device)
+            ).logits
+        
+        return _to_label_scores(
+            torch.softmax(logits.float(), dim=-1).cpu().numpy(),
+            self.model.config.id2label
+        )
+
+
+class OnnxSentimentBackend:
+    """
+    Executa o modelo exportado para ONNX com onnxruntime
+    
+    O modelo é exportado uma única vez para `ONNX_MODEL_DIR` (junto com o
+    tokenizer e a configuração), então carregamentos seguintes não precisam
+    de PyTorch.
+    """
+    
+    MODEL_FILE = "model.onnx"
+    QUANTIZED_MODEL_FILE = "model.int8.onnx"
+    
+    def __init__(self, session, tokenizer, id2label: Dict[int, str], quantized: bool = False):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.id2label = id2label
+        self.quantized = quantized
+        self.name = "onnx-int8" if quantized else "onnx"
+        self._input_names = {model_input.name for model_input in session.get_inputs()}
+    
+    @staticmethod
+    def model_dir(base_dir: str, model_name: str) -> Path:
+        """Diretório de exportação de um modelo"""
+        return Path(base_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+    
+    @classmethod
+    def export(cls, model_name: str, output_dir: Path, quantize: bool = False) -> Path:
+        """Exporta o modelo para ONNX (e opcionalmente quantiza para int8)"""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        model_path = output_dir / cls.MODEL_FILE
+        
+        if not model_path.exists():
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            model.eval()
+            
+            sample = tokenizer(["Texto de exemplo para exportação"], return_tensors="pt")
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                str(model_path),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=14,
+                do_constant_folding=True,
+            )
+            tokenizer.save_pretrained(output_dir)
+            model.config.save_pretrained(output_dir)
+        
+        if not quantize:
+            return model_path
+        
+        quantized_path = output_dir / cls.QUANTIZED_MODEL_FILE
+        if not quantized_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            
+            quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        
+        return quantized_path
+    
+    @classmethod
+    def load(
+        cls,
+        model_name: str,
+        base_dir: str,
+        quantize: bool = False,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0
+    ) -> "OnnxSentimentBackend":
+        """Exporta (se necessário) e abre uma sessão do onnxruntime"""
+        import onnxruntime as ort
+        from transformers import AutoConfig
+        
+        output_dir = cls.model_dir(base_dir, model_name)
+        model_path = cls.export(model_name, output_dir, quantize=quantize)
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+        
+        session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        tokenizer = load_fast_tokenizer(str(output_dir), local_only=True)
+        config = AutoConfig.from_pretrained(output_dir)
+        
+        return cls(session, tokenizer, config.id2label, quantized=quantize)
+    
+    def predict(self, batch_ids: List[List[int]]) -> List[Dict[str, float]]:
+        """Retorna as probabilidades por rótulo de cada sequência do lote"""
+        input_ids, attention_mask = pad_batch(batch_ids, self.tokenizer.pad_token_id)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        inputs = {name: value for name, value in inputs.items() if name in self._input_names}
+        
+        logits = self.session.run(["logits"], inputs)[0]
+        return _to_label_scores(_softmax(logits.astype(np.float32)), self.id2label)
+
+
+def resolve_model_source(settings) -> Tuple[str, bool]:
+    """
+    Origem do modelo de sentimento: (nome ou diretório, somente local)
+    
+    Com NLP_MODEL_PATH, o modelo vem de um diretório local fixado e o
+    acesso ao Hugging Face Hub é desativado no processo.
+    """
+    if settings.NLP_MODEL_PATH:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+        return settings.NLP_MODEL_PATH, True
+    return settings.NLP_MODEL_NAME, False
+
+
+def require_fast_tokenizer(tokenizer, source: str):
+    """
+    Garante o tokenizer rápido (Rust, biblioteca `tokenizers`)
+    
+    As janelas de sentimento dependem de `offset_mapping`, que só existe
+    nos tokenizers rápidos; o tokenizer em Python puro também é bem mais lento.
+    """
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError(
+            f"Tokenizer rápido indisponível para '{source}'. "
+            "Verifique se o pacote `tokenizers` está instalado e se o modelo inclui tokenizer.json."
+        )
+    return tokenizer
+
+
+def load_fast_tokenizer(source: str, local_only: bool = False):
+    """Carrega o tokenizer do modelo exigindo a implementação rápida"""
+    from transformers import AutoTokenizer
+    
+    tokenizer = AutoTokenizer.from_pretrained(source, use_fast=True, local_files_only=local_only)
+    return require_fast_tokenizer(tokenizer, source)
+
+
+def load_transformers_model(source: str, local_only: bool = False):
+    """
+    Carrega tokenizer (rápido) e modelo de classificação
+    
+    Em modo local, exige pesos safetensors, que são mapeados em memória
+    em vez de desserializados para a RAM.
+    """
+    from transformers import AutoModelForSequenceClassification
+    
+    tokenizer = load_fast_tokenizer(source, local_only=local_only)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        source,
+        local_files_only=local_only,
+        use_safetensors=True if local_only else None
+    )
+    return tokenizer, model
+
+
+# Modelos carregados pelo lançador prefork antes do fork: origem -> (tokenizer, modelo)
+_PRELOADED: Dict[str, Tuple[object, object]] = {}
+
+
+def preload_transformers_model(source: str, local_only: bool = False):
+    """
+    Carrega o modelo no processo pai, antes do fork dos workers (app.serve)
+    
+    Os filhos herdam os pesos em páginas compartilhadas por cópia na
+    escrita. O modelo fica em modo de avaliação e sem gradientes, para que
+    a inferência nunca escreva nessas páginas.
+    """
+    tokenizer, model = load_transformers_model(source, local_only=local_only)
+    model.eval()
+    model.requires_grad_(False)
+    _PRELOADED[source] = (tokenizer, model)
+    return tokenizer, model
+
+
+def preloaded_model(source: str) -> Optional[Tuple[object, object]]:
+    """Tokenizer e modelo herdados do processo pai, se houver"""
+    return _PRELOADED.get(source)
+
+
+def load_onnx_backend(model_name: str, settings) -> Optional[OnnxSentimentBackend]:
+    """Carrega o backend ONNX conforme as configurações (None se indisponível)"""
+    try:
+        return OnnxSentimentBackend.load(
+            model_name,
+            settings.ONNX_MODEL_DIR,
+            quantize=settings.ONNX_QUANTIZE,
+            intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+            inter_op_threads=settings.ONNX_INTER_OP_THREADS
+        )
+    except Exception as e:
+        print(f"Backend ONNX indisponível, usando PyTorch: {e}")
+        return None
+
+
+def load_sentiment_backend(model_name: str, settings, num_threads: int = 0):
+    """
+    Carrega o backend configurado fora do pipeline (usado pelos workers)
+    
+    Com `num_threads > 0`, limita as threads do PyTorch/onnxruntime do
+    processo atual.
+    """
+    if settings.INFERENCE_BACKEND == "onnx":
+        try:
+            return OnnxSentimentBackend.load(
+                model_name,
+                settings.ONNX_MODEL_DIR,
+                quantize=settings.ONNX_QUANTIZE,
+                intra_op_threads=num_threads or settings.ONNX_INTRA_OP_THREADS,
+                inter_op_threads=1 if num_threads else settings.ONNX_INTER_OP_THREADS
+            )
+        except Exception as e:
+            print(f"Backend ONNX indisponível, usando PyTorch: {e}")
+    
+    import torch
+    
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+        torch.set_num_interop_threads(1)
+    
+    _, local_only = resolve_model_source(settings)
+    tokenizer, model = load_transformers_model(model_name, local_only=local_only)
+    return TorchSentimentBackend(model, tokenizer)
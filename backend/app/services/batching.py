@@ -0,0 +1,307 @@
+"""
+Micro-batching dinâmico para inferência de modelos
+Agrupa requisições concorrentes em um único lote antes de chamar o modelo
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.exceptions import ServiceOverloadedException
+
+
+# Prioridades da fila de inferência (menor sai primeiro)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+_priority: ContextVar[int] = ContextVar("inference_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """
+    Inferências submetidas dentro do bloco (e das tarefas criadas nele) vão
+    para a faixa de baixa prioridade de todas as filas de inferência
+    """
+    token = _priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class MicroBatcher:
+    """
+    Fila de inferência que agrupa entradas concorrentes em lotes.
+    
+    Cada chamada a `submit` entra em uma fila; um worker coleta até
+    `max_batch_size` itens ou aguarda no máximo `max_wait_ms` após o
+    primeiro item, executa `infer_fn` uma única vez com o lote inteiro
+    e devolve a cada coroutine o seu resultado.
+    
+    `infer_fn` pode ser síncrona (executada no thread pool padrão) ou uma
+    coroutine (por exemplo, um pool de processos de inferência). Até
+    `max_concurrency` lotes ficam em execução ao mesmo tempo; enquanto
+    todos estão ocupados, novos itens se acumulam em lotes maiores. Com
+    `max_queue_size`, a fila é limitada e o excesso é rejeitado com
+    ServiceOverloadedException (HTTP 429).
+    
+    Itens submetidos sob `background_priority()` (jobs) só entram em um
+    lote quando não há itens interativos aguardando, e não contam no limite
+    da fila para os itens interativos: um reprocessamento em massa atrasa
+    uma requisição interativa em no máximo um lote já em execução.
+    
+    Com as métricas ativas, cada item registra o tempo de espera na fila e
+    a duração do forward do seu lote nos tempos da requisição de origem.
+    `latency_observer`, se informado, recebe a latência de cada lote
+    concluído com itens interativos (espera do item interativo mais antigo
+    + forward), em segundos; lotes só de baixa prioridade não contam.
+    """
+    
+    def __init__(
+        self,
+        infer_fn: Callable[[List[Any]], Any],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        max_concurrency: int = 1,
+        max_queue_size: int = 0,
+        retry_after_seconds: int = 1,
+        latency_observer: Optional[Callable[[float], None]] = None,
+    ):
+        self.infer_fn = infer_fn
+        self.latency_observer = latency_observer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.retry_after_seconds = retry_after_seconds
+        self._is_async = asyncio.iscoroutinefunction(infer_fn)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._waiting = [0, 0]  # itens na fila por prioridade
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[asyncio.Task, List[Tuple]] = {}
+        
+        # Métricas
+        self.batches_total = 0
+        self.items_total = 0
+        self.max_batch_seen = 0
+        self.errors_total = 0
+        self.rejected_total = 0
+        self.batch_size_counts: Dict[int, int] = {}
+    
+    @property
+    def queue_depth(self) -> int:
+        """Número de itens aguardando para entrar em um lote"""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    def _put(self, entry: Tuple):
+        priority = entry[4]
+        self._waiting[priority] += 1
+        # A sequência mantém a ordem de chegada dentro da prioridade
+        self._queue.put_nowait((priority, next(self._sequence), entry))
+    
+    def _taken(self, queued: Tuple) -> Tuple:
+        self._waiting[queued[0]] -= 1
+        return queued[2]
+    
+    def _ensure_worker(self):
+        """Cria a fila e o worker no event loop atual (sob demanda)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.PriorityQueue()
+            self._waiting = [0, 0]
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    def _check_capacity(self, count: int, priority: int):
+        """
+        Rejeita novos itens se a fila limitada não comporta todos eles
+        
+        Itens interativos só disputam espaço entre si; os de baixa
+        prioridade contam a fila inteira.
+        """
+        depth = self._waiting[PRIORITY_INTERACTIVE] if priority == PRIORITY_INTERACTIVE else self.queue_depth
+        if self.max_queue_size and depth + count > self.max_queue_size:
+            self.rejected_total += count
+            raise ServiceOverloadedException(
+                retry_after=self.retry_after_seconds,
+                details={"queue_depth": self.queue_depth, "max_queue_size": self.max_queue_size}
+            )
+    
+    async def submit(self, item: Any) -> Any:
+        """Enfileira um item e aguarda o resultado do lote"""
+        return (await self.submit_many([item]))[0]
+    
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        """
+        Enfileira vários itens de uma vez (tudo ou nada) e aguarda os resultados
+        
+        Itens enviados juntos entram na fila em sequência e tendem a cair
+        no mesmo lote.
+        """
+        self._ensure_worker()
+        priority = _priority.get()
+        self._check_capacity(len(items), priority)
+        
+        loop = asyncio.get_running_loop()
+        timings = metrics.current_timings()
+        enqueued_at = time.perf_counter()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._put((item, future, enqueued_at, timings, priority))
+            futures.append(future)
+        
+        return list(await asyncio.gather(*futures))
+    
+    async def _collect(self) -> List[Tuple]:
+        """Coleta um lote respeitando o tamanho máximo e a janela de espera"""
+        batch = [self._taken(await self._queue.get())]
+        deadline = time.monotonic() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._taken(await asyncio.wait_for(self._queue.get(), remaining)))
+            except asyncio.TimeoutError:
+                break
+        
+        # Aproveitar o que já está na fila sem esperar mais
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._taken(self._queue.get_nowait()))
+        
+        return batch
+    
+    async def _run(self):
+        """Loop principal: reserva um slot de execução e então forma o lote"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            
+            # Ignorar requisições canceladas enquanto aguardavam
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
+            
+            self._record_batch(len(batch))
+            task = loop.create_task(self._process(batch))
+            self._inflight[task] = batch
+            task.add_done_callback(self._batch_done)
+    
+    def _batch_done(self, task: asyncio.Task):
+        """Libera o slot de execução de um lote concluído"""
+        self._inflight.pop(task, None)
+        if self._slots is not None:
+            self._slots.release()
+    
+    async def _process(self, batch: List[Tuple]):
+        """Executa a inferência de um lote e distribui os resultados"""
+        items = [entry[0] for entry in batch]
+        started = time.perf_counter()
+        
+        try:
+            if self._is_async:
+                results = await self.infer_fn(items)
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(None, self.infer_fn, items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Lote de {len(items)} itens retornou {len(results)} resultados"
+                )
+        except Exception as e:
+            self.errors_total += 1
+            for entry in batch:
+                if not entry[1].done():
+                    entry[1].set_exception(e)
+            return
+        
+        finished = time.perf_counter()
+        if metrics.enabled():
+            self._record_timings(batch, started, finished)
+        if self.latency_observer is not None:
+            interactive = [entry[2] for entry in batch if entry[4] == PRIORITY_INTERACTIVE]
+            if interactive:
+                self.latency_observer(finished - min(interactive))
+        
+        for (_, future, _, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    @staticmethod
+    def _record_timings(batch: List[Tuple], started: float, finished: float):
+        """Registra espera na fila e forward do lote (histogramas e requisições)"""
+        forward = finished - started
+        metrics.STAGE_DURATION.observe(forward, stage="model_forward")
+        metrics.INFERENCE_BATCH_SIZE.observe(len(batch))
+        
+        for _, _, enqueued_at, timings, _ in batch:
+            wait = started - enqueued_at
+            metrics.STAGE_DURATION.observe(wait, stage="queue_wait")
+            metrics.record_request_max(timings, "queue_wait", wait)
+            metrics.record_request_max(timings, "model_forward", forward)
+    
+    def _record_batch(self, size: int):
+        """Atualiza as métricas de tamanho de lote"""
+        self.batches_total += 1
+        self.items_total += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+    
+    def get_stats(self) -> Dict:
+        """Retorna métricas da fila e dos lotes"""
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_depth_background": self._waiting[PRIORITY_BACKGROUND],
+            "batches_in_flight": len(self._inflight),
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "avg_batch_size": (
+                round(self.items_total / self.batches_total, 2) if self.batches_total else 0.0
+            ),
+            "max_batch_size_seen": self.max_batch_seen,
+            "errors_total": self.errors_total,
+            "rejected_total": self.rejected_total,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+        }
+    
+    async def close(self):
+        """Encerra o worker e cancela as requisições pendentes"""
+        pending = [entry for batch in self._inflight.values() for entry in batch]
+        
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        
+        for task in list(self._inflight):
+            task.cancel()
+        
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._taken(self._queue.get_nowait()))
+            self._queue = None
+        
+        for entry in pending:
+            if not entry[1].done():
+                entry[1].cancel()
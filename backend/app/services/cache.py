@@ -0,0 +1,301 @@
+"""
+Cache de resultados de análise
+Resultados endereçados pelo conteúdo do texto, com LRU + TTL em memória
+e um segundo nível opcional em SQLite compartilhado entre processos.
+Também guarda tokenizações já feitas (EncodingCache)
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.core.models import ReliabilityLevel
+from app.core.payloads import PhraseMatch
+
+
+# Versão do formato serializado; alterar invalida o segundo nível
+CACHE_FORMAT_VERSION = "1"
+
+
+def make_cache_key(text: str, version: str) -> str:
+    """
+    Gera a chave do cache a partir do texto e da versão do pipeline
+    
+    O texto não é normalizado além do `strip` feito na validação: as
+    posições de `suspicious_phrases` são índices no texto original, então
+    textos que diferem apenas em espaços ou forma Unicode não podem
+    compartilhar o mesmo resultado.
+    """
+    digest = hashlib.sha256()
+    digest.update(CACHE_FORMAT_VERSION.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.strip().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def serialize_analysis(result: Dict) -> str:
+    """Serializa um resultado de `NLPService.analyze_text` em JSON (orjson lê as dataclasses e o enum)"""
+    return orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+
+def deserialize_analysis(data: str) -> Dict:
+    """Reconstrói um resultado serializado por `serialize_analysis`"""
+    result = orjson.loads(data)
+    result["reliability_level"] = ReliabilityLevel(result["reliability_level"])
+    result["suspicious_phrases"] = [PhraseMatch(**phrase) for phrase in result["suspicious_phrases"]]
+    return result
+
+
+class SQLiteCacheBackend:
+    """
+    Segundo nível do cache em um arquivo SQLite local
+    
+    Usa WAL para permitir leituras concorrentes de vários workers do uvicorn
+    apontando para o mesmo arquivo.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache(created_at)"
+        )
+    
+    def get(self, key: str) -> Optional[str]:
+        """Retorna o valor serializado, ou None se ausente ou expirado"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+    
+    def set(self, key: str, value: str, ttl_seconds: float):
+        """Armazena um valor e remove periodicamente entradas antigas"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl_seconds, now)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune(now)
+    
+    def _prune(self, now: float):
+        """Remove entradas expiradas e as mais antigas acima do limite"""
+        self._conn.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM analysis_cache WHERE key IN ("
+            " SELECT key FROM analysis_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+    
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """
+    Cache de resultados com LRU + TTL em memória e segundo nível opcional
+    
+    O primeiro nível guarda os próprios dicionários de resultado; o segundo
+    nível (se configurado) guarda o JSON serializado e é consultado apenas
+    em caso de falta no primeiro.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 3600.0,
+        backend: Optional[SQLiteCacheBackend] = None
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        
+        # Métricas
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_errors = 0
+    
+    async def get(self, key: str) -> Optional[Dict]:
+        """Busca um resultado no cache (memória e, em seguida, segundo nível)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._mark_cached(result)
+            del self._entries[key]
+            self.expirations += 1
+        
+        if self.backend is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                data = await loop.run_in_executor(None, self.backend.get, key)
+                if data is not None:
+                    result = deserialize_analysis(data)
+                    self._store(key, result)
+                    self.backend_hits += 1
+                    return self._mark_cached(result)
+            except Exception as e:
+                self.backend_errors += 1
+                print(f"Erro ao ler cache persistente: {e}")
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, key: str, result: Dict):
+        """Armazena um resultado nos dois níveis"""
+        self._store(key, result)
+        
+        if self.backend is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None, self.backend.set, key, serialize_analysis(result), self.ttl_seconds
+                )
+            except Exception as e:
+                self.backend_errors += 1
+                print(f"Erro ao gravar cache persistente: {e}")
+    
+    def _store(self, key: str, result: Dict):
+        """Insere no LRU em memória, removendo as entradas menos usadas"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    @staticmethod
+    def _mark_cached(result: Dict) -> Dict:
+        """Cópia rasa do resultado com a marcação de cache nos metadados"""
+        return {**result, "metadata": {**result.get("metadata", {}), "cached": True}}
+    
+    def get_stats(self) -> Dict:
+        """Retorna contadores para dimensionamento do cache"""
+        lookups = self.hits + self.backend_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.backend_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend": "sqlite" if self.backend is not None else None,
+            "backend_errors": self.backend_errors,
+        }
+    
+    def clear(self):
+        """Esvazia o primeiro nível"""
+        self._entries.clear()
+    
+    def close(self):
+        """Libera o segundo nível"""
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+
+class EncodingCache:
+    """
+    LRU de tokenizações (input_ids + offsets) endereçadas pelo hash do texto
+    
+    Limitado pelo total de tokens guardados, não pelo número de textos, já
+    que o custo em memória cresce com o tamanho do documento. Os arrays são
+    compactos (int32) e nunca são alterados por quem os lê. É usado a partir
+    das threads do executor, por isso o acesso é protegido por lock.
+    """
+    
+    def __init__(self, max_tokens: int = 2_000_000):
+        self.max_tokens = max(1, max_tokens)
+        self._entries: "OrderedDict[bytes, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._tokens = 0
+        self._lock = threading.Lock()
+        
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(text: str, namespace: str = "") -> bytes:
+        """Chave do texto; `namespace` separa tokenizers de modelos diferentes"""
+        digest = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16)
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def set(self, key: bytes, input_ids: np.ndarray, offsets: np.ndarray):
+        if len(input_ids) > self.max_tokens:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._tokens -= len(previous[0])
+            self._entries[key] = (input_ids, offsets)
+            self._tokens += len(input_ids)
+            while self._tokens > self.max_tokens:
+                _, (evicted_ids, _) = self._entries.popitem(last=False)
+                self._tokens -= len(evicted_ids)
+                self.evictions += 1
+    
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "tokens": self._tokens,
+            "max_tokens": self.max_tokens,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens = 0
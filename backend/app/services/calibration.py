@@ -0,0 +1,191 @@
+"""
+Treinamento e avaliação offline do pontuador linear
+Ajusta a regressão logística (scikit-learn) sobre a matriz de características,
+calibra as probabilidades em uma parte separada dos dados e mede acurácia,
+AUC, Brier e erro de calibração do modelo e das regras atuais
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+import numpy as np
+import orjson
+
+from app.services import scoring
+from app.services.scorer import (
+    ARTIFACT_FORMAT,
+    ARTIFACT_FORMAT_VERSION,
+    FEATURE_NAMES,
+    LinearScorer,
+    RulesScorer
+)
+
+
+# Contagens passam por log1p antes da padronização (caudas longas)
+LOG1P_FEATURES = (
+    "suspicious_count",
+    "word_count",
+    "sentence_count",
+    "avg_words_per_sentence",
+    "exclamation_count",
+    "question_count"
+)
+
+# Faixas de probabilidade do erro de calibração esperado (ECE)
+CALIBRATION_BINS = 10
+
+
+def split_indices(count: int, test_size: float, calibration_size: float, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Índices de treino, calibração e teste (embaralhados com a semente)"""
+    order = np.random.default_rng(seed).permutation(count)
+    test_count = int(round(count * test_size))
+    calibration_count = int(round((count - test_count) * calibration_size))
+    test = order[:test_count]
+    calibration = order[test_count:test_count + calibration_count]
+    return order[test_count + calibration_count:], calibration, test
+
+
+def _standardize(features: np.ndarray, log1p: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    x = np.where(log1p, np.log1p(np.maximum(features, 0.0)), features)
+    mean = x.mean(axis=0)
+    scale = x.std(axis=0)
+    scale = np.where(scale > 0, scale, 1.0)
+    return (x - mean) / scale, mean, scale
+
+
+def train_linear_scorer(
+    features: np.ndarray,
+    labels: np.ndarray,
+    calibration_features: np.ndarray,
+    calibration_labels: np.ndarray,
+    calibration: str = "isotonic",
+    regularization: float = 1.0
+) -> Dict:
+    """
+    Artefato do pontuador linear (formato lido por `LinearScorer`)
+    
+    `labels` é 1 para textos confiáveis e 0 para os demais. A calibração
+    usa dados que o ajuste não viu; sem eles (ou com um único rótulo),
+    o artefato fica sem calibração.
+    """
+    from sklearn.isotonic import IsotonicRegression
+    from sklearn.linear_model import LogisticRegression
+    
+    if len(np.unique(labels)) < 2:
+        raise ValueError("O conjunto de treino precisa ter textos dos dois rótulos")
+    
+    log1p = np.array([name in LOG1P_FEATURES for name in FEATURE_NAMES], dtype=bool)
+    x, mean, scale = _standardize(features, log1p)
+    model = LogisticRegression(C=regularization, max_iter=1000)
+    model.fit(x, labels)
+    
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "features": list(FEATURE_NAMES),
+        "log1p": [name for name in FEATURE_NAMES if name in LOG1P_FEATURES],
+        "mean": mean.tolist(),
+        "scale": scale.tolist(),
+        "coef": model.coef_[0].tolist(),
+        "intercept": float(model.intercept_[0]),
+        "calibration": {"method": "none"}
+    }
+    
+    if calibration != "none" and len(np.unique(calibration_labels)) == 2:
+        decision = LinearScorer(artifact).decision(calibration_features)
+        if calibration == "platt":
+            platt = LogisticRegression(C=1e6, max_iter=1000)
+            platt.fit(decision.reshape(-1, 1), calibration_labels)
+            artifact["calibration"] = {
+                "method": "platt", "a": float(platt.coef_[0, 0]), "b": float(platt.intercept_[0])
+            }
+        else:
+            isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+            isotonic.fit(1.0 / (1.0 + np.exp(-decision)), calibration_labels)
+            artifact["calibration"] = {
+                "method": "isotonic",
+                "x": isotonic.X_thresholds_.tolist(),
+                "y": isotonic.y_thresholds_.tolist()
+            }
+    
+    # Versão: data do treino e resumo dos parâmetros (entra na chave do cache de resultados)
+    trained_at = datetime.now(timezone.utc)
+    digest = hashlib.sha256(orjson.dumps(artifact)).hexdigest()[:8]
+    artifact["version"] = f"linear-{trained_at:%Y%m%d%H%M%S}-{digest}"
+    artifact["trained_at"] = trained_at.isoformat(timespec="seconds")
+    return artifact
+
+
+def _roc_auc(labels: np.ndarray, values: np.ndarray) -> float:
+    """Área sob a curva ROC pela estatística de Mann-Whitney (empates contam meio)"""
+    positives = labels == 1
+    positive_count = int(positives.sum())
+    negative_count = labels.size - positive_count
+    if positive_count == 0 or negative_count == 0:
+        return float("nan")
+    
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    ranks = np.empty(values.size, dtype=np.float64)
+    # Posto médio para valores empatados
+    _, starts, counts = np.unique(sorted_values, return_index=True, return_counts=True)
+    ranks[order] = np.repeat(starts + (counts + 1) / 2.0, counts)
+    return float((ranks[positives].sum() - positive_count * (positive_count + 1) / 2.0) / (positive_count * negative_count))
+
+
+def _expected_calibration_error(labels: np.ndarray, probability: np.ndarray) -> float:
+    """Diferença média (ponderada) entre probabilidade prevista e frequência observada por faixa"""
+    bins = np.minimum((probability * CALIBRATION_BINS).astype(np.int64), CALIBRATION_BINS - 1)
+    predicted = np.bincount(bins, weights=probability, minlength=CALIBRATION_BINS)
+    observed = np.bincount(bins, weights=labels, minlength=CALIBRATION_BINS)
+    return float(np.abs(predicted - observed).sum() / max(1, labels.size))
+
+
+def evaluate_scores(labels: np.ndarray, scores: np.ndarray) -> Dict:
+    """
+    Métricas de um pontuador
+    
+    A decisão é "confiável" quando o score atinge RELIABLE_MIN_SCORE (o
+    nível RELIABLE); Brier e ECE tratam score / 100 como a probabilidade
+    de o texto ser confiável, o que só o modelo calibrado promete.
+    """
+    probability = np.clip(scores / 100.0, 0.0, 1.0)
+    predicted = scores >= scoring.RELIABLE_MIN_SCORE
+    actual = labels == 1
+    levels = scoring.reliability_levels(scores)
+    return {
+        "samples": int(labels.size),
+        "accuracy": round(float((predicted == actual).mean()), 4) if labels.size else None,
+        "roc_auc": round(_roc_auc(labels, scores.astype(np.float64)), 4),
+        "brier": round(float(((probability - labels) ** 2).mean()), 4) if labels.size else None,
+        "ece": round(_expected_calibration_error(labels, probability), 4),
+        "confusion": {
+            "true_reliable": int((predicted & actual).sum()),
+            "false_reliable": int((predicted & ~actual).sum()),
+            "true_unreliable": int((~predicted & ~actual).sum()),
+            "false_unreliable": int((~predicted & actual).sum())
+        },
+        "levels": {level.value: levels.count(level) for level in dict.fromkeys(levels)}
+    }
+
+
+def compare_scorers(features: np.ndarray, labels: np.ndarray, scorer) -> Dict:
+    """Métricas das regras atuais e do pontuador sobre os mesmos textos"""
+    rules_scores, _ = RulesScorer().score(features)
+    model_scores, _ = scorer.score(features)
+    return {
+        "rules": evaluate_scores(labels, rules_scores),
+        "model": evaluate_scores(labels, model_scores)
+    }
+
+
+def save_artifact(path: str, artifact: Dict):
+    """Grava o artefato de forma atômica, para que o serviço nunca leia um arquivo parcial"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(orjson.dumps(artifact, option=orjson.OPT_INDENT_2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
@@ -0,0 +1,72 @@
+"""
+Cascata de inferência com saída antecipada
+Regras primeiro, depois o modelo pequeno e, só quando o nível de
+confiabilidade ainda depende do sentimento, o modelo completo
+"""
+
+from typing import Dict
+
+from app.core import metrics
+from app.services import scoring
+from app.services.scorer import feature_matrix
+
+
+# Camadas, da mais barata para a mais cara
+TIER_RULES = "rules"
+TIER_SMALL = "small"
+TIER_FULL = "full"
+TIERS = (TIER_RULES, TIER_SMALL, TIER_FULL)
+
+
+def level_depends_on_sentiment(scorer, suspicious_count: int, linguistic_features: Dict) -> bool:
+    """
+    Se o sentimento ainda pode mudar o nível de confiabilidade
+    
+    O sentimento só entra no vetor de características como o indicador de
+    sentimento forte; se o nível é o mesmo com e sem ele, nenhum modelo muda
+    o resultado. Vale para qualquer pontuador (regras ou modelo linear).
+    """
+    features = feature_matrix(suspicious_count, linguistic_features, [False, True])
+    scores, _ = scorer.score(features)
+    return scoring.reliability_level(int(scores[0])) != scoring.reliability_level(int(scores[1]))
+
+
+class SentimentCascade:
+    """
+    Política da cascata e contadores por camada
+    
+    A camada de regras resolve quando o nível não depende do sentimento.
+    O modelo pequeno resolve quando o seu score fica a pelo menos
+    `sentiment_margin` do limiar de sentimento forte (a penalidade é a
+    mesma que o modelo completo daria, salvo discordância de rótulo);
+    caso contrário, o texto sobe para o modelo completo.
+    """
+    
+    def __init__(self, sentiment_margin: float = 0.1):
+        self.sentiment_margin = sentiment_margin
+        self.resolved: Dict[str, int] = {tier: 0 for tier in TIERS}
+    
+    def small_model_decides(self, sentiment: Dict) -> bool:
+        """Se o sentimento do modelo pequeno está longe do limiar de sentimento forte"""
+        if sentiment.get("fallback"):
+            return False
+        return abs(sentiment.get("score", 0.5) - scoring.STRONG_SENTIMENT_SCORE) >= self.sentiment_margin
+    
+    def record(self, tier: str):
+        self.resolved[tier] += 1
+        metrics.CASCADE_RESOLVED_TOTAL.inc(tier=tier)
+    
+    def get_stats(self) -> Dict:
+        total = sum(self.resolved.values())
+        return {
+            "resolved": dict(self.resolved),
+            "hit_ratio": {
+                tier: round(count / total, 4) if total else 0.0
+                for tier, count in self.resolved.items()
+            },
+            # Fração das análises que não precisou do modelo completo
+            "full_model_saved_ratio": (
+                round(1 - self.resolved[TIER_FULL] / total, 4) if total else 0.0
+            ),
+            "sentiment_margin": self.sentiment_margin
+        }
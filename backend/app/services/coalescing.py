@@ -0,0 +1,88 @@
+"""
+Agrupamento de análises idênticas em andamento (single-flight)
+Requisições simultâneas para o mesmo texto aguardam uma única execução
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    """Execução compartilhada e o número de chamadas aguardando por ela"""
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Executa no máximo uma coroutine por chave ao mesmo tempo
+    
+    A primeira chamada para uma chave cria a execução em uma tarefa
+    própria; as seguintes, enquanto ela não termina, aguardam o mesmo
+    resultado (ou a mesma exceção). Como a tarefa não pertence a nenhuma
+    chamada, o cancelamento de quem a iniciou (cliente desconectado) não
+    afeta as demais; ela só é cancelada quando ninguém mais aguarda.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        
+        # Métricas
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled = 0
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+    
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Resultado de `fn()` para a chave e se esta chamada a executou
+        
+        `fn` só é chamada quando não há execução em andamento para `key`.
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finish(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), leader
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Ninguém mais aguarda: novas chamadas começam outra execução
+                self.cancelled += 1
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+    
+    def _finish(self, key: Hashable, flight: _Flight):
+        """Libera a chave (novas chamadas passam a executar de novo)"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # marca a exceção como lida mesmo sem chamadas aguardando
+    
+    def get_stats(self) -> Dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "in_flight": self.in_flight,
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 4) if calls else 0.0,
+            "cancelled": self.cancelled
+        }
@@ -0,0 +1,242 @@
+"""
+Índice de quase-duplicatas (MinHash + LSH)
+Reconhece textos já analisados que chegam com pequenas edições (emojis,
+nomes trocados, pontuação), que não são encontrados pelo cache exato
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Versão do formato do snapshot; alterar invalida snapshots antigos
+SNAPSHOT_FORMAT_VERSION = "1"
+
+_WORD_RE = re.compile(r"\w+")
+_SHINGLE_BASE = np.uint64(1_000_003)
+
+
+def normalize_text(text: str) -> str:
+    """Forma comparável do texto: NFKC, sem caixa, só palavras separadas por espaço"""
+    return " ".join(_WORD_RE.findall(unicodedata.normalize("NFKC", text).casefold()))
+
+
+def text_id(text: str) -> str:
+    """Identificador curto e estável de um texto analisado"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+
+
+class NearDuplicateIndex:
+    """
+    Índice LRU de assinaturas MinHash com busca por LSH em bandas
+    
+    A assinatura estima a similaridade de Jaccard entre os conjuntos de
+    k-gramas de caracteres do texto normalizado. Cada assinatura é dividida
+    em `bands` bandas; textos que coincidem em ao menos uma banda são
+    candidatos e só são aceitos se a similaridade estimada atingir o limiar.
+    
+    Cada entrada guarda apenas um payload pequeno (o resultado do modelo),
+    e o número de entradas é limitado, com descarte da menos usada.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        max_entries: int = 50000,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        version: str = "",
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = max(1, shingle_size)
+        self.version = version
+        self.seed = seed
+        
+        # Hash universal multiply-shift: (a * x + b) mod 2^64, 32 bits altos
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._powers = _SHINGLE_BASE ** np.arange(self.shingle_size - 1, -1, -1, dtype=np.uint64)
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (assinatura, payload)
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        
+        # Métricas
+        self.lookups = 0
+        self.matches = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Assinatura MinHash do texto (None se não houver palavras)"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        
+        codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if codes.size < self.shingle_size:
+            codes = np.concatenate((codes, np.zeros(self.shingle_size - codes.size, dtype=np.uint64)))
+        
+        # Hash polinomial de cada k-grama (aritmética mod 2^64)
+        shingles = np.unique(sliding_window_view(codes, self.shingle_size) @ self._powers)
+        hashes = (shingles[:, None] * self._a + self._b) >> np.uint64(32)
+        return hashes.min(axis=0).astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+    
+    def query(self, signature: Optional[np.ndarray]) -> Optional[Dict]:
+        """
+        Entrada mais parecida com similaridade >= threshold
+        
+        Retorna `{"matched_id", "similarity", "payload"}` ou None.
+        """
+        if signature is None:
+            return None
+        self.lookups += 1
+        
+        candidates: Set[str] = set()
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(key, ()))
+        
+        best_id, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = float(np.count_nonzero(self._entries[candidate][0] == signature)) / self.num_perm
+            if similarity > best_similarity:
+                best_id, best_similarity = candidate, similarity
+        
+        if best_id is None or best_similarity < self.threshold:
+            return None
+        
+        self._entries.move_to_end(best_id)
+        self.matches += 1
+        return {
+            "matched_id": best_id,
+            "similarity": round(best_similarity, 4),
+            "payload": self._entries[best_id][1]
+        }
+    
+    def add(self, entry_id: str, signature: Optional[np.ndarray], payload: Dict):
+        """Insere (ou atualiza) uma entrada, descartando as menos usadas"""
+        if signature is None:
+            return
+        if entry_id in self._entries:
+            self._remove(entry_id)
+        
+        self._entries[entry_id] = (signature, payload)
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(key, set()).add(entry_id)
+        
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+    
+    def _remove(self, entry_id: str):
+        signature, _ = self._entries.pop(entry_id)
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del buckets[key]
+    
+    def clear(self):
+        self._entries.clear()
+        self._buckets = [{} for _ in range(self.bands)]
+    
+    def _parameters(self) -> Dict:
+        """Parâmetros que precisam coincidir para reaproveitar um snapshot"""
+        return {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "version": self.version,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+        }
+    
+    def save(self, path: str):
+        """
+        Grava um snapshot .npz (escrita atômica)
+        
+        Assinaturas ficam em uma matriz uint32 e os payloads em um único
+        JSON, para que a carga seja uma leitura sequencial sem pickle.
+        """
+        ids = list(self._entries)  # do menos para o mais usado
+        signatures = (
+            np.stack([self._entries[entry_id][0] for entry_id in ids])
+            if ids else np.zeros((0, self.num_perm), dtype=np.uint32)
+        )
+        payloads = json.dumps([self._entries[entry_id][1] for entry_id in ids], ensure_ascii=False)
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Arquivo temporário por processo: workers que compartilham o snapshot não colidem
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(
+                f,
+                parameters=np.array(json.dumps(self._parameters())),
+                ids=np.array(ids, dtype="U16"),
+                signatures=signatures,
+                payloads=np.frombuffer(payloads.encode("utf-8"), dtype=np.uint8)
+            )
+        os.replace(temporary, path)
+    
+    def load(self, path: str) -> int:
+        """
+        Carrega um snapshot compatível e retorna o número de entradas
+        
+        Snapshots de outra versão do pipeline ou com outros parâmetros são
+        ignorados (as assinaturas não seriam comparáveis).
+        """
+        if not os.path.exists(path):
+            return 0
+        
+        with np.load(path, allow_pickle=False) as data:
+            if json.loads(str(data["parameters"])) != self._parameters():
+                print(f"Snapshot de quase-duplicatas incompatível ignorado: {path}")
+                return 0
+            ids = data["ids"].tolist()
+            signatures = data["signatures"]
+            payloads = json.loads(data["payloads"].tobytes().decode("utf-8"))
+        
+        self.clear()
+        start = max(0, len(ids) - self.max_entries)
+        band_keys = np.ascontiguousarray(
+            signatures[start:].reshape(-1, self.bands, self.rows)
+        ).view(np.dtype((np.void, 4 * self.rows)))[:, :, 0].tolist()
+        for entry_id, signature, payload, keys in zip(ids[start:], signatures[start:], payloads[start:], band_keys):
+            self._entries[entry_id] = (signature, payload)
+            for buckets, key in zip(self._buckets, keys):
+                buckets.setdefault(key, set()).add(entry_id)
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "match_ratio": round(self.matches / self.lookups, 4) if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
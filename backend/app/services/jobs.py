@@ -0,0 +1,547 @@
+"""
+Jobs assíncronos de análise
+Fila persistente em SQLite com faixas de prioridade (interativa e em massa)
+executada sobre o NLPService, para documentos longos e reprocessamentos
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.exceptions import NLPModelException, ServiceOverloadedException, VeritasException
+from app.core.models import JobPriority, JobStatus
+from app.services.admission import Client
+from app.services.batching import background_priority
+from app.services.cache import deserialize_analysis, serialize_analysis
+
+
+TERMINAL_STATUSES = {JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value}
+
+# Cliente da fila justa que representa a execução de todos os jobs
+JOBS_CLIENT = Client("jobs")
+
+_COLUMNS = (
+    "id, client_id, priority, status, text_length, attempts,"
+    " created_at, started_at, finished_at, result, error"
+)
+
+
+class JobStore:
+    """
+    Persistência dos jobs em um arquivo SQLite local
+    
+    Os métodos são síncronos e devem ser chamados fora do event loop
+    (`run_in_executor`). O texto fica apenas no banco: as filas em memória
+    guardam somente os identificadores.
+    
+    Vários processos podem usar o mesmo arquivo. Um job em execução
+    pertence ao processo que o iniciou (`owner`) até `lease_until`; o dono
+    renova o prazo enquanto o job roda, e só jobs com o prazo vencido
+    (dono morto ou travado) voltam para a fila.
+    """
+    
+    def __init__(self, path: str, lease_seconds: float = 30.0, owner: Optional[str] = None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " client_id TEXT,"
+            " priority TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " text_length INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " result TEXT,"
+            " error TEXT,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        # Bancos criados antes das leases
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+    
+    def create_many(self, jobs: List[Tuple[str, Optional[str], str, str]], now: float):
+        """Insere jobs (id, client_id, prioridade, texto) em uma transação"""
+        rows = [
+            (job_id, client_id, priority, JobStatus.QUEUED.value, text, len(text), now)
+            for job_id, client_id, priority, text in jobs
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO jobs (id, client_id, priority, status, text, text_length, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Retorna o job (sem o texto), com resultado e erro já decodificados"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        (job_id, client_id, priority, status, text_length, attempts,
+         created_at, started_at, finished_at, result, error) = row
+        return {
+            "job_id": job_id,
+            "client_id": client_id,
+            "priority": priority,
+            "status": status,
+            "text_length": text_length,
+            "attempts": attempts,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "result": deserialize_analysis(result) if result else None,
+            "error": json.loads(error) if error else None,
+        }
+    
+    def start(self, job_id: str, now: float) -> Optional[str]:
+        """
+        Marca o job como em execução por este processo e retorna o texto
+        
+        Retorna None se o job não está na fila (outro processo pode tê-lo
+        iniciado primeiro: a troca de estado é atômica).
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ?"
+                " WHERE id = ? AND status = ?",
+                (JobStatus.RUNNING.value, now, self.owner, now + self.lease_seconds, job_id, JobStatus.QUEUED.value)
+            )
+            if cursor.rowcount != 1:
+                return None
+            return self._conn.execute("SELECT text FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    
+    def renew(self, job_ids: List[str], now: float) -> int:
+        """Estende o prazo dos jobs em execução por este processo"""
+        if not job_ids:
+            return 0
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ? AND id IN ({placeholders})",
+                (now + self.lease_seconds, self.owner, JobStatus.RUNNING.value, *job_ids)
+            )
+        return cursor.rowcount
+    
+    def requeue(self, job_id: str):
+        """Devolve um job em execução para a fila"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE id = ? AND status = ?",
+                (JobStatus.QUEUED.value, job_id, JobStatus.RUNNING.value)
+            )
+    
+    def finish(self, job_id: str, status: str, now: float, result: Optional[str] = None, error: Optional[str] = None):
+        """Registra o estado final de um job"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, now, result, error, job_id)
+            )
+    
+    def cancel(self, job_id: str, now: float) -> bool:
+        """Cancela um job que ainda não começou"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (JobStatus.CANCELLED.value, now, job_id, JobStatus.QUEUED.value)
+            )
+        return cursor.rowcount == 1
+    
+    def recover(self, now: float) -> List[Tuple[str, str]]:
+        """
+        Recoloca na fila os jobs cujo dono parou de renovar o prazo
+        
+        Jobs em execução por processos vivos não são tocados. Retorna
+        (id, prioridade) de todos os jobs pendentes, na ordem de criação.
+        """
+        with self._lock:
+            self._release_expired(now)
+            return self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? ORDER BY created_at",
+                (JobStatus.QUEUED.value,)
+            ).fetchall()
+    
+    def queued(self) -> List[Tuple[str, str]]:
+        """Jobs na fila (id, prioridade), de qualquer processo, em ordem de criação"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? ORDER BY created_at",
+                (JobStatus.QUEUED.value,)
+            ).fetchall()
+    
+    def reclaim_expired(self, now: float) -> List[Tuple[str, str]]:
+        """Devolve à fila só os jobs com prazo vencido; retorna (id, prioridade) deles"""
+        with self._lock:
+            return self._release_expired(now)
+    
+    def _release_expired(self, now: float) -> List[Tuple[str, str]]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)"
+                " ORDER BY created_at",
+                (JobStatus.RUNNING.value, now)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE id = ? AND status = ?",
+                [(JobStatus.QUEUED.value, job_id, JobStatus.RUNNING.value) for job_id, _ in expired]
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if expired:
+            print(f"{len(expired)} jobs sem renovação do prazo voltaram para a fila")
+        return expired
+    
+    def counts(self) -> Dict[str, int]:
+        """Número de jobs por estado"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+    
+    def prune(self, finished_before: float) -> int:
+        """Remove jobs finalizados antes do instante informado"""
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE finished_at < ? AND status IN ({placeholders})",
+                (finished_before, *sorted(TERMINAL_STATUSES))
+            )
+        return cursor.rowcount
+    
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+
+
+class JobScheduler:
+    """
+    Executa os jobs persistidos com faixas de prioridade
+    
+    Até `concurrency` jobs rodam ao mesmo tempo. A faixa interativa é
+    sempre atendida primeiro; a faixa em massa usa no máximo
+    `bulk_max_concurrency` vagas, de modo que um reprocessamento grande
+    nunca ocupa todas as vagas nem a fila de inferência inteira. Jobs
+    rejeitados por sobrecarga voltam para o início da faixa após o
+    Retry-After.
+    
+    Com `admission`, cada execução ocupa uma vaga da fila justa como o
+    cliente JOBS_CLIENT: os jobs juntos recebem a vez de um cliente na
+    rodada, ao lado das requisições síncronas. O limite de taxa já foi
+    cobrado na submissão.
+    
+    Enquanto um job roda, o prazo dele no banco é renovado a cada terço de
+    `store.lease_seconds`; na mesma verificação, jobs de outros processos
+    com o prazo vencido voltam para a fila deste. A cada `poll_interval`
+    segundos, jobs inseridos no banco por outros processos entram nas
+    faixas.
+    
+    Com `execute=False` (workers não primários do servidor prefork), o
+    agendador só grava, consulta e cancela jobs: nada é recuperado nem
+    executado neste processo, e o worker primário os recolhe do banco.
+    """
+    
+    PRUNE_INTERVAL_SECONDS = 300.0
+    
+    def __init__(
+        self,
+        nlp_service,
+        store: JobStore,
+        concurrency: int = 4,
+        bulk_max_concurrency: int = 2,
+        max_attempts: int = 3,
+        max_windows: Optional[int] = None,
+        result_ttl_seconds: float = 7 * 24 * 3600.0,
+        admission=None,
+        execute: bool = True,
+        poll_interval: float = 1.0
+    ):
+        self.nlp_service = nlp_service
+        self.store = store
+        self.admission = admission
+        self.concurrency = max(1, concurrency)
+        self.bulk_max_concurrency = max(1, min(bulk_max_concurrency, self.concurrency))
+        self.max_attempts = max(1, max_attempts)
+        self.max_windows = max_windows
+        self.result_ttl_seconds = result_ttl_seconds
+        self.execute = execute
+        self.poll_interval = poll_interval
+        
+        self._lanes: Dict[str, deque] = {priority.value: deque() for priority in JobPriority}
+        self._running: Dict[str, int] = {priority.value: 0 for priority in JobPriority}
+        self._condition: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._watchers: Dict[str, asyncio.Event] = {}
+        self._last_prune = 0.0
+        self._queued: Set[str] = set()  # jobs nas faixas (sem repetição)
+        self._active: Set[str] = set()  # jobs em execução neste processo
+        self._maintenance_task: Optional[asyncio.Task] = None
+        
+        # Métricas
+        self.completed_total = 0
+        self.failed_total = 0
+        self.retried_total = 0
+        self.overloaded_total = 0
+    
+    async def _call(self, fn, *args):
+        """Executa uma operação do banco fora do event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    
+    async def start(self):
+        """Recupera os jobs pendentes e inicia os workers (só com `execute`)"""
+        self._condition = asyncio.Condition()
+        if not self.execute:
+            return
+        await self._prune()
+        
+        for job_id, priority in await self._call(self.store.recover, time.time()):
+            self._enqueue(job_id, priority)
+        
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._maintenance_task = asyncio.create_task(self._maintain())
+    
+    def _enqueue(self, job_id: str, priority: str, front: bool = False) -> bool:
+        """Coloca o job na faixa, se ainda não estiver nela (chamar com a condição adquirida)"""
+        if job_id in self._queued:
+            return False
+        lane = self._lanes.get(priority, self._lanes[JobPriority.BULK.value])
+        if front:
+            lane.appendleft(job_id)
+        else:
+            lane.append(job_id)
+        self._queued.add(job_id)
+        return True
+    
+    async def _maintain(self):
+        """Renova prazos, recupera jobs vencidos e recolhe os enviados por outros processos"""
+        renew_interval = self.store.lease_seconds / 3
+        interval = min(renew_interval, self.poll_interval) if self.poll_interval > 0 else renew_interval
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            found = []
+            try:
+                if time.monotonic() - renewed_at >= renew_interval:
+                    renewed_at = time.monotonic()
+                    now = time.time()
+                    await self._call(self.store.renew, list(self._active), now)
+                    found += await self._call(self.store.reclaim_expired, now)
+                if self.poll_interval > 0:
+                    found += await self._call(self.store.queued)
+            except Exception as e:
+                print(f"Erro na manutenção dos jobs: {e}")
+                continue
+            if found:
+                async with self._condition:
+                    added = sum(self._enqueue(job_id, priority) for job_id, priority in found)
+                    if added:
+                        self._condition.notify(added)
+    
+    async def submit(self, items: List[Tuple[Optional[str], str]], priority: JobPriority) -> List[Dict]:
+        """Persiste os jobs e os coloca na faixa; retorna os identificadores"""
+        jobs = [(uuid.uuid4().hex, client_id, priority.value, text) for client_id, text in items]
+        await self._call(self.store.create_many, jobs, time.time())
+        
+        if self.execute:
+            async with self._condition:
+                for job_id, _, _, _ in jobs:
+                    self._enqueue(job_id, priority.value)
+                self._condition.notify(len(jobs))
+        
+        return [
+            {"job_id": job_id, "client_id": client_id, "status": JobStatus.QUEUED, "priority": priority}
+            for job_id, client_id, _, _ in jobs
+        ]
+    
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self._call(self.store.get, job_id)
+    
+    async def cancel(self, job_id: str) -> bool:
+        """Cancela um job na fila (o identificador é descartado ao sair da faixa)"""
+        cancelled = await self._call(self.store.cancel, job_id, time.time())
+        if cancelled:
+            self._notify(job_id)
+        return cancelled
+    
+    def watch(self, job_id: str) -> asyncio.Event:
+        """Evento sinalizado na próxima mudança de estado do job"""
+        return self._watchers.setdefault(job_id, asyncio.Event())
+    
+    def _notify(self, job_id: str):
+        event = self._watchers.pop(job_id, None)
+        if event is not None:
+            event.set()
+    
+    def _next_job(self) -> Optional[Tuple[str, str]]:
+        """Próximo job respeitando a prioridade e o limite da faixa em massa"""
+        interactive = self._lanes[JobPriority.INTERACTIVE.value]
+        bulk = self._lanes[JobPriority.BULK.value]
+        if interactive:
+            job = interactive.popleft(), JobPriority.INTERACTIVE.value
+        elif bulk and self._running[JobPriority.BULK.value] < self.bulk_max_concurrency:
+            job = bulk.popleft(), JobPriority.BULK.value
+        else:
+            return None
+        self._queued.discard(job[0])
+        return job
+    
+    async def _worker(self):
+        """Retira jobs das faixas e os executa"""
+        while True:
+            async with self._condition:
+                job = self._next_job()
+                while job is None:
+                    await self._condition.wait()
+                    job = self._next_job()
+                job_id, priority = job
+                self._running[priority] += 1
+            
+            try:
+                await self._run_job(job_id, priority)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao executar job {job_id}: {e}")
+            finally:
+                async with self._condition:
+                    self._running[priority] -= 1
+                    # Uma vaga da faixa em massa pode ter sido liberada
+                    self._condition.notify_all()
+            
+            if time.monotonic() - self._last_prune > self.PRUNE_INTERVAL_SECONDS:
+                await self._prune()
+    
+    async def _run_job(self, job_id: str, priority: str):
+        """Executa um job e grava o resultado ou o erro"""
+        text = await self._call(self.store.start, job_id, time.time())
+        if text is None:
+            # Cancelado, removido ou iniciado por outro processo enquanto aguardava
+            return
+        self._active.add(job_id)
+        try:
+            await self._execute(job_id, priority, text)
+        finally:
+            self._active.discard(job_id)
+    
+    async def _execute(self, job_id: str, priority: str, text: str):
+        self._notify(job_id)
+        
+        try:
+            # Inferência na faixa de baixa prioridade: /analyze passa na frente
+            # e a latência dos lotes dos jobs não alimenta o controle de sobrecarga
+            async with self.admission.slot(JOBS_CLIENT) if self.admission else nullcontext():
+                with background_priority():
+                    result = await self.nlp_service.analyze_text(text, max_windows=self.max_windows)
+        except ServiceOverloadedException as e:
+            # Fila de inferência cheia: aguardar e voltar ao início da faixa
+            self.overloaded_total += 1
+            await self._call(self.store.requeue, job_id)
+            await asyncio.sleep(float(e.headers.get("Retry-After", 1)))
+            async with self._condition:
+                self._enqueue(job_id, priority, front=True)
+                self._condition.notify()
+            return
+        except VeritasException as e:
+            await self._fail(job_id, {"error": e.message, "details": e.details, "status_code": e.status_code})
+            return
+        except Exception as e:
+            job = await self.get(job_id)
+            if job and job["attempts"] < self.max_attempts:
+                self.retried_total += 1
+                await self._call(self.store.requeue, job_id)
+                async with self._condition:
+                    self._enqueue(job_id, priority)
+                    self._condition.notify()
+                return
+            
+            error = NLPModelException({"error": str(e)})
+            await self._fail(job_id, {"error": error.message, "details": error.details, "status_code": error.status_code})
+            return
+        
+        await self._call(
+            self.store.finish, job_id, JobStatus.COMPLETED.value, time.time(), serialize_analysis(result)
+        )
+        self.completed_total += 1
+        self._notify(job_id)
+    
+    async def _fail(self, job_id: str, error: Dict):
+        self.failed_total += 1
+        await self._call(
+            self.store.finish, job_id, JobStatus.FAILED.value, time.time(), None, json.dumps(error, ensure_ascii=False)
+        )
+        self._notify(job_id)
+    
+    async def _prune(self):
+        """Remove jobs finalizados há mais de `result_ttl_seconds`"""
+        self._last_prune = time.monotonic()
+        try:
+            await self._call(self.store.prune, time.time() - self.result_ttl_seconds)
+        except Exception as e:
+            print(f"Erro ao remover jobs antigos: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Tamanho das faixas, jobs em execução e contadores"""
+        return {
+            "queued": {priority: len(lane) for priority, lane in self._lanes.items()},
+            "execute": self.execute,
+            "running": dict(self._running),
+            "concurrency": self.concurrency,
+            "bulk_max_concurrency": self.bulk_max_concurrency,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "retried_total": self.retried_total,
+            "overloaded_total": self.overloaded_total,
+        }
+    
+    async def close(self):
+        """Interrompe os workers e devolve à fila os jobs que estavam em execução"""
+        tasks = self._workers + ([self._maintenance_task] if self._maintenance_task else [])
+        active = list(self._active)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._workers = []
+        self._maintenance_task = None
+        for job_id in active:
+            try:
+                self.store.requeue(job_id)
+            except Exception as e:
+                print(f"Erro ao devolver job {job_id} à fila: {e}")
+        self.store.close()
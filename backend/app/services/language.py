@@ -0,0 +1,175 @@
+"""
+Identificação de idioma por trigramas de caracteres
+Naive Bayes sobre os trigramas do início do texto, com perfis construídos
+a partir de textos de referência (app/data/language_profiles.json)
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+DEFAULT_PROFILES_PATH = Path(__file__).resolve().parent.parent / "data" / "language_profiles.json"
+
+# Código usado quando o texto não se parece com nenhum perfil conhecido
+UNDETERMINED = "und"
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def _trigrams(text: str) -> List[str]:
+    """Trigramas do texto em minúsculas, com palavras delimitadas por espaço"""
+    normalized = " " + _NON_LETTERS.sub(" ", text.lower()).strip() + " "
+    return [normalized[i:i + 3] for i in range(len(normalized) - 2)]
+
+
+@dataclass(slots=True)
+class LanguageGuess:
+    """Idioma identificado e a evidência da decisão"""
+    language: str
+    margin: float  # vantagem média por trigrama (nats) sobre o segundo idioma
+    coverage: float  # fração dos trigramas do texto presentes em algum perfil
+    trigrams: int
+    detected: str = ""  # perfil mais provável (ou UNDETERMINED) antes de cair no padrão
+    
+    def as_metadata(self) -> Dict:
+        metadata = {
+            "code": self.language,
+            "margin": round(self.margin, 4),
+            "coverage": round(self.coverage, 4)
+        }
+        if self.detected and self.detected != self.language:
+            metadata["detected"] = self.detected
+        return metadata
+
+
+class LanguageIdentifier:
+    """
+    Classificador de idioma sem dependências além do NumPy
+    
+    Cada idioma tem a log-probabilidade suavizada de cada trigrama visto nos
+    textos de referência; o texto é atribuído ao idioma de maior soma. Só o
+    prefixo de `max_chars` caracteres é examinado, o que mantém o custo em
+    torno de 0,1 ms independentemente do tamanho do texto.
+    
+    Trigramas ausentes de todos os perfis não contam. O texto só deixa
+    `default_language` com evidência clara: ao menos `min_trigrams`
+    trigramas conhecidos, `min_coverage` do texto coberto pelos perfis,
+    vantagem de `min_margin` por trigrama sobre o segundo idioma e de
+    `min_evidence` (log da razão de verossimilhança) sobre o idioma padrão.
+    Textos curtos, gírias, siglas e nomes próprios raramente atingem isso
+    e ficam no padrão, com o perfil mais provável (ou UNDETERMINED, sem
+    trigramas conhecidos) em `detected`.
+    
+    A exceção são textos em outra escrita (cirílico, grego, CJK...): com ao
+    menos `min_trigrams` trigramas com letras fora do alfabeto dos perfis e
+    cobertura abaixo de `min_coverage`, o idioma é UNDETERMINED, sem cair
+    no padrão.
+    """
+    
+    def __init__(
+        self,
+        samples: Dict[str, List[str]],
+        version: str = "",
+        default_language: str = "pt",
+        max_chars: int = 300,
+        min_trigrams: int = 12,
+        min_margin: float = 0.1,
+        min_coverage: float = 0.6,
+        min_evidence: float = 15.0,
+        smoothing: float = 0.5
+    ):
+        self.version = version
+        self.languages = sorted(samples)
+        self.default_language = default_language
+        self.max_chars = max_chars
+        self.min_trigrams = min_trigrams
+        self.min_margin = min_margin
+        self.min_coverage = min_coverage
+        self.min_evidence = min_evidence
+        
+        counts = {language: Counter(gram for text in texts for gram in _trigrams(text))
+                  for language, texts in samples.items()}
+        vocabulary = sorted(set().union(*counts.values()))
+        self._index = {gram: row for row, gram in enumerate(vocabulary)}
+        self._columns = {language: column for column, language in enumerate(self.languages)}
+        self._alphabet = frozenset("".join(vocabulary))
+        
+        # Mesma penalidade para trigramas ausentes em todos os idiomas, para
+        # que perfis com menos texto de referência não sejam favorecidos
+        totals = {language: sum(counter.values()) for language, counter in counts.items()}
+        unseen = math.log(smoothing / (max(totals.values()) + smoothing * len(vocabulary)))
+        
+        self._log_probs = np.full((len(vocabulary), len(self.languages)), unseen, dtype=np.float64)
+        for column, language in enumerate(self.languages):
+            denominator = totals[language] + smoothing * len(vocabulary)
+            for gram, count in counts[language].items():
+                self._log_probs[self._index[gram], column] = math.log((count + smoothing) / denominator)
+        
+        # Métricas
+        self.identified: Counter = Counter()
+    
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, **kwargs) -> "LanguageIdentifier":
+        """Constrói os perfis a partir do arquivo JSON de textos de referência"""
+        profiles_path = Path(path) if path else DEFAULT_PROFILES_PATH
+        with open(profiles_path, encoding="utf-8") as f:
+            data = json.load(f)
+        samples = {code: profile["samples"] for code, profile in data["languages"].items()}
+        return cls(samples, version=str(data.get("version", "")), **kwargs)
+    
+    def identify(self, text: str, record: bool = True) -> LanguageGuess:
+        """Idioma mais provável do texto (`record=False` não conta nas métricas)"""
+        grams = _trigrams(text[:self.max_chars])
+        index = self._index
+        rows = [index[gram] for gram in grams if gram in index]
+        coverage = len(rows) / len(grams) if grams else 0.0
+        
+        if coverage < self.min_coverage and self._foreign_script(grams):
+            guess = LanguageGuess(UNDETERMINED, 0.0, coverage, len(rows), UNDETERMINED)
+        elif not rows:
+            guess = LanguageGuess(self.default_language, 0.0, coverage, 0, UNDETERMINED)
+        else:
+            scores = self._log_probs[rows].sum(axis=0)
+            order = np.argsort(scores)
+            best, second = order[-1], order[-2]
+            margin = float(scores[best] - scores[second]) / len(rows)
+            detected = self.languages[best]
+            
+            # Evidência contra o idioma padrão (um perfil de fora não perde para si mesmo)
+            if self.default_language in self._columns:
+                evidence = float(scores[best] - scores[self._columns[self.default_language]])
+            else:
+                evidence = math.inf
+            
+            confident = (
+                len(rows) >= self.min_trigrams
+                and coverage >= self.min_coverage
+                and margin >= self.min_margin
+                and evidence >= self.min_evidence
+            )
+            language = detected if confident else self.default_language
+            guess = LanguageGuess(language, margin, coverage, len(rows), detected)
+        
+        if record:
+            self.identified[guess.language] += 1
+        return guess
+    
+    def _foreign_script(self, grams: List[str]) -> bool:
+        """Se há ao menos `min_trigrams` trigramas com letras que nenhum perfil usa"""
+        alphabet = self._alphabet
+        foreign = sum(1 for gram in grams if not alphabet.issuperset(gram))
+        return foreign >= self.min_trigrams
+    
+    def get_stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "languages": self.languages,
+            "identified": dict(self.identified)
+        }
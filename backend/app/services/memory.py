@@ -0,0 +1,44 @@
+"""
+Uso de memória do processo
+RSS, PSS e páginas compartilhadas/privadas lidas de /proc (Linux)
+"""
+
+import os
+from typing import Dict, Union
+
+
+# Campos de smaps_rollup (kB) somados em cada valor reportado
+_FIELDS = {
+    "rss_mb": ("Rss",),
+    "pss_mb": ("Pss",),
+    "shared_mb": ("Shared_Clean", "Shared_Dirty"),
+    "private_mb": ("Private_Clean", "Private_Dirty")
+}
+
+
+def read_process_memory(pid: Union[int, str] = "self") -> Dict[str, float]:
+    """
+    Memória de um processo em MB
+    
+    O RSS conta as páginas compartilhadas inteiras em cada processo; o PSS
+    as divide entre os processos que as mapeiam, então a soma dos PSS dos
+    workers é a memória que eles realmente ocupam. Fora do Linux (sem
+    /proc), retorna só o PID.
+    """
+    report: Dict[str, float] = {"pid": os.getpid() if pid == "self" else int(pid)}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return report
+    
+    values_kb: Dict[str, int] = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields and fields[0].isdigit():
+            values_kb[name] = int(fields[0])
+    
+    for key, names in _FIELDS.items():
+        report[key] = round(sum(values_kb.get(name, 0) for name in names) / 1024.0, 1)
+    return report
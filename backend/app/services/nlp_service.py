@@ -3,16 +3,68 @@ Serviço de Processamento de Linguagem Natural
 Utiliza modelos de Transformers para análise de texto
 """
 
-import re
+import time
 import asyncio
-from typing import List, Dict, Tuple
+import contextvars
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
 import numpy as np
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-import torch
 
+from app.core import metrics
 from app.core.config import settings
-from app.core.models import SuspiciousPhrase, ReliabilityLevel
-from app.core.exceptions import NLPModelException
+from app.core.models import ReliabilityLevel
+from app.core.payloads import PhraseMatch
+from app.core.exceptions import NLPModelException, ServiceOverloadedException, UnsupportedLanguageException
+from app.services.backends import (
+    TorchSentimentBackend,
+    load_fast_tokenizer,
+    load_onnx_backend,
+    load_sentiment_backend,
+    load_transformers_model,
+    preloaded_model,
+    require_fast_tokenizer,
+    resolve_model_source
+)
+from app.services.attribution import (
+    ATTRIBUTION_VERSION,
+    group_spans,
+    merge_with_phrases,
+    occluded_inputs,
+    occlusion_token_id,
+    span_attributions,
+    word_spans
+)
+from app.services.batching import MicroBatcher
+from app.services.coalescing import SingleFlight
+from app.services.cascade import TIER_FULL, TIER_RULES, TIER_SMALL, SentimentCascade, level_depends_on_sentiment
+from app.services.cache import EncodingCache, ResultCache, SQLiteCacheBackend, make_cache_key
+from app.services.dedup import NearDuplicateIndex, text_id
+from app.services.features import extract_linguistic_features
+from app.services.language import LanguageGuess, LanguageIdentifier
+from app.services.memory import read_process_memory
+from app.services.overload import LoadState, OverloadController
+from app.services.patterns import PatternEngine, default_rules_path
+from app.services.registry import ModelRegistry, ModelSlots, RegisteredModel
+from app.services import scoring
+from app.services.scorer import ScorerProvider, feature_matrix
+from app.services.windows import plan_windows, coverage_ratio, aggregate_window_scores
+from app.services.workers import InferenceWorkerPool
+
+
+# Limite de janelas que nunca é atingido (pontuar todas as janelas)
+UNLIMITED_WINDOWS = 2 ** 31
+
+# Sentimento de análises que dispensaram o modelo (cascata, sobrecarga)
+SKIPPED_SENTIMENT = {"label": "NEUTRAL", "score": 0.5, "skipped": True}
+
+# Metadados de uma requisição específica (não vão para o cache)
+REQUEST_METADATA = ("processing_time", "timings_ms", "cached", "coalesced")
+
+# Texto usado no lote de aquecimento antes de reportar pronto
+WARMUP_TEXT = (
+    "URGENTE!!! Compartilhe agora: o governo anunciou hoje novas medidas "
+    "para a economia, segundo especialistas ouvidos pela reportagem."
+)
 
 
 class NLPService:
@@ -22,67 +74,781 @@ class NLPService:
         self.tokenizer = None
         self.model = None
         self.sentiment_analyzer = None
+        self.sentiment_backend = None
+        self.sentiment_batcher = None
+        self.worker_pool = None
+        self.models = ModelRegistry()
+        self.scorer = ScorerProvider(settings.SCORER_MODEL_PATH, settings.SCORER_RELOAD_INTERVAL_SECONDS)
+        self.cascade = (
+            SentimentCascade(settings.CASCADE_SENTIMENT_MARGIN) if settings.CASCADE_ENABLED else None
+        )
+        self.language_identifier = (
+            LanguageIdentifier.from_file(
+                settings.LANGUAGE_PROFILES_PATH,
+                default_language=settings.LANGUAGE_DEFAULT,
+                max_chars=settings.LANGUAGE_MAX_CHARS,
+                min_trigrams=settings.LANGUAGE_MIN_TRIGRAMS,
+                min_margin=settings.LANGUAGE_MIN_MARGIN,
+                min_coverage=settings.LANGUAGE_MIN_COVERAGE,
+                min_evidence=settings.LANGUAGE_MIN_EVIDENCE
+            ) if settings.LANGUAGE_DETECTION_ENABLED else None
+        )
+        # Regras compiladas uma única vez (falha cedo se o arquivo for inválido)
+        self.pattern_engines = self._load_pattern_engines()
+        self.pattern_engine = self.pattern_engines[settings.LANGUAGE_DEFAULT]
+        # Modelos por idioma: carregados no primeiro texto do idioma
+        self.language_models = (
+            ModelSlots(
+                self._load_language_model,
+                max_loaded=settings.LANGUAGE_MODEL_SLOTS,
+                idle_seconds=settings.LANGUAGE_MODEL_IDLE_SECONDS
+            ) if self.language_identifier and settings.LANGUAGE_MODELS else None
+        )
+        self.result_cache = self._create_result_cache()
+        self.token_cache = (
+            EncodingCache(settings.TOKEN_CACHE_MAX_TOKENS) if settings.TOKEN_CACHE_ENABLED else None
+        )
+        self.near_duplicates: Optional[NearDuplicateIndex] = None
+        self.coalescer = SingleFlight() if settings.COALESCING_ENABLED else None
+        self.overload = OverloadController(
+            degrade_latency_ms=settings.OVERLOAD_DEGRADE_LATENCY_MS,
+            shed_latency_ms=settings.OVERLOAD_SHED_LATENCY_MS,
+            recovery_ratio=settings.OVERLOAD_RECOVERY_RATIO,
+            ewma_alpha=settings.OVERLOAD_EWMA_ALPHA,
+            decay_seconds=settings.OVERLOAD_DECAY_SECONDS,
+            min_state_seconds=settings.OVERLOAD_MIN_STATE_SECONDS
+        ) if settings.OVERLOAD_CONTROL_ENABLED else None
+        self.model_source, self.model_local_only = resolve_model_source(settings)
+        self.startup_timings: Dict[str, float] = {}
+        self.startup_error: Optional[str] = None
         self.initialized = False
+        self._init_lock = asyncio.Lock()
     
-    async def initialize(self):
-        """Inicializa os modelos NLP"""
+    def _load_pattern_engines(self) -> Dict[str, PatternEngine]:
+        """Regras de cada idioma suportado (só o padrão sem identificação de idioma)"""
+        paths = {"pt": settings.PATTERN_RULES_PATH, **settings.LANGUAGE_RULES_PATHS}
+        languages = settings.LANGUAGES_SUPPORTED if self.language_identifier else []
+        engines = {}
+        for language in dict.fromkeys([settings.LANGUAGE_DEFAULT, *languages]):
+            engine = PatternEngine.from_file(paths.get(language) or default_rules_path(language))
+            if engine.language != language:
+                raise ValueError(f"Regras do idioma '{language}' declaram o idioma '{engine.language}'")
+            engines[language] = engine
+        return engines
+    
+    def _create_result_cache(self):
+        """Cria o cache de resultados conforme as configurações"""
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        
+        backend = None
+        if settings.RESULT_CACHE_SQLITE_PATH:
+            try:
+                backend = SQLiteCacheBackend(
+                    settings.RESULT_CACHE_SQLITE_PATH,
+                    max_entries=settings.RESULT_CACHE_SQLITE_MAX_ENTRIES
+                )
+            except Exception as e:
+                print(f"Erro ao abrir cache persistente: {e}")
+        
+        return ResultCache(
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            backend=backend
+        )
+    
+    @property
+    def pipeline_version(self) -> str:
+        """Identifica modelo e regras em uso (invalida o cache em atualizações)"""
+        if self.sentiment_backend:
+            model = f"{self.model_source}|{self.sentiment_backend.name}"
+        else:
+            model = "sem-modelo"
+        if self.cascade:
+            # A cascata troca o score exato por economia de inferência
+            model = f"{model}|cascata-{settings.CASCADE_MODEL_NAME or 'regras'}-{self.cascade.sentiment_margin}"
+        if len(self.pattern_engines) == 1:
+            rules = self.pattern_engine.version
+        else:
+            rules = ",".join(f"{language}:{engine.version}" for language, engine in self.pattern_engines.items())
+        version = f"{model}|regras-{rules}"
+        if self.language_identifier:
+            # Os limiares decidem quais textos deixam o idioma padrão
+            identifier = self.language_identifier
+            version = (f"{version}|idiomas-{identifier.version}-{identifier.min_trigrams}-"
+                       f"{identifier.min_margin}-{identifier.min_coverage}-{identifier.min_evidence}")
+            if settings.LANGUAGE_MODELS:
+                version += "|" + ",".join(f"{language}:{source}" for language, source in sorted(settings.LANGUAGE_MODELS.items()))
+        return version
+    
+    @contextmanager
+    def _startup_phase(self, name: str):
+        """Mede a duração de uma fase da inicialização (em ms)"""
+        start = time.perf_counter()
         try:
-            # Carregar modelos de forma assíncrona
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._load_models)
-            self.initialized = True
-        except Exception as e:
-            raise NLPModelException({"error": str(e), "stage": "initialization"})
+            yield
+        finally:
+            self.startup_timings[name] = round((time.perf_counter() - start) * 1000.0, 1)
+    
+    async def initialize(self):
+        """Inicializa os modelos NLP e executa o aquecimento"""
+        async with self._init_lock:
+            if self.initialized:
+                return
+            
+            self.startup_timings = {}
+            try:
+                with self._startup_phase("total"):
+                    # Carregar modelos de forma assíncrona
+                    loop = asyncio.get_event_loop()
+                    if settings.INFERENCE_WORKERS > 0:
+                        await loop.run_in_executor(None, self._start_worker_pool)
+                    else:
+                        await loop.run_in_executor(None, self._load_models)
+                    
+                    # Fila de inferência que agrupa requisições concorrentes
+                    if self.sentiment_backend:
+                        self.sentiment_batcher = MicroBatcher(
+                            self.worker_pool.predict if self.worker_pool else self._predict_sentiment_batch,
+                            max_batch_size=settings.SENTIMENT_BATCH_MAX_SIZE,
+                            max_wait_ms=settings.SENTIMENT_BATCH_MAX_WAIT_MS,
+                            max_concurrency=2 * self.worker_pool.num_workers if self.worker_pool else 1,
+                            max_queue_size=settings.INFERENCE_QUEUE_MAX_SIZE,
+                            retry_after_seconds=settings.INFERENCE_RETRY_AFTER_SECONDS,
+                            latency_observer=self.overload.observe if self.overload else None
+                        )
+                        self.models.register(RegisteredModel(
+                            "primary", self.model_source, TIER_FULL,
+                            self.sentiment_backend, self.tokenizer, self.sentiment_batcher
+                        ))
+                    
+                    if self.cascade and settings.CASCADE_MODEL_NAME:
+                        with self._startup_phase("load_cascade_model"):
+                            await loop.run_in_executor(None, self._load_cascade_model)
+                    
+                    if settings.NEAR_DUPLICATE_ENABLED:
+                        with self._startup_phase("near_duplicates"):
+                            self.near_duplicates = await loop.run_in_executor(
+                                None, self._load_near_duplicates
+                            )
+                    
+                    with self._startup_phase("warmup"):
+                        await self._warmup()
+                
+                self.startup_error = None
+                self.initialized = True
+                print(f"Serviço NLP pronto em {self.startup_timings['total']:.0f} ms: {self.startup_timings}")
+            except Exception as e:
+                self.startup_error = str(e)
+                raise NLPModelException({"error": str(e), "stage": "initialization"})
     
     def _load_models(self):
         """Carrega os modelos NLP (executado em thread separada)"""
-        try:
-            # Modelo de sentimento (português)
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-xlm-roberta-base-sentiment",
-                tokenizer="cardiffnlp/twitter-xlm-roberta-base-sentiment",
-                device=0 if torch.cuda.is_available() else -1
-            )
-        except Exception as e:
-            # Fallback para modelo mais leve se houver erro
-            print(f"Erro ao carregar modelo principal: {e}")
+        # Uma inicialização anterior pode ter caído no fallback
+        self.model_source, self.model_local_only = resolve_model_source(settings)
+        if settings.INFERENCE_BACKEND == "onnx":
+            with self._startup_phase("load_model"):
+                self.sentiment_backend = load_onnx_backend(self.model_source, settings)
+            if self.sentiment_backend:
+                self.tokenizer = self.sentiment_backend.tokenizer
+                return
+        
+        # Bibliotecas pesadas são importadas só aqui (não no import do módulo)
+        with self._startup_phase("import_libraries"):
+            import torch
+            import transformers
+        
+        with self._startup_phase("load_model"):
             try:
-                self.sentiment_analyzer = pipeline(
-                    "sentiment-analysis",
-                    device=-1  # CPU
+                # Modelo de sentimento (português); no modo prefork, herdado do processo pai
+                self.tokenizer, self.model = preloaded_model(self.model_source) or load_transformers_model(
+                    self.model_source, local_only=self.model_local_only
                 )
-            except Exception as e2:
-                print(f"Erro ao carregar modelo fallback: {e2}")
-                self.sentiment_analyzer = None
+            except Exception as e:
+                # Diretório fixado: sem fallback silencioso para outro modelo
+                if self.model_local_only:
+                    raise
+                
+                # Fallback para modelo mais leve se houver erro
+                print(f"Erro ao carregar modelo principal: {e}")
+                try:
+                    self.sentiment_analyzer = transformers.pipeline(
+                        "sentiment-analysis",
+                        device=-1  # CPU
+                    )
+                    self.tokenizer = require_fast_tokenizer(
+                        self.sentiment_analyzer.tokenizer, "pipeline padrão"
+                    )
+                    self.model = self.sentiment_analyzer.model
+                    # A versão do pipeline (chaves do cache e do snapshot de
+                    # quase-duplicatas) precisa nomear o modelo que de fato carregou
+                    name = getattr(self.model.config, "_name_or_path", None) or "pipeline-padrao"
+                    self.model_source = f"fallback:{name}"
+                    print(f"Usando modelo fallback '{name}'")
+                except Exception as e2:
+                    print(f"Erro ao carregar modelo fallback: {e2}")
+                    self.sentiment_analyzer = None
+        
+        # Tokenizer e modelo são usados diretamente nas janelas deslizantes
+        if self.model is not None:
+            if torch.cuda.is_available():
+                self.model = self.model.to("cuda")
+            self.sentiment_backend = TorchSentimentBackend(self.model, self.tokenizer)
+    
+    def _load_cascade_model(self):
+        """
+        Carrega o modelo pequeno da cascata (executado em thread separada)
+        
+        Roda sempre no processo da API, com fila própria, mesmo quando o
+        modelo principal está nos workers de inferência.
+        """
+        backend = load_sentiment_backend(settings.CASCADE_MODEL_NAME, settings)
+        batcher = MicroBatcher(
+            backend.predict,
+            max_batch_size=settings.SENTIMENT_BATCH_MAX_SIZE,
+            max_wait_ms=settings.SENTIMENT_BATCH_MAX_WAIT_MS,
+            max_queue_size=settings.INFERENCE_QUEUE_MAX_SIZE,
+            retry_after_seconds=settings.INFERENCE_RETRY_AFTER_SECONDS
+        )
+        self.models.register(RegisteredModel(
+            "cascade", settings.CASCADE_MODEL_NAME, TIER_SMALL, backend, backend.tokenizer, batcher
+        ))
+    
+    def _load_language_model(self, language: str) -> RegisteredModel:
+        """Carrega o modelo de sentimento de um idioma (executado em thread separada)"""
+        source = settings.LANGUAGE_MODELS[language]
+        backend = load_sentiment_backend(source, settings)
+        batcher = MicroBatcher(
+            backend.predict,
+            max_batch_size=settings.SENTIMENT_BATCH_MAX_SIZE,
+            max_wait_ms=settings.SENTIMENT_BATCH_MAX_WAIT_MS,
+            max_queue_size=settings.INFERENCE_QUEUE_MAX_SIZE,
+            retry_after_seconds=settings.INFERENCE_RETRY_AFTER_SECONDS
+        )
+        return RegisteredModel(f"lang-{language}", source, TIER_FULL, backend, backend.tokenizer, batcher)
+    
+    def _start_worker_pool(self):
+        """
+        Inicia os processos de inferência (executado em thread separada)
+        
+        O modelo é carregado apenas nos workers; o processo da API mantém
+        somente o tokenizer usado para montar as janelas.
+        """
+        pool = InferenceWorkerPool(
+            self.model_source,
+            num_workers=settings.INFERENCE_WORKERS,
+            threads_per_worker=settings.INFERENCE_THREADS_PER_WORKER,
+            pin_cpus=settings.INFERENCE_PIN_CPUS
+        )
+        with self._startup_phase("start_workers"):
+            pool.start()
+        
+        with self._startup_phase("load_tokenizer"):
+            self.tokenizer = load_fast_tokenizer(self.model_source, local_only=self.model_local_only)
+        self.worker_pool = pool
+        self.sentiment_backend = pool
     
-    async def analyze_text(self, text: str) -> Dict:
+    def _load_near_duplicates(self) -> NearDuplicateIndex:
+        """Cria o índice de quase-duplicatas e carrega o snapshot, se houver"""
+        index = NearDuplicateIndex(
+            threshold=settings.NEAR_DUPLICATE_THRESHOLD,
+            max_entries=settings.NEAR_DUPLICATE_MAX_ENTRIES,
+            num_perm=settings.NEAR_DUPLICATE_NUM_PERM,
+            bands=settings.NEAR_DUPLICATE_BANDS,
+            shingle_size=settings.NEAR_DUPLICATE_SHINGLE_SIZE,
+            version=self.pipeline_version
+        )
+        if settings.NEAR_DUPLICATE_SNAPSHOT_PATH:
+            try:
+                index.load(settings.NEAR_DUPLICATE_SNAPSHOT_PATH)
+            except Exception as e:
+                print(f"Erro ao carregar snapshot de quase-duplicatas: {e}")
+        return index
+    
+    async def _warmup(self):
+        """
+        Executa um lote de aquecimento em cada réplica do modelo
+        
+        A primeira inferência paga alocações e inicializações preguiçosas
+        do runtime; aqui ela acontece antes de o serviço se declarar pronto.
+        O lote vai direto ao backend para não distorcer as métricas da fila.
+        
+        Se o controle de sobrecarga não tem limiares fixos, alguns lotes de
+        janelas completas são medidos em seguida e o p95, escalado para um
+        lote cheio (SENTIMENT_BATCH_MAX_SIZE), define os limiares.
+        """
+        self.pattern_engine.scan(WARMUP_TEXT)
+        
+        batch_size = settings.STARTUP_WARMUP_BATCH_SIZE
+        if batch_size <= 0 or not self.sentiment_backend:
+            if self.overload and not self.overload.active:
+                print("Controle de sobrecarga inativo: sem aquecimento para medir a latência "
+                      "(defina OVERLOAD_DEGRADE_LATENCY_MS)")
+            return
+        
+        windows, _ = self._encode_windows(WARMUP_TEXT)
+        batch = [windows[0]["input_ids"]] * batch_size
+        await self._warmup_batch(batch)
+        
+        if self.overload and not self.overload.active and settings.OVERLOAD_WARMUP_RUNS > 0:
+            # Janela do tamanho máximo: o texto de aquecimento sozinho é curto demais
+            repeats = settings.SENTIMENT_WINDOW_TOKENS // max(1, len(windows[0]["input_ids"])) + 1
+            full_windows, _ = self._encode_windows(" ".join([WARMUP_TEXT] * repeats), max_windows=1)
+            batch = [full_windows[0]["input_ids"]] * batch_size
+            latencies = []
+            for _ in range(settings.OVERLOAD_WARMUP_RUNS):
+                started = time.perf_counter()
+                await self._warmup_batch(batch)
+                latencies.append(time.perf_counter() - started)
+            full_batch = float(np.percentile(latencies, 95)) * max(1.0, settings.SENTIMENT_BATCH_MAX_SIZE / batch_size)
+            self.overload.calibrate(
+                full_batch,
+                factor=settings.OVERLOAD_WARMUP_FACTOR,
+                minimum_ms=settings.OVERLOAD_MIN_LATENCY_MS
+            )
+    
+    async def _warmup_batch(self, batch: List[List[int]]):
+        """Um lote direto no backend (em cada réplica, com workers)"""
+        if self.worker_pool:
+            await asyncio.gather(*[
+                self.worker_pool.predict(batch) for _ in range(self.worker_pool.num_workers)
+            ])
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.sentiment_backend.predict, batch)
+    
+    def _encode_windows(
+        self,
+        text: str,
+        max_windows: Optional[int] = None,
+        model: Optional[RegisteredModel] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Tokeniza o texto completo e o divide em janelas sobrepostas
+        
+        Cada janela recebe os tokens especiais do modelo e guarda o
+        intervalo de caracteres correspondente no texto original.
+        `max_windows` substitui SENTIMENT_MAX_WINDOWS (jobs de documentos longos).
+        A tokenização do texto inteiro é reaproveitada do cache quando o
+        mesmo texto já passou pelo tokenizer (inclusive com outro limite de janelas).
+        `model` seleciona o tokenizer de outro modelo registrado (padrão: o principal).
+        """
+        tokenizer = model.tokenizer if model else self.tokenizer
+        input_ids, offsets = self._tokenize(text, model)
+        
+        with metrics.stage("windowing"):
+            window_tokens = min(settings.SENTIMENT_WINDOW_TOKENS, tokenizer.model_max_length)
+            body_size = window_tokens - tokenizer.num_special_tokens_to_add()
+            spans = plan_windows(
+                len(input_ids),
+                body_size,
+                settings.SENTIMENT_WINDOW_OVERLAP,
+                max_windows or settings.SENTIMENT_MAX_WINDOWS
+            )
+            
+            windows = []
+            for start, end in spans:
+                windows.append({
+                    "input_ids": tokenizer.build_inputs_with_special_tokens(input_ids[start:end].tolist()),
+                    "token_start": start,
+                    "token_end": end,
+                    "start_index": int(offsets[start, 0]),
+                    "end_index": int(offsets[end - 1, 1])
+                })
+        
+        return windows, coverage_ratio(spans, len(input_ids))
+    
+    def _tokenize(self, text: str, model: Optional[RegisteredModel] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Tokens do texto completo (sem tokens especiais) e seus offsets, com cache"""
+        tokenizer = model.tokenizer if model else self.tokenizer
+        key = None
+        if self.token_cache is not None:
+            key = self.token_cache.key(text, model.name if model else "")
+            cached = self.token_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        with metrics.stage("tokenization"):
+            encoding = tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                truncation=False,
+                verbose=False
+            )
+            input_ids = np.asarray(encoding["input_ids"], dtype=np.int32)
+            offsets = np.asarray(encoding["offset_mapping"], dtype=np.int32).reshape(-1, 2)
+        
+        if key is not None:
+            self.token_cache.set(key, input_ids, offsets)
+        return input_ids, offsets
+    
+    def _predict_sentiment_batch(self, batch_ids: List[List[int]]) -> List[Dict[str, float]]:
+        """Executa o modelo em um único lote de janelas com padding"""
+        return self.sentiment_backend.predict(batch_ids)
+    
+    async def analyze_text(
+        self,
+        text: str,
+        max_windows: Optional[int] = None,
+        explain: bool = False,
+        linguistic_features: Optional[Dict] = None
+    ) -> Dict:
         """
         Analisa um texto e retorna métricas de confiabilidade
         
         Args:
             text: Texto a ser analisado
-            
+            max_windows: Limite de janelas de sentimento (padrão: SENTIMENT_MAX_WINDOWS)
+            explain: Inclui atribuições por token do modelo (metadata.explanation)
+            linguistic_features: Características já extraídas em lote
+                (`linguistic_features_batch`); sem elas, são extraídas aqui
+        
         Returns:
             Dicionário com métricas de análise
         """
         if not self.initialized:
             await self.initialize()
         
-        loop = asyncio.get_event_loop()
+        start = time.perf_counter()
+        timings = metrics.begin_request()
+        if explain:
+            return await self._explain_text(text, max_windows, start, timings)
+        return await self._analyze_shared(text, max_windows, start, timings, linguistic_features)
+    
+    async def _analyze_shared(
+        self,
+        text: str,
+        max_windows: Optional[int],
+        start: float,
+        timings: Optional[Dict[str, float]],
+        linguistic_features: Optional[Dict] = None
+    ) -> Dict:
+        """Análise com cache de resultados e agrupamento de requisições idênticas simultâneas"""
+        key = self._result_key(text, max_windows) if self.result_cache or self.coalescer else None
+        
+        if self.coalescer is None:
+            return await self._analyze_text(text, max_windows, start, timings, key, linguistic_features)
+        
+        # O mesmo texto já em análise por outra requisição: aguardar a mesma execução
+        result, leader = await self.coalescer.run(
+            key, lambda: self._analyze_text(text, max_windows, start, timings, key, linguistic_features)
+        )
+        if leader:
+            return result
+        
+        metrics.ANALYSES_TOTAL.inc(outcome="coalesced")
+        result = self._with_timings(result, start, timings)
+        result["metadata"]["coalesced"] = True
+        return result
+    
+    def _result_key(self, text: str, max_windows: Optional[int], explain: bool = False) -> str:
+        """Chave do resultado: texto, versão do pipeline e do pontuador, limite de janelas e explicação"""
+        # O pontuador pode ser recarregado sem reiniciar: fica fora de pipeline_version
+        version = f"{self.pipeline_version}|pontuacao-{self.scorer.version}"
+        if max_windows:
+            version = f"{version}|janelas-{max_windows}"
+        if explain:
+            version = f"{version}|{ATTRIBUTION_VERSION}-{settings.EXPLAIN_MAX_SPANS}-{settings.EXPLAIN_TOP_SPANS}"
+        return make_cache_key(text, version)
+    
+    async def _explain_text(
+        self,
+        text: str,
+        max_windows: Optional[int],
+        start: float,
+        timings: Optional[Dict[str, float]]
+    ) -> Dict:
+        """
+        Análise com atribuições por token (opt-in)
+        
+        A análise base segue o caminho normal (cache, agrupamento); as
+        atribuições só são calculadas para quem as pediu, e o resultado
+        explicado fica no cache de resultados sob uma chave própria.
+        """
+        key = self._result_key(text, max_windows, explain=True) if self.result_cache else None
+        if key:
+            with metrics.stage("cache_lookup"):
+                cached = await self.result_cache.get(key)
+            if cached is not None:
+                return self._with_timings(cached, start, timings)
+        
+        result = await self._analyze_shared(text, max_windows, start, timings)
+        with metrics.stage("attribution"):
+            attribution = await self._token_attributions(text, result, max_windows)
+        
+        metadata = {name: value for name, value in result["metadata"].items() if name not in REQUEST_METADATA}
+        explained = {
+            **result,
+            "explanation": self._attribution_sentence(result["explanation"], attribution),
+            "metadata": {**metadata, "explanation": attribution}
+        }
+        
+        # Só explicações completas, sobre resultados que também seriam guardados
+        if key and attribution["available"] and not metadata.get("degraded") and not metadata["sentiment"].get("fallback"):
+            await self.result_cache.set(key, explained)
+        return self._with_timings(explained, start, timings)
+    
+    async def _token_attributions(self, text: str, result: Dict, max_windows: Optional[int]) -> Dict:
+        """Atribuições do modelo que pontuou o texto (o do idioma ou o principal)"""
+        if self.overload and self.overload.current_state() != LoadState.NORMAL:
+            return {"method": "occlusion", "available": False, "reason": "overload"}
+        
+        language = result["metadata"].get("language", {}).get("code", settings.LANGUAGE_DEFAULT)
+        try:
+            if self.language_models is not None and language in settings.LANGUAGE_MODELS:
+                async with self.language_models.acquire(language) as model:
+                    return await self._occlusion_attributions(text, result, max_windows, model)
+            if not self.sentiment_backend or not self.sentiment_batcher:
+                return {"method": "occlusion", "available": False, "reason": "no_model"}
+            return await self._occlusion_attributions(text, result, max_windows)
+        except ServiceOverloadedException:
+            # Fila de inferência cheia: a análise base continua válida
+            return {"method": "occlusion", "available": False, "reason": "overload"}
+        except Exception as e:
+            print(f"Erro ao calcular atribuições: {e}")
+            return {"method": "occlusion", "available": False, "reason": "error"}
+    
+    async def _occlusion_attributions(
+        self,
+        text: str,
+        result: Dict,
+        max_windows: Optional[int],
+        model: Optional[RegisteredModel] = None
+    ) -> Dict:
+        """
+        Oclusão em lote na janela que mais pesou no rótulo do documento
         
-        # Análises paralelas
-        results = await asyncio.gather(
-            self._analyze_sentiment(text, loop),
-            self._detect_suspicious_patterns(text, loop),
-            self._analyze_linguistic_features(text, loop),
-            return_exceptions=True
+        A janela original e uma variante por trecho ocluído entram juntas na
+        fila de inferência (um único `submit_many`), então o custo é de
+        alguns forwards em lote, não um por palavra.
+        """
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(
+            None, contextvars.copy_context().run,
+            self._plan_occlusions, text, max_windows, result["metadata"].get("sentiment", {}), model
         )
+        if plan is None:
+            return {"method": "occlusion", "available": False, "reason": "empty"}
+        window, spans, words_per_span, inputs, offsets = plan
+        
+        batcher = model.batcher if model else self.sentiment_batcher
+        label, probability, deltas = span_attributions(await batcher.submit_many(inputs))
+        
+        scored = []
+        for (first, last), delta in zip(spans, deltas):
+            start_index, end_index = int(offsets[first, 0]), int(offsets[last - 1, 1])
+            scored.append({
+                "text": text[start_index:end_index],
+                "start_index": start_index,
+                "end_index": end_index,
+                "attribution": round(float(delta), 4)
+            })
+        scored, phrases = merge_with_phrases(scored, result["suspicious_phrases"])
+        top = sorted(scored, key=lambda span: abs(span["attribution"]), reverse=True)[:settings.EXPLAIN_TOP_SPANS]
+        
+        return {
+            "method": "occlusion",
+            "available": True,
+            "label": label,
+            "score": round(probability, 4),
+            "window": {"start_index": window["start_index"], "end_index": window["end_index"]},
+            "words_per_span": words_per_span,
+            "occlusions": len(spans),
+            "spans": top,
+            "suspicious_phrases": phrases
+        }
+    
+    def _plan_occlusions(
+        self,
+        text: str,
+        max_windows: Optional[int],
+        sentiment_result: Dict,
+        model: Optional[RegisteredModel] = None
+    ):
+        """Janela escolhida, trechos e entradas ocluídas (executado em thread separada)"""
+        windows, _ = self._encode_windows(text, max_windows, model)
+        if not windows:
+            return None
+        
+        # Janela com maior probabilidade do rótulo do documento (a primeira, sem janelas no resultado)
+        scored_windows = sentiment_result.get("windows") or []
+        label = sentiment_result.get("label")
+        index = 0
+        if len(scored_windows) == len(windows) and label:
+            index = max(range(len(windows)), key=lambda i: scored_windows[i]["scores"].get(label, 0.0))
+        window = windows[index]
+        
+        tokenizer = model.tokenizer if model else self.tokenizer
+        input_ids, offsets = self._tokenize(text, model)
+        start, end = window["token_start"], window["token_end"]
+        with metrics.stage("occlusion_plan"):
+            spans, words_per_span = group_spans(word_spans(offsets[start:end]), settings.EXPLAIN_MAX_SPANS)
+            inputs = occluded_inputs(input_ids[start:end].tolist(), spans, occlusion_token_id(tokenizer), tokenizer)
+        return window, spans, words_per_span, inputs, offsets[start:end]
+    
+    @staticmethod
+    def _attribution_sentence(explanation: str, attribution: Dict) -> str:
+        """Acrescenta à explicação os trechos que mais sustentaram o rótulo do modelo"""
+        supporting = list(dict.fromkeys(
+            span["text"] for span in attribution.get("spans", []) if span["attribution"] > 0.01
+        ))[:3]
+        if not supporting:
+            return explanation
+        quoted = ", ".join(f"\"{text}\"" for text in supporting)
+        return f"{explanation} Trechos que mais influenciaram a avaliação do modelo: {quoted}."
+    
+    async def _analyze_text(
+        self,
+        text: str,
+        max_windows: Optional[int],
+        start: float,
+        timings: Optional[Dict[str, float]],
+        key: Optional[str],
+        precomputed_features: Optional[Dict] = None
+    ) -> Dict:
+        """Análise propriamente dita (idioma, cache, quase-duplicatas, modelos e regras)"""
+        # Idioma primeiro: escolhe regras e modelo; idiomas sem suporte param aqui
+        guess = self._identify_language(text)
+        language = guess.language if guess else settings.LANGUAGE_DEFAULT
+        dedicated_model = self.language_models is not None and language in settings.LANGUAGE_MODELS
+        
+        # Textos repetidos literalmente reutilizam o resultado anterior
+        cache_key = key if self.result_cache else None
+        if cache_key:
+            with metrics.stage("cache_lookup"):
+                cached = await self.result_cache.get(cache_key)
+            if cached is not None:
+                metrics.ANALYSES_TOTAL.inc(outcome="cached")
+                return self._with_timings(cached, start, timings)
+        
+        loop = asyncio.get_event_loop()
+        
+        # Texto quase idêntico a um já analisado: reaproveita o sentimento
+        # (padrões e características são sempre calculados sobre este texto)
+        signature, near_duplicate = None, None
+        if self.near_duplicates is not None and not max_windows:
+            with metrics.stage("near_duplicate"):
+                signature = self.near_duplicates.signature(text)
+                near_duplicate = self.near_duplicates.query(signature)
+        
+        # Inferência sobrecarregada: responder só com as regras ou rejeitar
+        degraded = False
+        if near_duplicate is None and self.overload and not max_windows:
+            load_state = self.overload.current_state()
+            if load_state != LoadState.NORMAL:
+                self.overload.record(load_state)
+            if load_state == LoadState.SHEDDING:
+                metrics.ANALYSES_TOTAL.inc(outcome="shed")
+                raise ServiceOverloadedException(
+                    retry_after=settings.INFERENCE_RETRY_AFTER_SECONDS,
+                    details={"reason": "load_shedding", "inference_latency_ms": self.overload.pressure_ms}
+                )
+            degraded = load_state == LoadState.DEGRADED
+        
+        cascade_tier = None
+        if near_duplicate is None and self.cascade and not max_windows and not degraded and not dedicated_model:
+            # Cascata: regras primeiro; modelos só enquanto o nível depender do sentimento
+            suspicious_phrases = await self._detect_suspicious_patterns(text, loop, language)
+            linguistic_features = await self._analyze_linguistic_features(text, loop, precomputed_features)
+            try:
+                sentiment_result, cascade_tier = await self._cascade_sentiment(
+                    text, loop, suspicious_phrases, linguistic_features
+                )
+            except ServiceOverloadedException as e:
+                sentiment_result = e
+        else:
+            if near_duplicate is not None:
+                sentiment_analysis = self._reuse_sentiment(near_duplicate["payload"])
+            elif degraded:
+                sentiment_analysis = self._reuse_sentiment(SKIPPED_SENTIMENT)
+            elif dedicated_model:
+                sentiment_analysis = self._language_sentiment(text, loop, max_windows, language)
+            else:
+                sentiment_analysis = self._analyze_sentiment(text, loop, max_windows)
+            
+            # Análises paralelas
+            results = await asyncio.gather(
+                sentiment_analysis,
+                self._detect_suspicious_patterns(text, loop, language),
+                self._analyze_linguistic_features(text, loop, precomputed_features),
+                return_exceptions=True
+            )
+            
+            sentiment_result, suspicious_phrases, linguistic_features = results
         
-        sentiment_result, suspicious_phrases, linguistic_features = results
+        # Fila de inferência cheia: responder 429 em vez de um resultado parcial
+        if isinstance(sentiment_result, ServiceOverloadedException):
+            metrics.ANALYSES_TOTAL.inc(outcome="overloaded")
+            raise sentiment_result
         
-        # Calcular score de confiabilidade
-        reliability_score = self._calculate_reliability_score(
+        with metrics.stage("scoring"):
+            result = self.build_result(sentiment_result, suspicious_phrases, linguistic_features)
+        result["metadata"] = {
+            "text_length": len(text),
+            "linguistic_features": linguistic_features,
+            "sentiment": sentiment_result
+        }
+        if guess is not None:
+            result["metadata"]["language"] = guess.as_metadata()
+        if near_duplicate is not None:
+            result["metadata"]["near_duplicate"] = {
+                "matched_id": near_duplicate["matched_id"],
+                "similarity": near_duplicate["similarity"]
+            }
+        if cascade_tier is not None:
+            result["metadata"]["cascade_tier"] = cascade_tier
+        if degraded:
+            # Sem sentimento, o score é menos confiável
+            result["confidence"] = max(0.0, round(result["confidence"] - settings.OVERLOAD_CONFIDENCE_PENALTY, 2))
+            result["metadata"]["degraded"] = {
+                "mode": "rules_only",
+                "reason": "overload",
+                "inference_latency_ms": self.overload.pressure_ms
+            }
+        
+        # Não armazenar resultados obtidos com o fallback de sentimento ou degradados
+        if sentiment_result.get("fallback"):
+            metrics.ANALYSES_TOTAL.inc(outcome="fallback")
+        elif degraded:
+            metrics.ANALYSES_TOTAL.inc(outcome="degraded")
+        else:
+            metrics.ANALYSES_TOTAL.inc(outcome="near_duplicate" if near_duplicate else "computed")
+            if cache_key:
+                await self.result_cache.set(cache_key, result)
+            if signature is not None and near_duplicate is None and cascade_tier in (None, TIER_FULL):
+                # Janelas apontam posições deste texto; não valem para outro
+                payload = {key: value for key, value in sentiment_result.items() if key != "windows"}
+                self.near_duplicates.add(text_id(text), signature, payload)
+        
+        return self._with_timings(result, start, timings)
+    
+    def _identify_language(self, text: str) -> Optional[LanguageGuess]:
+        """
+        Idioma do texto (None sem identificação)
+        
+        Só um idioma identificado com evidência clara e fora de
+        LANGUAGES_SUPPORTED responde 422; os casos duvidosos já vêm como
+        LANGUAGE_DEFAULT.
+        """
+        if self.language_identifier is None:
+            return None
+        with metrics.stage("language"):
+            guess = self.language_identifier.identify(text)
+        if guess.language not in self.pattern_engines:
+            metrics.ANALYSES_TOTAL.inc(outcome="unsupported_language")
+            raise UnsupportedLanguageException(guess.language, list(self.pattern_engines))
+        return guess
+    
+    def build_result(
+        self,
+        sentiment_result: Dict,
+        suspicious_phrases: List[PhraseMatch],
+        linguistic_features: Dict
+    ) -> Dict:
+        """Score, nível, explicação e confiança a partir das três análises"""
+        # Calcular score de confiabilidade e confiança geral
+        reliability_score, confidence = self._calculate_score(
             sentiment_result,
             suspicious_phrases,
             linguistic_features
@@ -99,170 +865,282 @@ class NLPService:
             linguistic_features
         )
         
-        # Calcular confiança geral
-        confidence = self._calculate_confidence(
-            sentiment_result,
-            suspicious_phrases,
-            linguistic_features
-        )
-        
         return {
             "reliability_score": reliability_score,
             "reliability_level": reliability_level,
             "explanation": explanation,
             "suspicious_phrases": suspicious_phrases,
-            "confidence": confidence,
-            "metadata": {
-                "text_length": len(text),
-                "linguistic_features": linguistic_features
-            }
+            "confidence": confidence
         }
     
-    async def _analyze_sentiment(self, text: str, loop: asyncio.AbstractEventLoop) -> Dict:
-        """Analisa o sentimento do texto"""
-        if not self.sentiment_analyzer:
+    @staticmethod
+    def _with_timings(result: Dict, start: float, timings: Optional[Dict[str, float]]) -> Dict:
+        """
+        Cópia rasa do resultado com os tempos desta requisição nos metadados
+        
+        `timings_ms` é o próprio dicionário da requisição, de modo que etapas
+        posteriores (serialização na rota) ainda aparecem na resposta.
+        """
+        metadata = {**result.get("metadata", {}), "processing_time": round(time.perf_counter() - start, 4)}
+        if timings is not None:
+            metadata["timings_ms"] = timings
+        return {**result, "metadata": metadata}
+    
+    async def _analyze_sentiment(
+        self,
+        text: str,
+        loop: asyncio.AbstractEventLoop,
+        max_windows: Optional[int] = None,
+        model: Optional[RegisteredModel] = None
+    ) -> Dict:
+        """
+        Analisa o sentimento do texto completo
+        
+        O texto é dividido em janelas de tokens sobrepostas; todas as janelas
+        do documento entram juntas na fila de micro-batching e são
+        processadas no mesmo forward. O resultado agrega as janelas
+        ponderando pelo número de tokens. `model` escolhe outro modelo
+        registrado (padrão: o principal).
+        """
+        batcher = model.batcher if model else self.sentiment_batcher
+        if not batcher or (model is None and not self.sentiment_backend):
             return {"label": "NEUTRAL", "score": 0.5}
         
         try:
-            # Limitar tamanho do texto para o modelo
-            text_chunk = text[:512]
-            result = await loop.run_in_executor(
-                None,
-                self.sentiment_analyzer,
-                text_chunk
+            # O contexto é copiado para que as etapas medidas na thread
+            # (tokenização, janelas) entrem nos tempos desta requisição
+            windows, coverage = await loop.run_in_executor(
+                None, contextvars.copy_context().run, self._encode_windows, text, max_windows, model
             )
+            if not windows:
+                return {"label": "NEUTRAL", "score": 0.5}
             
-            if isinstance(result, list) and len(result) > 0:
-                return result[0]
-            return {"label": "NEUTRAL", "score": 0.5}
+            window_scores = await batcher.submit_many(
+                [window["input_ids"] for window in windows]
+            )
+            
+            return self.summarize_windows(self._scored_windows(windows, window_scores), coverage)
+        except ServiceOverloadedException:
+            raise
         except Exception as e:
             print(f"Erro na análise de sentimento: {e}")
-            return {"label": "NEUTRAL", "score": 0.5}
+            return {"label": "NEUTRAL", "score": 0.5, "fallback": True}
     
-    async def _detect_suspicious_patterns(self, text: str, loop: asyncio.AbstractEventLoop) -> List[SuspiciousPhrase]:
-        """Detecta padrões suspeitos no texto"""
-        suspicious_phrases = []
-        
-        # Padrões de linguagem suspeita
-        patterns = [
-            {
-                "pattern": r'\b(garantido|100%|absolutamente|certamente|sem dúvida|definitivamente)\b',
-                "reason": "Linguagem de certeza absoluta",
-                "confidence": 0.7
-            },
+    @staticmethod
+    def _scored_windows(windows: List[Dict], window_scores: List[Dict[str, float]], offset: int = 0) -> List[Dict]:
+        """Intervalo de caracteres, número de tokens e scores de cada janela"""
+        return [
             {
-                "pattern": r'\b(urgente|agora|imediatamente|não perca|última chance)\b',
-                "reason": "Linguagem de urgência excessiva",
-                "confidence": 0.65
-            },
-            {
-                "pattern": r'\b(eles não querem que você saiba|escondem de você|conspiração)\b',
-                "reason": "Linguagem conspiratória",
-                "confidence": 0.8
-            },
-            {
-                "pattern": r'!{2,}',
-                "reason": "Uso excessivo de exclamações",
-                "confidence": 0.5
-            },
-            {
-                "pattern": r'\b(CLIQUE AQUI|COMPARTILHE|ENVIE PARA TODOS)\b',
-                "reason": "Chamadas de ação agressivas",
-                "confidence": 0.75
+                "start_index": window["start_index"] + offset,
+                "end_index": window["end_index"] + offset,
+                "tokens": window["token_end"] - window["token_start"],
+                "scores": window_score
             }
+            for window, window_score in zip(windows, window_scores)
         ]
-        
-        for pattern_info in patterns:
-            matches = re.finditer(pattern_info["pattern"], text, re.IGNORECASE)
-            for match in matches:
-                suspicious_phrases.append(
-                    SuspiciousPhrase(
-                        text=match.group(),
-                        start_index=match.start(),
-                        end_index=match.end(),
-                        reason=pattern_info["reason"],
-                        confidence=pattern_info["confidence"]
-                    )
-                )
-        
-        return suspicious_phrases
     
-    async def _analyze_linguistic_features(self, text: str, loop: asyncio.AbstractEventLoop) -> Dict:
-        """Analisa características linguísticas do texto"""
-        # Contar palavras
-        words = text.split()
-        word_count = len(words)
+    @staticmethod
+    def summarize_windows(scored_windows: List[Dict], coverage: float = 1.0) -> Dict:
+        """Sentimento do documento a partir das janelas pontuadas (média ponderada por tokens)"""
+        if not scored_windows:
+            return {"label": "NEUTRAL", "score": 0.5}
         
-        # Contar sentenças (aproximado)
-        sentences = re.split(r'[.!?]+', text)
-        sentence_count = len([s for s in sentences if s.strip()])
+        scores = aggregate_window_scores(
+            [window["scores"] for window in scored_windows],
+            [window["tokens"] for window in scored_windows]
+        )
+        label = max(scores, key=scores.get)
         
-        # Calcular média de palavras por sentença
-        avg_words_per_sentence = word_count / sentence_count if sentence_count > 0 else 0
+        return {
+            "label": label,
+            "score": round(scores[label], 4),
+            "scores": {name: round(value, 4) for name, value in scores.items()},
+            "coverage": coverage,
+            "windows": [
+                {
+                    "start_index": window["start_index"],
+                    "end_index": window["end_index"],
+                    "label": max(window["scores"], key=window["scores"].get),
+                    "score": round(max(window["scores"].values()), 4),
+                    "scores": {name: round(value, 4) for name, value in window["scores"].items()}
+                }
+                for window in scored_windows
+            ]
+        }
+    
+    async def score_windows(self, text: str, offset: int = 0) -> List[Dict]:
+        """
+        Pontua todas as janelas de `text`, sem o limite de SENTIMENT_MAX_WINDOWS
         
-        # Contar palavras em maiúsculas
-        uppercase_words = sum(1 for word in words if word.isupper() and len(word) > 1)
-        uppercase_ratio = uppercase_words / word_count if word_count > 0 else 0
+        Usado pela análise incremental, que pontua só o trecho alterado de um
+        documento (`offset` é a posição do trecho no documento). Propaga
+        ServiceOverloadedException para que quem chama tente mais tarde.
+        """
+        if not self.sentiment_backend or not self.sentiment_batcher or not text.strip():
+            return []
         
-        # Contar exclamações e interrogações
-        exclamation_count = text.count('!')
-        question_count = text.count('?')
+        loop = asyncio.get_running_loop()
+        windows, _ = await loop.run_in_executor(
+            None, contextvars.copy_context().run, self._encode_windows, text, UNLIMITED_WINDOWS
+        )
+        if not windows:
+            return []
         
-        return {
-            "word_count": word_count,
-            "sentence_count": sentence_count,
-            "avg_words_per_sentence": avg_words_per_sentence,
-            "uppercase_ratio": uppercase_ratio,
-            "exclamation_count": exclamation_count,
-            "question_count": question_count
-        }
+        window_scores = await self.sentiment_batcher.submit_many(
+            [window["input_ids"] for window in windows]
+        )
+        return self._scored_windows(windows, window_scores, offset)
     
-    def _calculate_reliability_score(
+    async def _cascade_sentiment(
         self,
-        sentiment_result: Dict,
-        suspicious_phrases: List[SuspiciousPhrase],
+        text: str,
+        loop: asyncio.AbstractEventLoop,
+        suspicious_phrases: List[PhraseMatch],
         linguistic_features: Dict
-    ) -> int:
-        """Calcula o score de confiabilidade (0-100)"""
-        score = 70  # Score base (neutro)
+    ) -> Tuple[Dict, str]:
+        """
+        Sentimento pela cascata: (resultado, camada que resolveu)
         
-        # Ajustar baseado em frases suspeitas
-        if suspicious_phrases:
-            penalty = min(len(suspicious_phrases) * 10, 40)
-            score -= penalty
+        Sem dependência do sentimento, nenhum modelo roda e o score é
+        calculado sem sentimento forte (com as regras, pode ficar até
+        STRONG_SENTIMENT_PENALTY acima do score completo, no mesmo nível).
+        """
+        with metrics.stage("cascade_rules"):
+            undecided = level_depends_on_sentiment(
+                self.scorer.scorer, len(suspicious_phrases), linguistic_features
+            )
+        if not undecided:
+            self.cascade.record(TIER_RULES)
+            return dict(SKIPPED_SENTIMENT), TIER_RULES
         
-        # Ajustar baseado em características linguísticas
-        if linguistic_features["uppercase_ratio"] > 0.1:
-            score -= 15
+        for model in self.models.by_tier(TIER_SMALL):
+            sentiment_result = await self._analyze_sentiment(text, loop, model=model)
+            if self.cascade.small_model_decides(sentiment_result):
+                self.cascade.record(TIER_SMALL)
+                return {**sentiment_result, "model": model.name}, TIER_SMALL
         
-        if linguistic_features["exclamation_count"] > 3:
-            score -= 10
+        self.cascade.record(TIER_FULL)
+        return await self._analyze_sentiment(text, loop), TIER_FULL
+    
+    async def _language_sentiment(
+        self,
+        text: str,
+        loop: asyncio.AbstractEventLoop,
+        max_windows: Optional[int],
+        language: str
+    ) -> Dict:
+        """Sentimento pelo modelo próprio do idioma, carregado sob demanda"""
+        try:
+            async with self.language_models.acquire(language) as model:
+                return await self._analyze_sentiment(text, loop, max_windows, model=model)
+        except ServiceOverloadedException:
+            raise
+        except Exception as e:
+            print(f"Erro no modelo do idioma '{language}': {e}")
+            return {"label": "NEUTRAL", "score": 0.5, "fallback": True}
+    
+    async def _reuse_sentiment(self, sentiment_result: Dict) -> Dict:
+        """Sentimento já conhecido (quase-duplicata, modo degradado), sem inferência"""
+        return dict(sentiment_result)
+    
+    async def _detect_suspicious_patterns(
+        self,
+        text: str,
+        loop: asyncio.AbstractEventLoop,
+        language: Optional[str] = None
+    ) -> List[PhraseMatch]:
+        """Detecta padrões suspeitos no texto (varredura única com as regras do idioma)"""
+        with metrics.stage("pattern_scan"):
+            return self.pattern_engines.get(language, self.pattern_engine).scan(text)
+    
+    async def _analyze_linguistic_features(
+        self,
+        text: str,
+        loop: asyncio.AbstractEventLoop,
+        precomputed: Optional[Dict] = None
+    ) -> Dict:
+        """Analisa características linguísticas do texto (ou usa as extraídas em lote)"""
+        if precomputed is not None:
+            return precomputed
+        with metrics.stage("features"):
+            return self._compute_linguistic_features(text)
+    
+    def _compute_linguistic_features(self, text: str) -> Dict:
+        """Contagens de palavras, sentenças, maiúsculas e pontuação (lote de um texto)"""
+        return extract_linguistic_features([text]).row(0)
+    
+    def linguistic_features_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Características de muitos textos em uma passada vetorizada
         
-        # Ajustar baseado em sentimento extremo
-        if sentiment_result.get("label") in ["NEGATIVE", "POSITIVE"]:
-            sentiment_score = sentiment_result.get("score", 0.5)
-            if sentiment_score > 0.8:  # Sentimento muito forte
-                score -= 5
+        Para lotes (/analyze/batch, `app.cli score`): cada dicionário vai em
+        `analyze_text(..., linguistic_features=...)` do texto correspondente.
+        """
+        if not texts:
+            return []
+        with metrics.stage("features"):
+            return extract_linguistic_features(texts).to_dicts()
+    
+    def score_rules_batch(
+        self,
+        texts: List[str],
+        suspicious_counts: Optional[np.ndarray] = None,
+        strong_sentiment: Optional[np.ndarray] = None
+    ) -> Dict:
+        """
+        Pontua muitos textos de uma vez sem o modelo de sentimento
         
-        # Garantir que está no range 0-100
-        score = max(0, min(100, score))
+        Características são extraídas em lote e o pontuador em uso (regras
+        ou modelo linear) aplicado à matriz inteira. `suspicious_counts`
+        evita refazer a varredura de padrões quando já é conhecida;
+        `strong_sentiment` (booleano por texto) inclui um sentimento já
+        calculado. Sem ele, nenhum texto é pontuado com sentimento forte.
+        """
+        if suspicious_counts is None:
+            with metrics.stage("pattern_scan"):
+                suspicious_counts = np.fromiter(
+                    map(self.pattern_engine.count, texts), dtype=np.int64, count=len(texts)
+                )
+        with metrics.stage("features"):
+            features = extract_linguistic_features(texts)
+        with metrics.stage("scoring"):
+            if strong_sentiment is None:
+                strong_sentiment = np.zeros(len(texts), dtype=bool)
+            scores, confidence = self.scorer.scorer.score(
+                feature_matrix(suspicious_counts, features, strong_sentiment)
+            )
         
-        return int(score)
+        return {
+            "reliability_score": scores,
+            "confidence": confidence,
+            "suspicious_count": suspicious_counts,
+            "linguistic_features": features
+        }
+    
+    def _calculate_score(
+        self,
+        sentiment_result: Dict,
+        suspicious_phrases: List[PhraseMatch],
+        linguistic_features: Dict
+    ) -> Tuple[int, float]:
+        """Score de confiabilidade (0-100) e confiança (0-1) pelo pontuador em uso"""
+        features = feature_matrix(
+            len(suspicious_phrases),
+            linguistic_features,
+            scoring.is_strong_sentiment(sentiment_result.get("label"), sentiment_result.get("score", 0.5))
+        )
+        scores, confidence = self.scorer.scorer.score(features)
+        return int(scores[0]), float(confidence[0])
     
     def _determine_reliability_level(self, score: int) -> ReliabilityLevel:
         """Determina o nível de confiabilidade baseado no score"""
-        if score >= 70:
-            return ReliabilityLevel.RELIABLE
-        elif score >= 50:
-            return ReliabilityLevel.ATTENTION
-        else:
-            return ReliabilityLevel.QUESTIONABLE
+        return scoring.reliability_level(score)
     
     def _generate_explanation(
         self,
         score: int,
         level: ReliabilityLevel,
-        suspicious_phrases: List[SuspiciousPhrase],
+        suspicious_phrases: List[PhraseMatch],
         linguistic_features: Dict
     ) -> str:
         """Gera uma explicação clara do resultado"""
@@ -278,7 +1156,7 @@ class NLPService:
         
         # Adicionar detalhes sobre frases suspeitas
         if suspicious_phrases:
-            unique_reasons = list(set([p.reason for p in suspicious_phrases]))
+            unique_reasons = list(dict.fromkeys(p.reason for p in suspicious_phrases))  # ordem estável entre processos
             if unique_reasons:
                 explanations.append(f"Foram identificados padrões como: {', '.join(unique_reasons[:3])}.")
         
@@ -294,33 +1172,54 @@ class NLPService:
         
         return " ".join(explanations)
     
-    def _calculate_confidence(
-        self,
-        sentiment_result: Dict,
-        suspicious_phrases: List[SuspiciousPhrase],
-        linguistic_features: Dict
-    ) -> float:
-        """Calcula a confiança geral da análise (0-1)"""
-        # Base de confiança
-        confidence = 0.7
-        
-        # Aumentar confiança se há muitas frases suspeitas
-        if len(suspicious_phrases) >= 3:
-            confidence = min(0.9, confidence + 0.1)
-        
-        # Aumentar confiança se características linguísticas são claras
-        if linguistic_features["uppercase_ratio"] > 0.15 or linguistic_features["exclamation_count"] > 5:
-            confidence = min(0.9, confidence + 0.1)
-        
-        # Reduzir confiança se texto é muito curto
-        if linguistic_features["word_count"] < 50:
-            confidence = max(0.5, confidence - 0.2)
-        
-        return round(confidence, 2)
+    def get_stats(self) -> Dict:
+        """Retorna métricas operacionais do serviço"""
+        return {
+            "initialized": self.initialized,
+            "startup_ms": self.startup_timings,
+            "sentiment_batching": (
+                self.sentiment_batcher.get_stats() if self.sentiment_batcher else None
+            ),
+            "result_cache": self.result_cache.get_stats() if self.result_cache else None,
+            "scorer": self.scorer.get_stats(),
+            "token_cache": self.token_cache.get_stats() if self.token_cache else None,
+            "coalescing": self.coalescer.get_stats() if self.coalescer else None,
+            "overload": self.overload.get_stats() if self.overload else None,
+            "models": self.models.get_stats(),
+            "cascade": self.cascade.get_stats() if self.cascade else None,
+            "language": self.language_identifier.get_stats() if self.language_identifier else None,
+            "language_models": self.language_models.get_stats() if self.language_models else None,
+            "near_duplicates": (
+                self.near_duplicates.get_stats() if self.near_duplicates is not None else None
+            ),
+            "inference_workers": self.worker_pool.get_stats() if self.worker_pool else None,
+            "process": read_process_memory()
+        }
     
     async def cleanup(self):
         """Limpa recursos dos modelos"""
+        if self.sentiment_batcher:
+            await self.sentiment_batcher.close()
+            self.sentiment_batcher = None
+        await self.models.close()
+        if self.language_models:
+            await self.language_models.close()
+        if self.worker_pool:
+            self.worker_pool.close()
+            self.worker_pool = None
+        if self.result_cache:
+            self.result_cache.close()
+        if self.token_cache:
+            self.token_cache.clear()
+        # Sob o servidor prefork só o worker primário grava (um único escritor)
+        if self.near_duplicates is not None and settings.NEAR_DUPLICATE_SNAPSHOT_PATH and settings.PRIMARY_WORKER:
+            try:
+                self.near_duplicates.save(settings.NEAR_DUPLICATE_SNAPSHOT_PATH)
+            except Exception as e:
+                print(f"Erro ao gravar snapshot de quase-duplicatas: {e}")
+        self.near_duplicates = None
         self.sentiment_analyzer = None
+        self.sentiment_backend = None
         self.model = None
         self.tokenizer = None
         self.initialized = False
@@ -0,0 +1,162 @@
+"""
+Controle de sobrecarga da inferência
+Com a latência da fila de inferência acima dos SLOs, novas análises são
+respondidas só com as regras (modo degradado) ou rejeitadas (429)
+"""
+
+import math
+import time
+from enum import Enum
+from typing import Dict, Optional
+
+
+class LoadState(str, Enum):
+    """Estados do controle de sobrecarga, do mais leve ao mais restrito"""
+    NORMAL = "normal"
+    DEGRADED = "degraded"  # sem sentimento: padrões e características apenas
+    SHEDDING = "shedding"  # novas análises rejeitadas com 429
+
+
+_LEVELS = (LoadState.NORMAL, LoadState.DEGRADED, LoadState.SHEDDING)
+
+
+class OverloadController:
+    """
+    Decide o modo de atendimento a partir da latência de inferência
+    
+    Cada lote concluído informa a latência do item mais antigo (espera na
+    fila + forward). A pressão é uma média móvel exponencial dessa
+    latência que decai com o tempo sem novas medidas, já que no modo
+    degradado a fila esvazia e deixa de produzir amostras.
+    
+    Há histerese: o estado sobe quando a pressão passa do limiar e só
+    desce quando fica abaixo de `recovery_ratio` vezes o limiar, depois
+    de pelo menos `min_state_seconds` no estado atual.
+    
+    Limiares omitidos (None) são definidos por `calibrate` a partir da
+    latência medida no aquecimento; até lá, o controle fica em NORMAL.
+    """
+    
+    def __init__(
+        self,
+        degrade_latency_ms: Optional[float] = None,
+        shed_latency_ms: Optional[float] = None,
+        recovery_ratio: float = 0.5,
+        ewma_alpha: float = 0.2,
+        decay_seconds: float = 5.0,
+        min_state_seconds: float = 1.0
+    ):
+        self.degrade_latency = degrade_latency_ms / 1000.0 if degrade_latency_ms is not None else None
+        self._shed_auto = shed_latency_ms is None
+        self.shed_latency = shed_latency_ms / 1000.0 if shed_latency_ms else None
+        self.reference_latency: Optional[float] = None
+        self.recovery_ratio = recovery_ratio
+        self.ewma_alpha = ewma_alpha
+        self.decay_seconds = max(decay_seconds, 1e-3)
+        self.min_state_seconds = min_state_seconds
+        
+        self.state = LoadState.NORMAL
+        self._latency = 0.0
+        self._last_sample: Optional[float] = None
+        self._state_since = time.monotonic()
+        
+        # Métricas
+        self.transitions = 0
+        self.degraded_total = 0
+        self.shed_total = 0
+    
+    @property
+    def active(self) -> bool:
+        """Há limiar de degradação (fixo ou calibrado)"""
+        return self.degrade_latency is not None
+    
+    def calibrate(self, reference_seconds: float, factor: float = 3.0, minimum_ms: float = 250.0):
+        """
+        Define os limiares omitidos a partir da latência de referência
+        
+        `reference_seconds` é o tempo de um lote cheio neste hardware; a
+        degradação começa em `factor` vezes esse tempo (no mínimo
+        `minimum_ms`) e a rejeição, em 4 vezes o limiar de degradação.
+        """
+        self.reference_latency = reference_seconds
+        if self.degrade_latency is None:
+            self.degrade_latency = max(reference_seconds * factor, minimum_ms / 1000.0)
+        if self._shed_auto:
+            self.shed_latency = self.degrade_latency * 4
+        shed = f"{self.shed_latency * 1000:.0f} ms" if self.shed_latency else "desativado"
+        print(f"Controle de sobrecarga: degradar acima de {self.degrade_latency * 1000:.0f} ms, "
+              f"rejeitar: {shed} (lote cheio no aquecimento: {reference_seconds * 1000:.0f} ms)")
+    
+    def observe(self, latency_seconds: float):
+        """Registra a latência de um lote de inferência concluído"""
+        now = time.monotonic()
+        current = self._decayed(now)
+        self._latency = current + self.ewma_alpha * (latency_seconds - current)
+        self._last_sample = now
+    
+    def _decayed(self, now: float) -> float:
+        if self._last_sample is None:
+            return 0.0
+        return self._latency * math.exp(-(now - self._last_sample) / self.decay_seconds)
+    
+    def _threshold(self, state: LoadState) -> Optional[float]:
+        """Pressão que leva ao estado (None: estado desativado)"""
+        if state == LoadState.DEGRADED:
+            return self.degrade_latency
+        if state == LoadState.SHEDDING:
+            return self.shed_latency
+        return 0.0
+    
+    def current_state(self) -> LoadState:
+        """Estado para uma nova análise, atualizado com a pressão atual"""
+        if not self.active:
+            return self.state
+        now = time.monotonic()
+        pressure = self._decayed(now)
+        level = _LEVELS.index(self.state)
+        
+        # Subir: o estado mais restrito cujo limiar foi ultrapassado
+        target = level
+        for index in range(len(_LEVELS) - 1, level, -1):
+            threshold = self._threshold(_LEVELS[index])
+            if threshold is not None and pressure > threshold:
+                target = index
+                break
+        
+        # Descer: um nível por vez, com folga e tempo mínimo no estado
+        if target == level and level > 0 and now - self._state_since >= self.min_state_seconds:
+            if pressure < self._threshold(_LEVELS[level]) * self.recovery_ratio:
+                target = level - 1
+        
+        if target != level:
+            self.state = _LEVELS[target]
+            self._state_since = now
+            self.transitions += 1
+            print(f"Controle de sobrecarga: {_LEVELS[level].value} -> {self.state.value} "
+                  f"(latência de inferência {pressure * 1000:.0f} ms)")
+        return self.state
+    
+    def record(self, state: LoadState):
+        """Conta uma análise atendida fora do modo normal"""
+        if state == LoadState.DEGRADED:
+            self.degraded_total += 1
+        elif state == LoadState.SHEDDING:
+            self.shed_total += 1
+    
+    @property
+    def pressure_ms(self) -> float:
+        return round(self._decayed(time.monotonic()) * 1000.0, 1)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "state": self.state.value,
+            "inference_latency_ms": self.pressure_ms,
+            "degrade_latency_ms": self.degrade_latency * 1000.0 if self.degrade_latency else None,
+            "shed_latency_ms": self.shed_latency * 1000.0 if self.shed_latency else None,
+            "warmup_batch_latency_ms": (
+                round(self.reference_latency * 1000.0, 1) if self.reference_latency is not None else None
+            ),
+            "transitions": self.transitions,
+            "degraded_total": self.degraded_total,
+            "shed_total": self.shed_total
+        }
@@ -0,0 +1,155 @@
+"""
+Motor de detecção de padrões suspeitos
+Compila todas as regras uma única vez em uma expressão combinada, de modo
+que cada texto é percorrido uma só vez
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.payloads import PhraseMatch
+
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "suspicious_patterns.json"
+
+
+def default_rules_path(language: str) -> Path:
+    """Arquivo de regras distribuído para o idioma (português: o arquivo original)"""
+    if language == "pt":
+        return DEFAULT_RULES_PATH
+    return DEFAULT_RULES_PATH.with_name(f"suspicious_patterns.{language}.json")
+
+
+class PatternRule(BaseModel):
+    """Regra de linguagem suspeita carregada do arquivo de regras"""
+    id: str = Field(..., pattern=r"^[A-Za-z_][A-Za-z0-9_]*$", description="Identificador da regra")
+    reason: str = Field(..., description="Razão exibida ao usuário")
+    confidence: float = Field(..., ge=0.0, le=1.0, description="Confiança da detecção (0-1)")
+    phrases: List[str] = Field(default_factory=list, description="Lista de frases literais")
+    pattern: Optional[str] = Field(None, description="Expressão regular (alternativa às frases)")
+    word_boundary: bool = Field(True, description="Exigir limite de palavra nas frases")
+    
+    @model_validator(mode="after")
+    def check_source(self) -> "PatternRule":
+        if bool(self.phrases) == bool(self.pattern):
+            raise ValueError(f"Regra '{self.id}' deve definir 'phrases' ou 'pattern'")
+        return self
+
+
+class PatternRuleSet(BaseModel):
+    """Conjunto versionado de regras"""
+    version: str = Field(..., description="Versão do conjunto de regras")
+    language: str = Field("pt", description="Idioma dos textos a que as regras se aplicam")
+    description: str = ""
+    rules: List[PatternRule]
+
+
+def _trie_regex(phrases: List[str]) -> str:
+    """
+    Converte uma lista de frases literais em uma expressão baseada em trie
+    
+    Prefixos comuns são fatorados, então o custo de testar uma posição do
+    texto depende do tamanho da frase e não da quantidade de frases.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: Dict) -> Optional[str]:
+        terminal = "" in node
+        branches = []
+        single_chars = []
+        
+        for char in sorted(key for key in node if key):
+            child = build(node[char])
+            if child is None:
+                single_chars.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + child)
+        
+        if not branches and not single_chars:
+            return None
+        
+        if single_chars:
+            branches.append(single_chars[0] if len(single_chars) == 1 else "[" + "".join(single_chars) + "]")
+        
+        result = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            result = "(?:" + result + ")?"
+        return result
+    
+    return build(trie) or ""
+
+
+class PatternEngine:
+    """
+    Detector de padrões suspeitos em uma única varredura
+    
+    Cada regra vira um grupo nomeado de uma alternância combinada; o nome do
+    grupo que casou (`match.lastgroup`) aponta para a razão e a confiança da
+    regra. Como a varredura é única, trechos sobrepostos de regras
+    diferentes produzem apenas a ocorrência que começa primeiro.
+    """
+    
+    def __init__(self, rule_set: PatternRuleSet):
+        self.version = rule_set.version
+        self.language = rule_set.language
+        self.rules: Dict[str, PatternRule] = {}
+        alternatives = []
+        
+        for rule in rule_set.rules:
+            if rule.id in self.rules:
+                raise ValueError(f"Regra duplicada: '{rule.id}'")
+            self.rules[rule.id] = rule
+            
+            if rule.pattern:
+                body = rule.pattern
+            else:
+                body = _trie_regex(rule.phrases)
+                if rule.word_boundary:
+                    body = r"\b(?:" + body + r")\b"
+            
+            # Validar cada regra isoladamente para mensagens de erro claras
+            try:
+                re.compile(body)
+            except re.error as e:
+                raise ValueError(f"Regra '{rule.id}' inválida: {e}")
+            
+            alternatives.append(f"(?P<{rule.id}>{body})")
+        
+        self._regex = re.compile("|".join(alternatives), re.IGNORECASE)
+    
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "PatternEngine":
+        """Carrega e compila as regras de um arquivo JSON versionado"""
+        rules_path = Path(path) if path else DEFAULT_RULES_PATH
+        with open(rules_path, encoding="utf-8") as f:
+            return cls(PatternRuleSet.model_validate(json.load(f)))
+    
+    def scan(self, text: str, start: int = 0, stop: Optional[int] = None) -> List[PhraseMatch]:
+        """
+        Retorna as frases suspeitas do texto, em ordem de posição
+        
+        `start`/`stop` limitam a varredura às ocorrências que começam nesse
+        intervalo; o restante do texto ainda é visto pelas âncoras (`\\b`).
+        """
+        phrases = []
+        for match in self._regex.finditer(text, start):
+            if stop is not None and match.start() >= stop:
+                break
+            rule = self.rules[match.lastgroup]
+            phrases.append(
+                PhraseMatch(match.group(), match.start(), match.end(), rule.reason, rule.confidence)
+            )
+        return phrases
+    
+    def count(self, text: str) -> int:
+        """Número de frases suspeitas de `scan`, sem construir os objetos"""
+        return sum(1 for _ in self._regex.finditer(text))
@@ -0,0 +1,172 @@
+"""
+Registro dos modelos de sentimento servidos
+Cada modelo tem seu backend, tokenizer e fila de micro-batching
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+
+class RegisteredModel:
+    """Um modelo de sentimento carregado e pronto para inferência"""
+    
+    def __init__(self, name: str, source: str, tier: str, backend, tokenizer, batcher=None):
+        self.name = name
+        self.source = source
+        self.tier = tier  # posição na cascata: "small" ou "full"
+        self.backend = backend
+        self.tokenizer = tokenizer
+        self.batcher = batcher
+    
+    def get_stats(self) -> Dict:
+        return {
+            "source": self.source,
+            "tier": self.tier,
+            "backend": getattr(self.backend, "name", None),
+            "batching": self.batcher.get_stats() if self.batcher else None
+        }
+
+
+class ModelRegistry:
+    """
+    Modelos disponíveis por nome
+    
+    O modelo principal (`NLP_MODEL_NAME`/`NLP_MODEL_PATH`) é sempre
+    registrado como "primary"; modelos menores entram como camadas
+    anteriores da cascata.
+    """
+    
+    def __init__(self):
+        self._models: Dict[str, RegisteredModel] = {}
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._models
+    
+    def __len__(self) -> int:
+        return len(self._models)
+    
+    def register(self, model: RegisteredModel):
+        self._models[model.name] = model
+    
+    def get(self, name: str) -> Optional[RegisteredModel]:
+        return self._models.get(name)
+    
+    def by_tier(self, tier: str) -> List[RegisteredModel]:
+        return [model for model in self._models.values() if model.tier == tier]
+    
+    async def close(self):
+        """Encerra as filas de inferência de todos os modelos"""
+        for model in self._models.values():
+            if model.batcher:
+                await model.batcher.close()
+        self._models.clear()
+    
+    def get_stats(self) -> Dict:
+        return {name: model.get_stats() for name, model in self._models.items()}
+
+
+class ModelSlots:
+    """
+    Modelos carregados sob demanda, no máximo `max_loaded` ao mesmo tempo
+    
+    `acquire(name)` carrega o modelo na primeira vez (`loader` roda em
+    thread separada) e o mantém em uso até o fim do bloco. Para abrir
+    espaço, os modelos ociosos são descarregados do menos recentemente
+    usado para o mais recente; modelos em uso nunca são descarregados, então
+    o limite pode ser excedido temporariamente. Modelos ociosos há mais de
+    `idle_seconds` também são descarregados (verificado a cada uso).
+    """
+    
+    def __init__(self, loader: Callable[[str], RegisteredModel], max_loaded: int = 1, idle_seconds: float = 0.0):
+        self.loader = loader
+        self.max_loaded = max(1, max_loaded)
+        self.idle_seconds = idle_seconds
+        self._loaded: "OrderedDict[str, RegisteredModel]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        
+        # Métricas
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+    
+    @asynccontextmanager
+    async def acquire(self, name: str) -> AsyncIterator[RegisteredModel]:
+        model = await self._get(name)
+        try:
+            yield model
+        finally:
+            self._in_use[name] -= 1
+            self._last_used[name] = time.monotonic()
+            await self._evict()
+    
+    async def _get(self, name: str) -> RegisteredModel:
+        """Modelo carregado (carregando se preciso), já marcado como em uso"""
+        model = self._loaded.get(name)
+        if model is None:
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                model = self._loaded.get(name)
+                if model is None:
+                    # Liberar espaço antes de carregar, para não somar a memória dos dois
+                    await self._evict(reserve=1)
+                    loop = asyncio.get_running_loop()
+                    model = await loop.run_in_executor(None, self.loader, name)
+                    self._loaded[name] = model
+                    self.loads += 1
+                    print(f"Modelo '{name}' carregado ({len(self._loaded)}/{self.max_loaded} slots)")
+                else:
+                    self.hits += 1
+        else:
+            self.hits += 1
+        
+        self._loaded.move_to_end(name)
+        self._in_use[name] = self._in_use.get(name, 0) + 1
+        return model
+    
+    async def _evict(self, reserve: int = 0):
+        """Descarrega modelos ociosos: expirados e, acima do limite, os mais antigos"""
+        now = time.monotonic()
+        expired = [
+            name for name in self._loaded
+            if self.idle_seconds > 0 and not self._in_use.get(name)
+            and now - self._last_used.get(name, now) > self.idle_seconds
+        ]
+        excess = len(self._loaded) - len(expired) + reserve - self.max_loaded
+        for name in self._loaded:
+            if excess <= 0:
+                break
+            if name not in expired and not self._in_use.get(name):
+                expired.append(name)
+                excess -= 1
+        
+        # Retirar todos os escolhidos antes do primeiro await: durante o
+        # fechamento de um, outra coroutine não pode adquirir o próximo
+        victims = [(name, self._loaded.pop(name)) for name in expired]
+        for name, model in victims:
+            self.evictions += 1
+            print(f"Modelo '{name}' descarregado")
+            if model.batcher:
+                await model.batcher.close()
+    
+    async def close(self):
+        for model in self._loaded.values():
+            if model.batcher:
+                await model.batcher.close()
+        self._loaded.clear()
+    
+    def get_stats(self) -> Dict:
+        return {
+            "max_loaded": self.max_loaded,
+            "loaded": {
+                name: {**model.get_stats(), "in_use": self._in_use.get(name, 0)}
+                for name, model in self._loaded.items()
+            },
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,263 @@
+"""
+Pontuação de confiabilidade plugável
+O vetor de características (padrões, características linguísticas e
+sentimento) é pontuado pelas regras fixas de `scoring` ou por um modelo
+linear calibrado, em lote com NumPy. O modelo é um arquivo JSON versionado,
+relido quando muda (sem reiniciar o serviço)
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.services import scoring
+
+
+# Colunas da matriz de características, nesta ordem
+FEATURE_NAMES = (
+    "suspicious_count",
+    "word_count",
+    "sentence_count",
+    "avg_words_per_sentence",
+    "uppercase_ratio",
+    "exclamation_count",
+    "question_count",
+    "strong_sentiment"
+)
+LINGUISTIC_FEATURES = FEATURE_NAMES[1:-1]
+_COLUMN = {name: index for index, name in enumerate(FEATURE_NAMES)}
+
+# Formato do arquivo gerado por `python -m app.cli train-scorer`
+ARTIFACT_FORMAT = "veritas-linear-scorer"
+ARTIFACT_FORMAT_VERSION = 1
+CALIBRATION_METHODS = ("none", "platt", "isotonic")
+
+# Momento de modificação registrado quando o arquivo do modelo não existe
+_MISSING = -1
+
+
+def feature_matrix(suspicious_counts, linguistic_features, strong_sentiment) -> np.ndarray:
+    """
+    Matriz de características (textos x FEATURE_NAMES)
+    
+    `linguistic_features` é um LinguisticFeatureBatch ou o dict de uma
+    análise; escalares são repetidos para todas as linhas.
+    """
+    if not isinstance(linguistic_features, dict):
+        linguistic_features = {name: getattr(linguistic_features, name) for name in LINGUISTIC_FEATURES}
+    columns = np.broadcast_arrays(
+        np.asarray(suspicious_counts, dtype=np.float64),
+        *(np.asarray(linguistic_features[name], dtype=np.float64) for name in LINGUISTIC_FEATURES),
+        np.asarray(strong_sentiment, dtype=np.float64)
+    )
+    return np.column_stack([np.atleast_1d(column) for column in columns])
+
+
+class RulesScorer:
+    """Regras fixas de `scoring` (penalidades e limiares) sobre a matriz de características"""
+    
+    kind = "rules"
+    version = "regras"
+    
+    def score(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores (0-100) e confianças (0-1) de cada linha"""
+        suspicious_counts = features[:, _COLUMN["suspicious_count"]].astype(np.int64)
+        uppercase_ratio = features[:, _COLUMN["uppercase_ratio"]]
+        exclamation_count = features[:, _COLUMN["exclamation_count"]]
+        scores = scoring.reliability_scores(
+            suspicious_counts, uppercase_ratio, exclamation_count, features[:, _COLUMN["strong_sentiment"]] > 0
+        )
+        confidence = scoring.confidences(
+            suspicious_counts, uppercase_ratio, exclamation_count, features[:, _COLUMN["word_count"]]
+        )
+        return scores, confidence
+    
+    def describe(self) -> Dict:
+        return {"kind": self.kind, "version": self.version}
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -500.0, 500.0)))
+
+
+class LinearScorer:
+    """
+    Regressão logística calibrada
+    
+    As características escolhidas passam por log1p (contagens), são
+    padronizadas e combinadas linearmente; a calibração (Platt ou isotônica)
+    transforma o resultado na probabilidade de o texto ser confiável. O
+    score é essa probabilidade em 0-100, de modo que os limiares dos níveis
+    (RELIABLE_MIN_SCORE, ATTENTION_MIN_SCORE) continuam valendo; a confiança
+    é a probabilidade da classe prevista.
+    """
+    
+    kind = "linear"
+    
+    def __init__(self, artifact: Dict, version: Optional[str] = None):
+        if artifact.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Formato de modelo de pontuação desconhecido: {artifact.get('format')!r}")
+        if artifact.get("format_version", 0) > ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Versão de formato não suportada: {artifact.get('format_version')}")
+        
+        features = list(artifact["features"])
+        unknown = [name for name in features if name not in _COLUMN]
+        if unknown:
+            raise ValueError(f"Características desconhecidas no modelo: {', '.join(unknown)}")
+        
+        self.features = features
+        self.columns = np.array([_COLUMN[name] for name in features], dtype=np.int64)
+        self.log1p = np.array([name in artifact.get("log1p", ()) for name in features], dtype=bool)
+        self.mean = np.asarray(artifact["mean"], dtype=np.float64)
+        scale = np.asarray(artifact["scale"], dtype=np.float64)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.coef = np.asarray(artifact["coef"], dtype=np.float64)
+        self.intercept = float(artifact["intercept"])
+        if not (self.mean.shape == self.scale.shape == self.coef.shape == (len(features),)):
+            raise ValueError("mean, scale e coef precisam ter uma posição por característica")
+        
+        calibration = artifact.get("calibration") or {"method": "none"}
+        self.calibration = calibration["method"]
+        if self.calibration not in CALIBRATION_METHODS:
+            raise ValueError(f"Calibração desconhecida: {self.calibration!r}")
+        if self.calibration == "platt":
+            self.platt = (float(calibration["a"]), float(calibration["b"]))
+        elif self.calibration == "isotonic":
+            self.isotonic_x = np.asarray(calibration["x"], dtype=np.float64)
+            self.isotonic_y = np.asarray(calibration["y"], dtype=np.float64)
+            if self.isotonic_x.size == 0 or self.isotonic_x.shape != self.isotonic_y.shape:
+                raise ValueError("Calibração isotônica sem pontos ou com x e y de tamanhos diferentes")
+            if np.any(np.diff(self.isotonic_x) < 0):
+                raise ValueError("Os pontos x da calibração isotônica precisam ser crescentes")
+        
+        self.version = version or artifact.get("version") or "linear"
+        self.metrics = artifact.get("metrics") or {}
+        self.trained_at = artifact.get("trained_at")
+    
+    @classmethod
+    def from_file(cls, path: str) -> "LinearScorer":
+        """Carrega o arquivo; sem versão declarada, a versão é o resumo do conteúdo"""
+        with open(path, "rb") as f:
+            data = f.read()
+        artifact = orjson.loads(data)
+        version = artifact.get("version") or f"linear-{hashlib.sha256(data).hexdigest()[:12]}"
+        return cls(artifact, version)
+    
+    def decision(self, features: np.ndarray) -> np.ndarray:
+        """Combinação linear (logit antes da calibração) de cada linha"""
+        x = features[:, self.columns]
+        x = np.where(self.log1p, np.log1p(np.maximum(x, 0.0)), x)
+        return ((x - self.mean) / self.scale) @ self.coef + self.intercept
+    
+    def probabilities(self, features: np.ndarray) -> np.ndarray:
+        """Probabilidade calibrada de cada texto ser confiável"""
+        z = self.decision(features)
+        if self.calibration == "platt":
+            a, b = self.platt
+            return _sigmoid(a * z + b)
+        probability = _sigmoid(z)
+        if self.calibration == "isotonic":
+            probability = np.interp(probability, self.isotonic_x, self.isotonic_y)
+        return probability
+    
+    def score(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores (0-100) e confianças (0-1) de cada linha"""
+        probability = np.clip(self.probabilities(features), 0.0, 1.0)
+        scores = np.rint(probability * 100).astype(np.int64)
+        confidence = np.round(np.maximum(probability, 1.0 - probability), 2)
+        return scores, confidence
+    
+    def describe(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "version": self.version,
+            "trained_at": self.trained_at,
+            "features": self.features,
+            "calibration": self.calibration,
+            "metrics": self.metrics
+        }
+
+
+class ScorerProvider:
+    """
+    Pontuador em uso, com recarga do arquivo do modelo
+    
+    A cada `reload_interval` segundos (no máximo), o momento de modificação
+    do arquivo é conferido; se mudou, o modelo é carregado de novo. Um
+    arquivo inválido não derruba a pontuação: o pontuador anterior continua
+    em uso (as regras, se nenhum modelo foi carregado) até o arquivo mudar
+    outra vez. Grave o arquivo com rename atômico, como faz `train-scorer`.
+    """
+    
+    def __init__(self, path: Optional[str] = None, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._scorer = RulesScorer()
+        self._mtime_ns: Optional[int] = None
+        self._checked_at = time.monotonic()
+        
+        # Métricas
+        self.loads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        
+        if path:
+            self._reload_if_changed()
+    
+    @property
+    def scorer(self):
+        """Pontuador atual (confere o arquivo se o intervalo passou)"""
+        if self.path and self.reload_interval > 0:
+            now = time.monotonic()
+            if now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                self._reload_if_changed()
+        return self._scorer
+    
+    @property
+    def version(self) -> str:
+        return self.scorer.version
+    
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            # Arquivo ausente: avisar uma vez, não a cada verificação
+            if self._mtime_ns != _MISSING:
+                self._mtime_ns = _MISSING
+                self._fail(e)
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+        
+        # Registrado antes da leitura: um arquivo inválido só é relido quando mudar
+        self._mtime_ns = mtime_ns
+        try:
+            scorer = LinearScorer.from_file(self.path)
+        except Exception as e:
+            self._fail(e)
+            return
+        
+        self._scorer = scorer
+        self.loads += 1
+        self.last_error = None
+        print(f"Modelo de pontuação '{scorer.version}' carregado de '{self.path}'")
+    
+    def _fail(self, error: Exception):
+        self.errors += 1
+        self.last_error = str(error)
+        print(f"Erro ao carregar modelo de pontuação '{self.path}': {error} "
+              f"(mantido: '{self._scorer.version}')")
+    
+    def get_stats(self) -> Dict:
+        return {
+            **self._scorer.describe(),
+            "path": self.path,
+            "loads": self.loads,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,95 @@
+"""
+Regras de pontuação de confiabilidade e confiança
+Funções vetorizadas (NumPy) usadas tanto por uma análise isolada quanto
+pela pontuação em lote, para que as duas nunca divirjam
+"""
+
+from typing import List
+
+import numpy as np
+
+from app.core.models import ReliabilityLevel
+
+
+# Score base e penalidades
+BASE_SCORE = 70
+SUSPICIOUS_PHRASE_PENALTY = 10
+MAX_SUSPICIOUS_PENALTY = 40
+UPPERCASE_RATIO_THRESHOLD = 0.1
+UPPERCASE_PENALTY = 15
+EXCLAMATION_THRESHOLD = 3
+EXCLAMATION_PENALTY = 10
+STRONG_SENTIMENT_LABELS = ("NEGATIVE", "POSITIVE")
+STRONG_SENTIMENT_SCORE = 0.8
+STRONG_SENTIMENT_PENALTY = 5
+
+# Limites dos níveis de confiabilidade
+RELIABLE_MIN_SCORE = 70
+ATTENTION_MIN_SCORE = 50
+
+
+def is_strong_sentiment(label: str, score: float) -> bool:
+    """Sentimento muito forte (penalizado no score)"""
+    return label in STRONG_SENTIMENT_LABELS and score > STRONG_SENTIMENT_SCORE
+
+
+def reliability_scores(
+    suspicious_counts,
+    uppercase_ratio,
+    exclamation_count,
+    strong_sentiment
+) -> np.ndarray:
+    """
+    Score de confiabilidade (0-100) para cada posição dos arrays
+    
+    Aceita arrays de mesmo tamanho ou escalares (resultado 0-d).
+    """
+    suspicious_counts = np.asarray(suspicious_counts)
+    score = np.full(suspicious_counts.shape, BASE_SCORE, dtype=np.int64)
+    score -= np.minimum(suspicious_counts * SUSPICIOUS_PHRASE_PENALTY, MAX_SUSPICIOUS_PENALTY)
+    score -= np.where(np.asarray(uppercase_ratio) > UPPERCASE_RATIO_THRESHOLD, UPPERCASE_PENALTY, 0)
+    score -= np.where(np.asarray(exclamation_count) > EXCLAMATION_THRESHOLD, EXCLAMATION_PENALTY, 0)
+    score -= np.where(np.asarray(strong_sentiment), STRONG_SENTIMENT_PENALTY, 0)
+    return np.clip(score, 0, 100)
+
+
+def confidences(
+    suspicious_counts,
+    uppercase_ratio,
+    exclamation_count,
+    word_count
+) -> np.ndarray:
+    """Confiança da análise (0-1, duas casas) para cada posição dos arrays"""
+    suspicious_counts = np.asarray(suspicious_counts)
+    confidence = np.full(suspicious_counts.shape, 0.7)
+    
+    # Muitas frases suspeitas
+    confidence = np.where(suspicious_counts >= 3, np.minimum(0.9, confidence + 0.1), confidence)
+    
+    # Características linguísticas claras
+    clear = (np.asarray(uppercase_ratio) > 0.15) | (np.asarray(exclamation_count) > 5)
+    confidence = np.where(clear, np.minimum(0.9, confidence + 0.1), confidence)
+    
+    # Texto muito curto
+    confidence = np.where(np.asarray(word_count) < 50, np.maximum(0.5, confidence - 0.2), confidence)
+    
+    return np.round(confidence, 2)
+
+
+def reliability_level(score: int) -> ReliabilityLevel:
+    """Nível de confiabilidade de um score"""
+    if score >= RELIABLE_MIN_SCORE:
+        return ReliabilityLevel.RELIABLE
+    elif score >= ATTENTION_MIN_SCORE:
+        return ReliabilityLevel.ATTENTION
+    else:
+        return ReliabilityLevel.QUESTIONABLE
+
+
+def reliability_levels(scores: np.ndarray) -> List[ReliabilityLevel]:
+    """Níveis de confiabilidade de um array de scores"""
+    levels = np.where(
+        scores >= RELIABLE_MIN_SCORE, 0, np.where(scores >= ATTENTION_MIN_SCORE, 1, 2)
+    )
+    choices = (ReliabilityLevel.RELIABLE, ReliabilityLevel.ATTENTION, ReliabilityLevel.QUESTIONABLE)
+    return [choices[level] for level in levels.tolist()]
@@ -0,0 +1,482 @@
+"""
+Análise incremental de textos ao vivo (digitação, transcrições)
+Mantém por sessão o documento, as frases suspeitas, os contadores
+linguísticos e os scores por janela, atualizando só o trecho alterado
+"""
+
+import asyncio
+import re
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, replace
+from typing import AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import (
+    RateLimitedException,
+    ServiceOverloadedException,
+    TextTooLongException,
+    VeritasException
+)
+from app.core.payloads import PhraseMatch
+from app.services.patterns import PatternEngine
+
+
+_SENTENCE_SPLIT = re.compile(r"[.!?]+")
+_SENTENCE_ENDS = ".!?"
+
+
+def _word_start(text: str, index: int) -> int:
+    """Recua `index` até o início da palavra (posição após um espaço)"""
+    while index > 0 and not text[index - 1].isspace():
+        index -= 1
+    return index
+
+
+def _word_end(text: str, index: int) -> int:
+    """Avança `index` até o fim da palavra (posição de um espaço ou do fim do texto)"""
+    while index < len(text) and not text[index].isspace():
+        index += 1
+    return index
+
+
+def _after_sentence_end(text: str, index: int) -> bool:
+    """Se o último caractere visível antes de `index` fecha uma sentença (ou não existe)"""
+    index -= 1
+    while index >= 0 and text[index].isspace():
+        index -= 1
+    return index < 0 or text[index] in _SENTENCE_ENDS
+
+
+def _opens_with_content(text: str, index: int) -> bool:
+    """Se o primeiro caractere visível a partir de `index` é conteúdo (não `.!?`)"""
+    while index < len(text) and text[index].isspace():
+        index += 1
+    return index < len(text) and text[index] not in _SENTENCE_ENDS
+
+
+def _region_counts(text: str, start: int, end: int) -> Tuple[int, int, int, int, int]:
+    """
+    Contagens do trecho [start, end) com as regras de `extract_linguistic_features`
+    
+    Palavras e pontuação são aditivas quando o trecho começa e termina em
+    limites de palavra. Uma sentença é contada onde começa; o primeiro
+    pedaço do trecho só começa uma sentença se o texto antes dele terminou
+    uma, e a sentença que continua depois do trecho é ajustada em `apply`.
+    """
+    segment = text[start:end]
+    words = segment.split()
+    uppercase_words = sum(1 for word in words if word.isupper() and len(word) > 1)
+    
+    pieces = _SENTENCE_SPLIT.split(segment)
+    sentences = sum(1 for piece in pieces if piece.strip())
+    if pieces[0].strip() and not _after_sentence_end(text, start):
+        sentences -= 1
+    
+    return len(words), uppercase_words, sentences, segment.count("!"), segment.count("?")
+
+
+class IncrementalDocument:
+    """
+    Documento editável com frases suspeitas e contadores sempre atualizados
+    
+    Cada alteração substitui o trecho [start, end) por um novo texto. Os
+    contadores são recalculados só nas palavras afetadas (alinhadas a
+    espaços) e os padrões só em uma margem em volta da alteração; frases
+    fora dela são mantidas (deslocadas, se estiverem depois). O resultado
+    é o mesmo da análise do documento inteiro desde que nenhuma regra
+    case mais de `rescan_margin` caracteres.
+    """
+    
+    def __init__(self, pattern_engine: PatternEngine, rescan_margin: int = 128):
+        self.pattern_engine = pattern_engine
+        self.rescan_margin = max(1, rescan_margin)
+        self.text = ""
+        self.phrases: List[PhraseMatch] = []
+        self.word_count = 0
+        self.uppercase_words = 0
+        self.sentence_count = 0
+        self.exclamation_count = 0
+        self.question_count = 0
+    
+    def apply(
+        self,
+        start: int,
+        end: int,
+        replacement: str
+    ) -> Tuple[List[PhraseMatch], List[PhraseMatch]]:
+        """
+        Substitui text[start:end] por `replacement`
+        
+        Retorna (frases novas, frases removidas); as removidas estão nas
+        posições de antes da alteração e as demais frases posteriores ao
+        trecho apenas se deslocam pela diferença de tamanho.
+        """
+        old = self.text
+        start = max(0, min(start, len(old)))
+        end = max(start, min(end, len(old)))
+        delta = len(replacement) - (end - start)
+        new = old[:start] + replacement + old[end:]
+        
+        # Contadores: palavras tocadas pela alteração, antes e depois
+        counts_start = _word_start(old, start)
+        old_end = _word_end(old, end)
+        new_end = _word_end(new, start + len(replacement))
+        before = _region_counts(old, counts_start, old_end)
+        after = _region_counts(new, counts_start, new_end)
+        self.word_count += after[0] - before[0]
+        self.uppercase_words += after[1] - before[1]
+        self.sentence_count += after[2] - before[2]
+        self.exclamation_count += after[3] - before[3]
+        self.question_count += after[4] - before[4]
+        
+        # A sentença que segue o trecho pode passar a ser (ou deixar de ser) nova
+        if _opens_with_content(old, old_end):
+            self.sentence_count -= int(_after_sentence_end(old, old_end))
+            self.sentence_count += int(_after_sentence_end(new, new_end))
+        
+        # Padrões: revarrer a margem em volta da alteração
+        scan_start = _word_start(old, max(0, start - self.rescan_margin))
+        old_scan_end = _word_end(old, min(len(old), end + self.rescan_margin))
+        for phrase in self.phrases:
+            if phrase.start_index < scan_start < phrase.end_index:
+                scan_start = phrase.start_index
+        scan_end = old_scan_end + delta
+        
+        added = self.pattern_engine.scan(new, scan_start, scan_end)
+        resume = max([scan_end] + [phrase.end_index for phrase in added])
+        
+        kept_before, kept_after, removed = [], [], []
+        for phrase in self.phrases:
+            if phrase.end_index <= scan_start:
+                kept_before.append(phrase)
+            elif phrase.start_index >= old_scan_end and phrase.start_index + delta >= resume:
+                kept_after.append(
+                    replace(
+                        phrase,
+                        start_index=phrase.start_index + delta,
+                        end_index=phrase.end_index + delta
+                    ) if delta else phrase
+                )
+            else:
+                removed.append(phrase)
+        
+        # Frases idênticas às removidas (mesma posição final) não são novidade
+        unchanged = {
+            (phrase.start_index + (delta if phrase.start_index >= end else 0), phrase.text)
+            for phrase in removed
+        }
+        fresh = [phrase for phrase in added if (phrase.start_index, phrase.text) not in unchanged]
+        fresh_keys = {(phrase.start_index, phrase.text) for phrase in added}
+        removed = [
+            phrase for phrase in removed
+            if (phrase.start_index + (delta if phrase.start_index >= end else 0), phrase.text) not in fresh_keys
+        ]
+        
+        self.text = new
+        self.phrases = kept_before + added + kept_after
+        return fresh, removed
+    
+    def use_pattern_engine(self, pattern_engine: PatternEngine):
+        """Troca as regras (outro idioma) e revarre o documento inteiro"""
+        self.pattern_engine = pattern_engine
+        self.phrases = pattern_engine.scan(self.text)
+    
+    def linguistic_features(self) -> Dict:
+        """Características no formato de `extract_linguistic_features(...).row`"""
+        return {
+            "word_count": self.word_count,
+            "sentence_count": self.sentence_count,
+            "avg_words_per_sentence": (
+                self.word_count / self.sentence_count if self.sentence_count > 0 else 0
+            ),
+            "uppercase_ratio": self.uppercase_words / self.word_count if self.word_count > 0 else 0,
+            "exclamation_count": self.exclamation_count,
+            "question_count": self.question_count
+        }
+
+
+def _map_position(position: int, start: int, end: int, length: int) -> int:
+    """Posição equivalente após substituir [start, end) por `length` caracteres"""
+    if position < start:
+        return position
+    if position >= end:
+        return position + length - (end - start)
+    return start
+
+
+def _map_span(span: Tuple[int, int], edit: Tuple[int, int, int]) -> Tuple[int, int]:
+    """Trecho equivalente após uma alteração; se a tocar, passa a incluí-la"""
+    start, end, length = edit
+    mapped_start = _map_position(span[0], start, end, length)
+    mapped_end = _map_position(span[1], start, end, length)
+    if span[0] <= end and span[1] >= start:
+        mapped_start, mapped_end = min(mapped_start, start), max(mapped_end, start + length)
+    return mapped_start, mapped_end
+
+
+def _shift_windows(
+    windows: List[Dict],
+    edit: Tuple[int, int, int]
+) -> Tuple[List[Dict], Optional[Tuple[int, int]]]:
+    """
+    Janelas que não tocam a alteração (deslocadas) e o trecho das que tocam
+    
+    Uma inserção no limite de uma janela (ex.: texto acrescentado ao fim)
+    também a invalida, para que o trecho novo seja pontuado com contexto.
+    """
+    start, end, length = edit
+    delta = length - (end - start)
+    kept, dirty = [], None
+    for window in windows:
+        if window["end_index"] < start:
+            kept.append(window)
+        elif window["start_index"] > end:
+            kept.append({
+                **window,
+                "start_index": window["start_index"] + delta,
+                "end_index": window["end_index"] + delta
+            })
+        else:
+            span = _map_span((window["start_index"], window["end_index"]), edit)
+            dirty = span if dirty is None else (min(dirty[0], span[0]), max(dirty[1], span[1]))
+    return kept, dirty
+
+
+class StreamingSession:
+    """
+    Sessão de análise incremental (uma por conexão WebSocket)
+    
+    Cada alteração atualiza na hora padrões e contadores e envia o novo
+    score com o último sentimento conhecido. As janelas do modelo tocadas
+    pela alteração ficam pendentes e são repontuadas depois de
+    `debounce_seconds` sem novas alterações (ou no máximo
+    `max_delay_seconds` após a primeira), só no trecho afetado.
+    
+    Com identificação de idioma, as regras são as do idioma do documento,
+    como em /analyze. O idioma é reavaliado quando uma alteração toca o
+    prefixo examinado pelo identificador; se mudar, o documento inteiro é
+    revarrido com as regras do novo idioma. Idiomas sem suporte usam as
+    regras do idioma padrão (a sessão não é encerrada).
+    
+    Cada repontuação passa por `admit` (limite de taxa e fila justa do
+    cliente, como uma análise de /analyze); acima do limite, o trecho
+    continua pendente e é tentado de novo após o Retry-After. As
+    alterações em si só revarrem padrões em volta do trecho alterado e
+    não são cobradas.
+    """
+    
+    def __init__(
+        self,
+        nlp_service,
+        send: Callable[[Dict], Awaitable[None]],
+        max_length: int = 20000,
+        debounce_seconds: float = 0.3,
+        max_delay_seconds: float = 2.0,
+        rescan_margin: int = 128,
+        admit: Callable[[], AsyncContextManager] = nullcontext
+    ):
+        self.nlp_service = nlp_service
+        self._send = send
+        self._admit = admit
+        self.max_length = max_length
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.language = settings.LANGUAGE_DEFAULT
+        self.document = IncrementalDocument(nlp_service.pattern_engines[self.language], rescan_margin)
+        self.revision = 0
+        
+        # Janelas pontuadas, em posições do documento atual
+        self.windows: List[Dict] = []
+        # Trecho [início, fim) cujas janelas ainda não foram repontuadas
+        self.pending: Optional[Tuple[int, int]] = None
+        self._pending_since: Optional[float] = None
+        # Alterações feitas enquanto uma repontuação está em andamento (None: nenhuma em andamento)
+        self._edits_during_rescore: Optional[List[Tuple[int, int, int]]] = None
+        self._rescore_task: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+    
+    async def apply_delta(self, text: str, start: Optional[int] = None, end: Optional[int] = None):
+        """Aplica uma alteração (por padrão, acrescenta ao fim) e envia a atualização"""
+        length = len(self.document.text)
+        start = length if start is None else start
+        end = start if end is None else end
+        if not 0 <= start <= end <= length:
+            raise VeritasException(
+                "Intervalo da alteração fora do documento.",
+                status_code=400,
+                details={"start": start, "end": end, "text_length": length}
+            )
+        
+        new_length = length - (end - start) + len(text)
+        if new_length > self.max_length:
+            raise TextTooLongException(max_length=self.max_length, actual_length=new_length)
+        
+        previous = self.document.phrases
+        added, removed = self.document.apply(start, end, text)
+        if self._update_language(start):
+            # Todas as frases foram refeitas com as regras do novo idioma
+            added, removed = list(self.document.phrases), previous
+        self.revision += 1
+        self._record_edit((start, end, len(text)))
+        self._schedule_rescore()
+        await self._push(added, removed)
+    
+    def _update_language(self, edit_start: int) -> bool:
+        """Reidentifica o idioma se a alteração tocou o prefixo examinado (True se mudou)"""
+        identifier = self.nlp_service.language_identifier
+        if identifier is None or edit_start >= identifier.max_chars:
+            return False
+        
+        guess = identifier.identify(self.document.text, record=False)
+        engines = self.nlp_service.pattern_engines
+        language = guess.language if guess.language in engines else settings.LANGUAGE_DEFAULT
+        if language == self.language:
+            return False
+        
+        self.language = language
+        self.document.use_pattern_engine(engines[language])
+        return True
+    
+    async def reset(self):
+        """Descarta o conteúdo do documento"""
+        await self.apply_delta("", 0, len(self.document.text))
+    
+    async def flush(self):
+        """Repontua imediatamente o trecho pendente"""
+        if self._edits_during_rescore is not None:
+            return  # já está repontuando; pendências novas são reagendadas ao fim
+        if self._rescore_task and not self._rescore_task.done():
+            self._rescore_task.cancel()
+        self._rescore_task = None
+        await self._rescore()
+    
+    def _record_edit(self, edit: Tuple[int, int, int]):
+        """Desloca as janelas pontuadas e marca como pendente o trecho afetado"""
+        if self._edits_during_rescore is not None:
+            self._edits_during_rescore.append(edit)
+        
+        self.windows, dirty = _shift_windows(self.windows, edit)
+        start, _, length = edit
+        self._add_pending(_map_span(self.pending, edit) if self.pending else (start, start + length))
+        if dirty:
+            self._add_pending(dirty)
+    
+    def _add_pending(self, span: Tuple[int, int]):
+        if self.pending is None:
+            self.pending = span
+            self._pending_since = time.monotonic()
+        else:
+            self.pending = (min(self.pending[0], span[0]), max(self.pending[1], span[1]))
+    
+    def _schedule_rescore(self):
+        """(Re)agenda a repontuação respeitando o debounce e o atraso máximo"""
+        if self._edits_during_rescore is not None:
+            return  # a repontuação em andamento reagenda ao terminar
+        
+        task = self._rescore_task
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        
+        elapsed = time.monotonic() - (self._pending_since or time.monotonic())
+        delay = max(0.0, min(self.debounce_seconds, self.max_delay_seconds - elapsed))
+        self._rescore_task = asyncio.create_task(self._rescore_after(delay))
+    
+    async def _rescore_after(self, delay: float):
+        await asyncio.sleep(delay)
+        await self._rescore()
+    
+    async def _rescore(self):
+        """Pontua as janelas do trecho pendente e envia o sentimento atualizado"""
+        if self.pending is None:
+            return
+        
+        text = self.document.text
+        start = _word_start(text, max(0, min(self.pending[0], len(text))))
+        end = _word_end(text, max(start, min(self.pending[1], len(text))))
+        self.pending, self._pending_since = None, None
+        self._edits_during_rescore = []
+        
+        try:
+            async with self._admit():
+                scored = await self.nlp_service.score_windows(text[start:end], offset=start)
+        except (ServiceOverloadedException, RateLimitedException) as e:
+            # Fila cheia ou cliente acima do limite: o trecho continua pendente
+            # e é tentado de novo mais tarde
+            self._abort_rescore((start, end))
+            self._rescore_task = asyncio.create_task(
+                self._rescore_after(float(e.headers.get("Retry-After", 1)))
+            )
+            return
+        except asyncio.CancelledError:
+            self._abort_rescore((start, end))
+            raise
+        except Exception as e:
+            self._abort_rescore((start, end))
+            print(f"Erro ao repontuar sessão de streaming: {e}")
+            return
+        
+        # Alterações feitas durante a inferência deslocam (ou invalidam) o resultado
+        edits, self._edits_during_rescore = self._edits_during_rescore, None
+        for index, edit in enumerate(edits):
+            scored, dirty = _shift_windows(scored, edit)
+            if dirty:
+                for later_edit in edits[index + 1:]:
+                    dirty = _map_span(dirty, later_edit)
+                self._add_pending(dirty)
+        
+        self.windows = sorted(self.windows + scored, key=lambda window: window["start_index"])
+        if self.pending is not None:
+            self._schedule_rescore()
+        await self._push([], [])
+    
+    def _abort_rescore(self, span: Tuple[int, int]):
+        """Devolve às pendências um trecho que não chegou a ser pontuado"""
+        edits, self._edits_during_rescore = self._edits_during_rescore or [], None
+        for edit in edits:
+            span = _map_span(span, edit)
+        self._add_pending(span)
+    
+    def sentiment(self) -> Dict:
+        """Sentimento do documento a partir das janelas já pontuadas"""
+        sentiment = self.nlp_service.summarize_windows(self.windows)
+        sentiment.pop("windows", None)
+        if self.windows and self.document.text:
+            covered, current_end = 0, 0
+            for window in self.windows:
+                window_start = max(window["start_index"], current_end)
+                if window["end_index"] > window_start:
+                    covered += window["end_index"] - window_start
+                    current_end = window["end_index"]
+            sentiment["coverage"] = round(min(1.0, covered / len(self.document.text)), 4)
+        return sentiment
+    
+    async def _push(self, added: List[PhraseMatch], removed: List[PhraseMatch]):
+        """Envia score, frases alteradas e estado do sentimento"""
+        sentiment = self.sentiment()
+        features = self.document.linguistic_features()
+        result = self.nlp_service.build_result(sentiment, self.document.phrases, features)
+        
+        message = {
+            "type": "update",
+            "revision": self.revision,
+            "text_length": len(self.document.text),
+            "language": self.language,
+            "reliability_score": result["reliability_score"],
+            "reliability_level": result["reliability_level"].value,
+            "confidence": result["confidence"],
+            "explanation": result["explanation"],
+            "phrases_added": [asdict(phrase) for phrase in added],
+            "phrases_removed": [asdict(phrase) for phrase in removed],
+            "suspicious_phrase_count": len(self.document.phrases),
+            "linguistic_features": features,
+            "sentiment": sentiment,
+            "sentiment_pending": self.pending is not None
+        }
+        async with self._send_lock:
+            await self._send(message)
+    
+    async def close(self):
+        if self._rescore_task and not self._rescore_task.done():
+            self._rescore_task.cancel()
+        self._rescore_task = None
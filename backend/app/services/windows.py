@@ -0,0 +1,79 @@
+"""
+Janelas deslizantes sobre tokens para análise de sentimento
+Divide o texto completo em janelas sobrepostas que cabem no modelo e
+agrega os scores das janelas em um score por documento
+"""
+
+from typing import Dict, List, Tuple
+
+
+def plan_windows(
+    token_count: int,
+    body_size: int,
+    overlap: int,
+    max_windows: int
+) -> List[Tuple[int, int]]:
+    """
+    Calcula os intervalos [início, fim) de tokens de cada janela
+    
+    As janelas avançam `body_size - overlap` tokens por vez e a última é
+    alinhada ao fim do texto. Se o texto precisar de mais que `max_windows`
+    janelas, são escolhidas janelas igualmente espaçadas ao longo do texto,
+    mantendo a latência limitada sem ignorar o final do documento.
+    """
+    if token_count <= 0:
+        return []
+    
+    body_size = max(1, body_size)
+    if token_count <= body_size:
+        return [(0, token_count)]
+    
+    step = max(1, body_size - max(0, overlap))
+    last_start = token_count - body_size
+    
+    starts = list(range(0, last_start, step)) + [last_start]
+    
+    max_windows = max(1, max_windows)
+    if len(starts) > max_windows:
+        if max_windows == 1:
+            starts = [0]
+        else:
+            starts = [
+                round(i * last_start / (max_windows - 1))
+                for i in range(max_windows)
+            ]
+    
+    return [(start, start + body_size) for start in starts]
+
+
+def coverage_ratio(windows: List[Tuple[int, int]], token_count: int) -> float:
+    """Fração dos tokens do texto coberta por pelo menos uma janela"""
+    if token_count <= 0:
+        return 1.0
+    
+    covered = 0
+    current_end = 0
+    for start, end in windows:
+        start = max(start, current_end)
+        if end > start:
+            covered += end - start
+            current_end = end
+    
+    return round(covered / token_count, 4)
+
+
+def aggregate_window_scores(
+    window_scores: List[Dict[str, float]],
+    weights: List[int]
+) -> Dict[str, float]:
+    """Média das probabilidades por rótulo, ponderada pelo tamanho das janelas"""
+    total_weight = sum(weights)
+    if not window_scores or total_weight <= 0:
+        return {}
+    
+    aggregated: Dict[str, float] = {}
+    for scores, weight in zip(window_scores, weights):
+        for label, score in scores.items():
+            aggregated[label] = aggregated.get(label, 0.0) + score * weight
+    
+    return {label: value / total_weight for label, value in aggregated.items()}
@@ -0,0 +1,303 @@
+"""
+Pool de processos de inferência
+Cada worker é um processo separado com sua própria cópia do modelo,
+fixado em um conjunto de CPUs, fora do event loop e do GIL da API
+"""
+
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.exceptions import NLPModelException
+
+
+def _worker_main(
+    worker_id: int,
+    model_name: str,
+    num_threads: int,
+    cpus: Optional[List[int]],
+    requests: mp.Queue,
+    results: mp.Queue
+):
+    """Loop de um processo de inferência (executado no processo filho)"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    
+    # Limitar as bibliotecas numéricas antes de carregar o modelo
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(num_threads)
+    
+    try:
+        from app.core.config import settings
+        from app.services.backends import load_sentiment_backend
+        
+        backend = load_sentiment_backend(model_name, settings, num_threads=num_threads)
+    except Exception as e:
+        results.put(("failed", worker_id, repr(e)))
+        return
+    
+    results.put(("ready", worker_id, backend.name))
+    
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        
+        request_id, batch_ids = message
+        try:
+            results.put(("result", request_id, backend.predict(batch_ids)))
+        except Exception as e:
+            results.put(("error", request_id, repr(e)))
+
+
+def plan_cpu_sets(num_workers: int, threads_per_worker: int) -> List[List[int]]:
+    """Distribui as CPUs disponíveis em conjuntos contíguos por worker"""
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    
+    cycle = itertools.cycle(available)
+    return [
+        [next(cycle) for _ in range(min(threads_per_worker, len(available)))]
+        for _ in range(num_workers)
+    ]
+
+
+class _Worker:
+    """Estado de um processo de inferência no processo da API"""
+    
+    def __init__(self, worker_id: int, process: mp.Process, requests: mp.Queue, cpus: Optional[List[int]]):
+        self.worker_id = worker_id
+        self.process = process
+        self.requests = requests
+        self.cpus = cpus
+        self.ready = False  # modelo carregado; até lá o worker não recebe lotes
+        self.in_flight = 0
+        self.completed = 0
+
+
+class InferenceWorkerPool:
+    """
+    Pool de N processos de inferência com fila limitada por worker
+    
+    `predict` é uma coroutine: envia o lote ao worker menos ocupado e
+    aguarda a resposta sem bloquear o event loop. Uma thread coletora lê a
+    fila de resultados e resolve os futures no loop de origem. Se um
+    worker morrer, as requisições em andamento falham e o processo é
+    recriado; enquanto o novo processo carrega o modelo, ele fica fora da
+    escolha (sem lotes em andamento, pareceria o menos ocupado) até
+    avisar que está pronto.
+    """
+    
+    def __init__(
+        self,
+        model_name: str,
+        num_workers: int,
+        threads_per_worker: int = 1,
+        pin_cpus: bool = True,
+        startup_timeout: float = 600.0
+    ):
+        self.model_name = model_name
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.pin_cpus = pin_cpus
+        self.startup_timeout = startup_timeout
+        self.name = "torch"
+        
+        self._context = mp.get_context("spawn")
+        self._results = self._context.Queue()
+        self._workers: Dict[int, _Worker] = {}
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future, int]] = {}
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._closing = False
+        self._cpu_sets = (
+            plan_cpu_sets(self.num_workers, self.threads_per_worker) if pin_cpus else [None] * self.num_workers
+        )
+        
+        # Métricas
+        self.restarts = 0
+        self.errors = 0
+    
+    def _spawn(self, worker_id: int) -> _Worker:
+        """Inicia o processo de um worker"""
+        requests = self._context.Queue()
+        cpus = self._cpu_sets[worker_id]
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_name, self.threads_per_worker, cpus, requests, self._results),
+            name=f"veritas-inference-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        return _Worker(worker_id, process, requests, cpus)
+    
+    def start(self):
+        """Inicia os workers e aguarda todos carregarem o modelo (bloqueante)"""
+        for worker_id in range(self.num_workers):
+            self._workers[worker_id] = self._spawn(worker_id)
+        
+        ready = set()
+        while len(ready) < self.num_workers:
+            try:
+                kind, worker_id, payload = self._results.get(timeout=self.startup_timeout)
+            except queue.Empty:
+                self.close()
+                raise RuntimeError("Tempo esgotado aguardando os workers de inferência")
+            
+            if kind == "failed":
+                self.close()
+                raise RuntimeError(f"Worker {worker_id} falhou ao carregar o modelo: {payload}")
+            if kind == "ready":
+                ready.add(worker_id)
+                self._mark_ready(worker_id, payload)
+        
+        self._collector = threading.Thread(target=self._collect_results, name="veritas-inference-results", daemon=True)
+        self._collector.start()
+    
+    async def predict(self, batch_ids: List[List[int]]) -> List[Dict[str, float]]:
+        """Envia um lote ao worker menos ocupado e aguarda as probabilidades"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        with self._lock:
+            # Só workers com o modelo carregado; sem nenhum, o lote espera
+            # na fila de um que está carregando
+            candidates = [w for w in self._workers.values() if w.ready] or list(self._workers.values())
+            worker = min(candidates, key=lambda w: w.in_flight)
+            request_id = next(self._request_ids)
+            self._pending[request_id] = (loop, future, worker.worker_id)
+            worker.in_flight += 1
+        
+        worker.requests.put((request_id, batch_ids))
+        return await future
+    
+    def _collect_results(self):
+        """Thread coletora: entrega resultados e monitora a saúde dos workers"""
+        last_check = time.monotonic()
+        while not self._closing:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            
+            try:
+                kind, request_id, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            if kind == "ready":
+                self._mark_ready(request_id, payload)
+                print(f"Worker de inferência {request_id} pronto")
+                continue
+            if kind == "failed":
+                print(f"Worker de inferência {request_id} falhou ao reiniciar: {payload}")
+                continue
+            
+            if kind == "error":
+                self._resolve(request_id, error=NLPModelException({"error": payload, "stage": "inference_worker"}))
+            else:
+                self._resolve(request_id, result=payload)
+    
+    def _mark_ready(self, worker_id: int, backend_name: str):
+        """Worker terminou de carregar o modelo: passa a receber lotes"""
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                worker.ready = True
+        self.name = backend_name
+    
+    def _resolve(self, request_id: int, result: Any = None, error: Optional[Exception] = None):
+        """Resolve o future de uma requisição no event loop de origem"""
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is None:
+                return
+            loop, future, worker_id = entry
+            worker = self._workers.get(worker_id)
+            if worker:
+                worker.in_flight -= 1
+                worker.completed += 1
+        
+        if error is not None:
+            self.errors += 1
+        
+        def deliver():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        
+        try:
+            loop.call_soon_threadsafe(deliver)
+        except RuntimeError:
+            # Event loop de origem já encerrado
+            pass
+    
+    def _check_workers(self):
+        """Recria workers que morreram e falha as requisições deles"""
+        for worker_id, worker in list(self._workers.items()):
+            if worker.process.is_alive() or self._closing:
+                continue
+            
+            print(f"Worker de inferência {worker_id} encerrou (código {worker.process.exitcode}); reiniciando")
+            with self._lock:
+                lost = [rid for rid, (_, _, wid) in self._pending.items() if wid == worker_id]
+            for request_id in lost:
+                self._resolve(request_id, error=NLPModelException({"error": "worker encerrado", "stage": "inference_worker"}))
+            
+            self._workers[worker_id] = self._spawn(worker_id)
+            self.restarts += 1
+    
+    def get_stats(self) -> Dict:
+        """Retorna o estado dos workers"""
+        return {
+            "backend": self.name,
+            "workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "restarts": self.restarts,
+            "errors": self.errors,
+            "ready_workers": sum(1 for worker in self._workers.values() if worker.ready),
+            "pending_batches": len(self._pending),
+            "per_worker": [
+                {
+                    "worker_id": worker.worker_id,
+                    "pid": worker.process.pid,
+                    "alive": worker.process.is_alive(),
+                    "ready": worker.ready,
+                    "cpus": worker.cpus,
+                    "in_flight": worker.in_flight,
+                    "completed": worker.completed,
+                }
+                for worker in self._workers.values()
+            ],
+        }
+    
+    def close(self):
+        """Encerra os workers e falha as requisições pendentes"""
+        self._closing = True
+        for worker in self._workers.values():
+            try:
+                worker.requests.put(None)
+            except Exception:
+                pass
+        
+        for worker in self._workers.values():
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        
+        for request_id in list(self._pending):
+            self._resolve(request_id, error=NLPModelException({"error": "pool encerrado", "stage": "inference_worker"}))
+        
+        self._workers.clear()
@@ -0,0 +1,98 @@
+"""
+Comparação de resultados de benchmark e detecção de regressões
+
+Métricas terminadas em `_ms` são latências (menor é melhor) e métricas
+com `per_s` são vazões (maior é melhor); as demais são ignoradas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.compare baseline.json atual.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Achata o JSON de resultados em caminho -> valor numérico"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def find_regressions(
+    baseline: Dict,
+    current: Dict,
+    tolerance: float = 0.15,
+    min_delta_ms: float = 0.05
+) -> List[Dict]:
+    """
+    Lista as métricas que pioraram além da tolerância relativa
+    
+    Diferenças de latência menores que `min_delta_ms` são tratadas como
+    ruído, independentemente da variação relativa.
+    """
+    base = flatten(baseline)
+    regressions = []
+    for path, value in flatten(current).items():
+        reference = base.get(path)
+        if reference is None or reference <= 0:
+            continue
+        
+        metric = path.rsplit(".", 1)[-1]
+        if metric.endswith("_ms"):
+            change = (value - reference) / reference
+            regressed = change > tolerance and value - reference > min_delta_ms
+        elif "per_s" in metric:
+            change = (value - reference) / reference
+            regressed = change < -tolerance
+        else:
+            continue
+        
+        if regressed:
+            regressions.append({
+                "metric": path,
+                "baseline": reference,
+                "current": value,
+                "change": round(change, 4),
+            })
+    return regressions
+
+
+def check_baseline(baseline_path: str, current: Dict, tolerance: float) -> int:
+    """Compara com um arquivo de baseline e retorna o código de saída"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    
+    regressions = find_regressions(baseline, current, tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSÃO {regression['metric']}: {regression['baseline']} -> "
+            f"{regression['current']} ({regression['change']:+.1%})",
+            file=sys.stderr
+        )
+    if not regressions:
+        print(f"Sem regressões acima de {tolerance:.0%} em relação a {baseline_path}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Piora relativa aceita (0.15 = 15%%)")
+    args = parser.parse_args()
+    
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    sys.exit(check_baseline(args.baseline, current, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
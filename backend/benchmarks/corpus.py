@@ -0,0 +1,100 @@
+"""
+Gerador de corpus sintético em português para benchmarks
+
+Os textos combinam frases neutras com fragmentos que disparam as regras de
+padrões suspeitos, com tamanho (até MAX_TEXT_LENGTH) e densidade de
+fragmentos suspeitos variáveis. A geração é determinística pela semente.
+"""
+
+import random
+from typing import Dict, List, Sequence
+
+from app.core.config import settings
+
+
+NEUTRAL_SENTENCES = [
+    "O governo anunciou hoje novas medidas para a economia.",
+    "A reunião do conselho foi adiada para a próxima semana.",
+    "Segundo o IBGE, a inflação acumulada no ano ficou dentro da meta.",
+    "Pesquisadores da universidade publicaram os resultados do estudo em uma revista científica.",
+    "A prefeitura informou que o trânsito será desviado durante as obras na avenida principal.",
+    "O time venceu a partida por dois a zero no último domingo.",
+    "Especialistas recomendam cautela na interpretação dos dados preliminares.",
+    "A previsão indica chuva moderada no litoral ao longo do fim de semana.",
+    "O relatório aponta crescimento das exportações no último trimestre.",
+    "Os moradores participaram de uma audiência pública sobre o novo plano diretor.",
+    "A campanha de vacinação foi ampliada para novas faixas etárias.",
+    "O ministério divulgou uma nota técnica com as orientações atualizadas.",
+]
+
+SUSPICIOUS_FRAGMENTS = [
+    "URGENTE!!!",
+    "COMPARTILHE antes que apaguem!",
+    "Eles não querem que você saiba a verdade.",
+    "Isso é 100% garantido, sem dúvida.",
+    "Não perca, é a última chance!!",
+    "ENVIE PARA TODOS os seus contatos imediatamente.",
+    "A mídia escondem de você essa conspiração.",
+    "CLIQUE AQUI agora e veja o vídeo!!",
+    "Definitivamente a maior farsa do século.",
+]
+
+DEFAULT_LENGTHS = (80, 250, 600, 1200, settings.MAX_TEXT_LENGTH)
+DEFAULT_DENSITIES = (0.0, 0.1, 0.3, 0.6)
+
+
+def generate_text(rng: random.Random, target_length: int, suspicious_density: float) -> str:
+    """
+    Gera um texto com aproximadamente `target_length` caracteres
+    
+    Cada frase é um fragmento suspeito com probabilidade
+    `suspicious_density`; o texto é cortado em um limite de palavra.
+    """
+    sentences = []
+    length = 0
+    while length < target_length:
+        if rng.random() < suspicious_density:
+            sentence = rng.choice(SUSPICIOUS_FRAGMENTS)
+        else:
+            sentence = rng.choice(NEUTRAL_SENTENCES)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    
+    text = " ".join(sentences)
+    if len(text) > target_length:
+        text = text[:target_length].rsplit(" ", 1)[0]
+    return text
+
+
+def generate_corpus(
+    size: int,
+    lengths: Sequence[int] = DEFAULT_LENGTHS,
+    densities: Sequence[float] = DEFAULT_DENSITIES,
+    seed: int = 42
+) -> List[Dict]:
+    """Gera `size` textos percorrendo todas as combinações de tamanho e densidade"""
+    rng = random.Random(seed)
+    combinations = [(length, density) for length in lengths for density in densities]
+    
+    corpus = []
+    for index in range(size):
+        length, density = combinations[index % len(combinations)]
+        length = min(length, settings.MAX_TEXT_LENGTH)
+        corpus.append({
+            "text": generate_text(rng, length, density),
+            "target_length": length,
+            "suspicious_density": density,
+        })
+    return corpus
+
+
+def describe_corpus(corpus: List[Dict]) -> Dict:
+    """Resumo do corpus gravado junto com os resultados"""
+    lengths = [len(entry["text"]) for entry in corpus]
+    return {
+        "size": len(corpus),
+        "min_length": min(lengths),
+        "max_length": max(lengths),
+        "avg_length": round(sum(lengths) / len(lengths), 1),
+        "densities": sorted({entry["suspicious_density"] for entry in corpus}),
+    }
@@ -0,0 +1,123 @@
+"""
+Teste de carga em processo da rota /api/v1/analyze
+
+Envia requisições pela interface ASGI (sem rede nem servidor) com
+diferentes níveis de concorrência e mede throughput e percentis de
+latência. O serviço usa o tokenizer e o modelo substitutos, com latência
+de inferência simulada por lote.
+
+Uso (a partir de backend/):
+    python -m benchmarks.load --concurrency 1,8,32,128 --output load.json
+    python -m benchmarks.load --baseline load.json  # falha em regressões
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.compare import check_baseline
+from benchmarks.corpus import describe_corpus, generate_corpus
+from benchmarks.report import environment, summarize_latencies, write_results
+from benchmarks.stubs import create_stub_service
+
+
+async def run_level(client: httpx.AsyncClient, texts: List[str], concurrency: int, requests: int) -> Dict:
+    """Executa `requests` requisições com `concurrency` clientes simultâneos"""
+    latencies = []
+    status_counts: Dict[str, int] = {}
+    next_index = 0
+    
+    async def client_loop():
+        nonlocal next_index
+        while next_index < requests:
+            text = texts[next_index % len(texts)]
+            next_index += 1
+            
+            start = time.perf_counter()
+            response = await client.post("/api/v1/analyze", json={"text": text})
+            latencies.append(time.perf_counter() - start)
+            status = str(response.status_code)
+            status_counts[status] = status_counts.get(status, 0) + 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    
+    summary = summarize_latencies(latencies)
+    summary["requests_per_s"] = round(len(latencies) / elapsed, 2)
+    summary["status_counts"] = status_counts
+    return summary
+
+
+async def run_load(
+    corpus: List[Dict],
+    levels: List[int],
+    requests: int,
+    batch_latency_ms: float,
+    token_latency_us: float
+) -> Dict:
+    """Mede a rota em cada nível de concorrência"""
+    from main import app
+    
+    app.state.nlp_service = await create_stub_service(batch_latency_ms, token_latency_us)
+    texts = [entry["text"] for entry in corpus]
+    
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://veritas") as client:
+        await run_level(client, texts, 4, 20)  # aquecimento
+        for concurrency in levels:
+            batcher = app.state.nlp_service.sentiment_batcher
+            batches, items = batcher.batches_total, batcher.items_total
+            
+            level = await run_level(client, texts, concurrency, requests)
+            level["avg_batch_size"] = round(
+                (batcher.items_total - items) / max(1, batcher.batches_total - batches), 2
+            )
+            results[f"concurrency_{concurrency}"] = level
+    
+    await app.state.nlp_service.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga em processo da API")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="Níveis separados por vírgula")
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por nível")
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-latency-ms", type=float, default=5.0, help="Latência simulada por lote")
+    parser.add_argument("--token-latency-us", type=float, default=2.0, help="Latência simulada por token")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", help="Resultado anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    corpus = generate_corpus(args.corpus_size, seed=args.seed)
+    results = {
+        "benchmark": "load",
+        "environment": environment(),
+        "parameters": {
+            "requests_per_level": args.requests,
+            "seed": args.seed,
+            "model_latency_ms": args.model_latency_ms,
+            "token_latency_us": args.token_latency_us,
+        },
+        "corpus": describe_corpus(corpus),
+        "levels": asyncio.run(
+            run_load(corpus, levels, args.requests, args.model_latency_ms, args.token_latency_us)
+        ),
+    }
+    write_results(results, args.output)
+    
+    if args.baseline:
+        sys.exit(check_baseline(args.baseline, results, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Microbenchmarks por etapa do pipeline de análise
+
+Mede cada etapa de `NLPService` (janelas de tokens, sentimento via fila,
+padrões suspeitos, características linguísticas, score) e a análise
+completa sobre um corpus sintético, usando o tokenizer e o modelo
+substitutos de `benchmarks.stubs`. Também mede a vazão da pontuação
+só por regras em lote (`NLPService.score_rules_batch`) em textos curtos
+e o custo adicional das explicações por oclusão (`explain=True`).
+
+Uso (a partir de backend/):
+    python -m benchmarks.pipeline --output pipeline.json
+    python -m benchmarks.pipeline --baseline pipeline.json  # falha em regressões
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.compare import check_baseline
+from benchmarks.corpus import describe_corpus, generate_corpus
+from benchmarks.report import environment, summarize_latencies, write_results
+from benchmarks.stubs import create_stub_service
+
+
+async def _measure(fn: Callable[[str], Awaitable], texts: List[str], repeat: int) -> List[float]:
+    """Executa `fn` sequencialmente sobre o corpus e retorna as latências"""
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            await fn(text)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_stages(corpus: List[Dict], repeat: int, batch_latency_ms: float) -> Dict:
+    """Mede cada etapa do pipeline isoladamente"""
+    service = await create_stub_service(batch_latency_ms=batch_latency_ms)
+    loop = asyncio.get_running_loop()
+    texts = [entry["text"] for entry in corpus]
+    
+    async def encode_windows(text):
+        return service._encode_windows(text)
+    
+    async def sentiment(text):
+        return await service._analyze_sentiment(text, loop)
+    
+    async def suspicious_patterns(text):
+        return await service._detect_suspicious_patterns(text, loop)
+    
+    async def linguistic_features(text):
+        return await service._analyze_linguistic_features(text, loop)
+    
+    async def analyze_text_explain(text):
+        return await service.analyze_text(text, explain=True)
+    
+    # Entradas do score calculadas antes, fora da medição
+    inputs = {}
+    for text in texts:
+        inputs[text] = (
+            await sentiment(text),
+            await suspicious_patterns(text),
+            await linguistic_features(text),
+        )
+    
+    async def reliability_score(text):
+        sentiment_result, phrases, features = inputs[text]
+        score, confidence = service._calculate_score(sentiment_result, phrases, features)
+        level = service._determine_reliability_level(score)
+        service._generate_explanation(score, level, phrases, features)
+        return confidence
+    
+    stages = {
+        "encode_windows": encode_windows,
+        "sentiment": sentiment,
+        "suspicious_patterns": suspicious_patterns,
+        "linguistic_features": linguistic_features,
+        "reliability_score": reliability_score,
+        "analyze_text": service.analyze_text,
+        "analyze_text_explain": analyze_text_explain,
+    }
+    
+    results = {}
+    for name, fn in stages.items():
+        await _measure(fn, texts[:10], 1)  # aquecimento
+        latencies = await _measure(fn, texts, repeat)
+        summary = summarize_latencies(latencies)
+        summary["ops_per_s"] = round(len(latencies) / sum(latencies), 2)
+        results[name] = summary
+    
+    # Explicações: latência relativa à análise sem elas (mesmo corpus, sem cache)
+    results["explain_overhead"] = {
+        "p50_ratio": round(results["analyze_text_explain"]["p50_ms"] / results["analyze_text"]["p50_ms"], 2),
+        "p90_ratio": round(results["analyze_text_explain"]["p90_ms"] / results["analyze_text"]["p90_ms"], 2)
+    }
+    
+    # Análise completa por faixa de tamanho do texto
+    by_length = {}
+    for length in sorted({entry["target_length"] for entry in corpus}):
+        subset = [entry["text"] for entry in corpus if entry["target_length"] == length]
+        by_length[str(length)] = summarize_latencies(await _measure(service.analyze_text, subset, repeat))
+    results["analyze_text_by_length"] = by_length
+    
+    await service.cleanup()
+    return results
+
+
+async def run_batch_scoring(size: int, seed: int, repeat: int) -> Dict:
+    """
+    Vazão da pontuação por regras em lote, comparada ao caminho texto a texto
+    
+    `features_and_rules` recebe as contagens de padrões já prontas (mede só a
+    parte vetorizada); `with_pattern_scan` inclui a varredura de regex.
+    """
+    service = await create_stub_service()
+    texts = [entry["text"] for entry in generate_corpus(size, lengths=(80, 120, 200), seed=seed)]
+    suspicious_counts = np.array([service.pattern_engine.count(text) for text in texts])
+    service.score_rules_batch(texts[:100])  # aquecimento (tabela de caracteres)
+    
+    def per_text():
+        sentiment_result = {"label": "NEUTRAL", "score": 0.5}
+        for text in texts:
+            phrases = service.pattern_engine.scan(text)
+            features = service._compute_linguistic_features(text)
+            service._calculate_score(sentiment_result, phrases, features)
+    
+    variants = {
+        "features_and_rules": lambda: service.score_rules_batch(texts, suspicious_counts),
+        "with_pattern_scan": lambda: service.score_rules_batch(texts),
+        "per_text": per_text,
+    }
+    results = {"texts": size}
+    for name, fn in variants.items():
+        best = min(_timed(fn) for _ in range(repeat))
+        results[name] = {"total_ms": round(best * 1000, 2), "texts_per_s": round(size / best, 1)}
+    
+    await service.cleanup()
+    return results
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks do pipeline de análise")
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Latência simulada por lote do modelo")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", help="Resultado anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--batch-size", type=int, default=100000, help="Textos curtos na pontuação em lote")
+    args = parser.parse_args()
+    
+    corpus = generate_corpus(args.corpus_size, seed=args.seed)
+    results = {
+        "benchmark": "pipeline",
+        "environment": environment(),
+        "parameters": {
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "model_latency_ms": args.model_latency_ms,
+            "batch_size": args.batch_size,
+        },
+        "corpus": describe_corpus(corpus),
+        "stages": asyncio.run(run_stages(corpus, args.repeat, args.model_latency_ms)),
+        "batch_scoring": asyncio.run(run_batch_scoring(args.batch_size, args.seed, args.repeat)),
+    }
+    write_results(results, args.output)
+    
+    if args.baseline:
+        sys.exit(check_baseline(args.baseline, results, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
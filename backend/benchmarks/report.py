@@ -0,0 +1,47 @@
+"""
+Estatísticas e saída JSON compartilhadas pelos benchmarks
+"""
+
+import json
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def summarize_latencies(seconds: List[float]) -> Dict:
+    """Resumo de latências em milissegundos"""
+    values = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return {"count": 0}
+    
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p90_ms": round(float(p90), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(values.max()), 4),
+    }
+
+
+def environment() -> Dict:
+    """Contexto da execução, para comparar apenas rodadas equivalentes"""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def write_results(results: Dict, output: Optional[str] = None):
+    """Grava os resultados em JSON (arquivo e stdout)"""
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
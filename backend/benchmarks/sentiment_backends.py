@@ -0,0 +1,141 @@
+"""
+Benchmark dos backends de inferência de sentimento
+
+Compara PyTorch, ONNX e ONNX int8 em latência (p50/p99 por requisição),
+throughput em lote e desvio de acurácia em relação ao PyTorch sobre um
+corpus fixo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.sentiment_backends --output backends.json
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.backends import OnnxSentimentBackend, TorchSentimentBackend
+
+
+# Corpus fixo para medir o desvio entre backends
+CORPUS = [
+    "O governo anunciou hoje novas medidas para a economia.",
+    "URGENTE!!! Compartilhe agora antes que apaguem este vídeo!",
+    "Estudo publicado em revista científica indica redução nos casos de dengue.",
+    "Eles não querem que você saiba a verdade sobre as vacinas.",
+    "A reunião foi adiada para a próxima semana por falta de quórum.",
+    "Garantido 100%: este chá cura qualquer doença em três dias!",
+    "O time venceu a partida por dois a zero no último domingo.",
+    "Não perca! Última chance de receber o benefício, clique aqui.",
+    "A prefeitura informou que o trânsito será desviado durante as obras.",
+    "Absolutamente ninguém está falando sobre essa conspiração gigantesca.",
+    "Adorei o atendimento, a equipe foi muito atenciosa e rápida.",
+    "Que serviço horrível, nunca mais volto nesse lugar.",
+    "Segundo o IBGE, a inflação acumulada no ano ficou em 4,5%.",
+    "ENVIE PARA TODOS OS SEUS CONTATOS IMEDIATAMENTE!!!",
+    "Pesquisadores alertam que os dados ainda são preliminares.",
+    "Definitivamente a melhor notícia do ano, estou muito feliz!",
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q)) * 1000.0
+
+
+def _encode(tokenizer, texts: List[str]) -> List[List[int]]:
+    return [tokenizer(text, truncation=True)["input_ids"] for text in texts]
+
+
+def benchmark_backend(backend, batch_ids: List[List[int]], iterations: int, batch_size: int) -> Dict:
+    """Mede latência por requisição (lote de 1) e throughput em lote"""
+    # Aquecimento
+    backend.predict(batch_ids[:batch_size])
+    
+    latencies = []
+    for i in range(iterations):
+        ids = batch_ids[i % len(batch_ids)]
+        start = time.perf_counter()
+        backend.predict([ids])
+        latencies.append(time.perf_counter() - start)
+    
+    batches = [
+        (batch_ids * ((batch_size // len(batch_ids)) + 1))[:batch_size]
+        for _ in range(max(1, iterations // batch_size))
+    ]
+    start = time.perf_counter()
+    for batch in batches:
+        backend.predict(batch)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        "latency_p50_ms": round(_percentile(latencies, 50), 3),
+        "latency_p99_ms": round(_percentile(latencies, 99), 3),
+        "throughput_texts_per_s": round(len(batches) * batch_size / elapsed, 2),
+    }
+
+
+def accuracy_drift(reference: List[Dict[str, float]], candidate: List[Dict[str, float]]) -> Dict:
+    """Concordância de rótulos e diferença de probabilidades em relação à referência"""
+    agreements = 0
+    differences = []
+    for ref, cand in zip(reference, candidate):
+        agreements += max(ref, key=ref.get) == max(cand, key=cand.get)
+        differences.extend(abs(ref[label] - cand.get(label, 0.0)) for label in ref)
+    
+    return {
+        "label_agreement": round(agreements / len(reference), 4),
+        "max_abs_prob_diff": round(float(max(differences)), 6),
+        "mean_abs_prob_diff": round(float(np.mean(differences)), 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de sentimento")
+    parser.add_argument("--model", default=settings.NLP_MODEL_NAME)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--onnx-dir", default=settings.ONNX_MODEL_DIR)
+    parser.add_argument("--threads", type=int, default=settings.ONNX_INTRA_OP_THREADS)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    batch_ids = _encode(tokenizer, CORPUS)
+    
+    backends = {
+        "torch": TorchSentimentBackend(
+            AutoModelForSequenceClassification.from_pretrained(args.model), tokenizer
+        )
+    }
+    for quantize in (False, True):
+        try:
+            backend = OnnxSentimentBackend.load(
+                args.model, args.onnx_dir, quantize=quantize, intra_op_threads=args.threads
+            )
+            backends[backend.name] = backend
+        except Exception as e:
+            print(f"Backend ONNX (quantize={quantize}) indisponível: {e}")
+    
+    reference = backends["torch"].predict(batch_ids)
+    results = {"model": args.model, "corpus_size": len(CORPUS), "backends": {}}
+    
+    for name, backend in backends.items():
+        result = benchmark_backend(backend, batch_ids, args.iterations, args.batch_size)
+        if name != "torch":
+            result["drift_vs_torch"] = accuracy_drift(reference, backend.predict(batch_ids))
+        results["backends"][name] = result
+    
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Custo da serialização das respostas de análise, por requisição
+
+Compara, sobre resultados reais de `NLPService.analyze_text` (modelo
+substituto), o caminho anterior (AnalysisResponse do Pydantic, revalidação
+pelo `response_model` da rota, jsonable_encoder e JSONResponse) com o caminho
+atual (AnalysisPayload em dataclasses com slots e ORJSONResponse). Faz o mesmo
+para as linhas NDJSON do lote e confere que os JSONs são equivalentes.
+
+Uso (a partir de backend/):
+    python -m benchmarks.serialization --output serialization.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api.routes import analysis
+from app.core.models import BatchAnalysisResult
+from app.core.payloads import build_payload
+from benchmarks.corpus import describe_corpus, generate_corpus
+from benchmarks.report import environment, summarize_latencies, write_results
+from benchmarks.stubs import create_stub_service
+
+
+def _response_field():
+    """Campo de resposta que o FastAPI usa para revalidar /analyze"""
+    for route in analysis.router.routes:
+        if isinstance(route, APIRoute) and route.path == "/analyze":
+            return route.response_field
+    raise RuntimeError("Rota /analyze não encontrada")
+
+
+async def _measure(fn: Callable, results: List[Dict], repeat: int) -> List[float]:
+    """Latência de `fn` para cada resultado, repetindo o corpus `repeat` vezes"""
+    latencies = []
+    for _ in range(repeat):
+        for result in results:
+            start = time.perf_counter()
+            await fn(result)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(corpus: List[Dict], repeat: int) -> Dict:
+    service = await create_stub_service()
+    results = [await service.analyze_text(entry["text"]) for entry in corpus]
+    await service.cleanup()
+    
+    field = _response_field()
+    
+    async def pydantic_response(result):
+        content = await serialize_response(field=field, response_content=analysis._build_response(result))
+        return JSONResponse(content).body
+    
+    async def orjson_response(result):
+        return ORJSONResponse(build_payload(result)).body
+    
+    async def pydantic_batch_line(result):
+        return BatchAnalysisResult(id="1", result=analysis._build_response(result)).model_dump_json()
+    
+    async def orjson_batch_line(result):
+        return orjson.dumps({"id": "1", "result": build_payload(result), "error": None})
+    
+    identical = True
+    for result in results:
+        identical &= json.loads(await pydantic_response(result)) == json.loads(await orjson_response(result))
+        identical &= json.loads(await pydantic_batch_line(result)) == json.loads(await orjson_batch_line(result))
+    
+    variants = {
+        "analyze_pydantic": pydantic_response,
+        "analyze_orjson": orjson_response,
+        "batch_line_pydantic": pydantic_batch_line,
+        "batch_line_orjson": orjson_batch_line,
+    }
+    summary = {"identical_json": identical}
+    for name, fn in variants.items():
+        await _measure(fn, results[:20], 1)  # aquecimento
+        summary[name] = summarize_latencies(await _measure(fn, results, repeat))
+    
+    for path in ("analyze", "batch_line"):
+        before, after = summary[f"{path}_pydantic"]["mean_ms"], summary[f"{path}_orjson"]["mean_ms"]
+        summary[f"{path}_speedup"] = round(before / after, 2) if after else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da serialização das respostas")
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    
+    corpus = generate_corpus(args.corpus_size, seed=args.seed)
+    results = {
+        "benchmark": "serialization",
+        "environment": environment(),
+        "parameters": {"repeat": args.repeat, "seed": args.seed},
+        "corpus": describe_corpus(corpus),
+        "serialization": asyncio.run(run(corpus, args.repeat)),
+    }
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
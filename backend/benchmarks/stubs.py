@@ -0,0 +1,96 @@
+"""
+Tokenizer e modelo substitutos para benchmarks sem o modelo real
+
+Medem o custo do pipeline (janelas, fila, regras, score) isolado da
+inferência; a latência do modelo pode ser simulada por lote.
+"""
+
+import re
+import time
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class StubTokenizer:
+    """Tokenizer por palavras com a interface usada pelo NLPService"""
+    
+    model_max_length = 512
+    pad_token_id = 1
+    is_fast = True
+    
+    _token_pattern = re.compile(r"\w+|[^\w\s]")
+    
+    def __call__(self, text: str, **kwargs) -> Dict:
+        input_ids = []
+        offsets = []
+        for match in self._token_pattern.finditer(text):
+            input_ids.append(3 + zlib.crc32(match.group().encode("utf-8")) % 50000)
+            offsets.append(match.span())
+        return {"input_ids": input_ids, "offset_mapping": offsets}
+    
+    def num_special_tokens_to_add(self) -> int:
+        return 2
+    
+    def build_inputs_with_special_tokens(self, ids: List[int]) -> List[int]:
+        return [0] + list(ids) + [2]
+
+
+class StubSentimentBackend:
+    """Modelo determinístico com latência simulada (fixa + por token)"""
+    
+    LABELS = ("negative", "neutral", "positive")
+    
+    def __init__(self, batch_latency_ms: float = 0.0, token_latency_us: float = 0.0):
+        self.name = "stub"
+        self.batch_latency = batch_latency_ms / 1000.0
+        self.token_latency = token_latency_us / 1_000_000.0
+    
+    def predict(self, batch_ids: List[List[int]]) -> List[Dict[str, float]]:
+        delay = self.batch_latency + self.token_latency * sum(len(ids) for ids in batch_ids)
+        if delay > 0:
+            time.sleep(delay)
+        
+        results = []
+        for ids in batch_ids:
+            logits = np.array([sum(ids[index::3]) % 7 for index in range(3)], dtype=np.float64)
+            probabilities = np.exp(logits - logits.max())
+            probabilities /= probabilities.sum()
+            results.append({label: float(p) for label, p in zip(self.LABELS, probabilities)})
+        return results
+
+
+async def create_stub_service(
+    batch_latency_ms: float = 0.0,
+    token_latency_us: float = 0.0,
+    use_cache: bool = False
+):
+    """
+    Cria um NLPService inicializado com o tokenizer e o modelo substitutos
+    
+    A inicialização real (fila de micro-batching, aquecimento) é usada;
+    apenas o carregamento do modelo é trocado. Sem `use_cache`, os caches
+    de resultado e de tokenização e o índice de quase-duplicatas ficam
+    desligados, para que cada repetição percorra o pipeline inteiro.
+    """
+    from app.services.nlp_service import NLPService
+    
+    settings.INFERENCE_WORKERS = 0
+    settings.NEAR_DUPLICATE_SNAPSHOT_PATH = None  # não sobrescrever o snapshot real
+    service = NLPService()
+    if not use_cache:
+        service.result_cache = None
+        service.token_cache = None
+    
+    def load_stub_models():
+        service.tokenizer = StubTokenizer()
+        service.sentiment_backend = StubSentimentBackend(batch_latency_ms, token_latency_us)
+    
+    service._load_models = load_stub_models
+    await service.initialize()
+    if not use_cache:
+        service.near_duplicates = None
+    return service
@@ -5,26 +5,68 @@ Plataforma de Detecção de Desinformação com IA
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 import uvicorn
+import asyncio
 from contextlib import asynccontextmanager
 
+from app.core import metrics
 from app.core.config import settings
-from app.api.routes import analysis
+from app.api.routes import analysis, jobs, stream
 from app.core.exceptions import VeritasException
 
 
+async def _initialize_in_background(nlp_service):
+    """Carrega os modelos sem bloquear o início do servidor"""
+    try:
+        await nlp_service.initialize()
+    except Exception as e:
+        print(f"Erro ao inicializar serviço NLP: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação"""
     # Startup: Carregar modelos NLP
     from app.services.nlp_service import NLPService
     app.state.nlp_service = NLPService()
-    await app.state.nlp_service.initialize()
+    
+    # Limite de taxa e fila justa por cliente nas rotas de análise, jobs e streaming
+    from app.services.admission import create_admission_controller
+    app.state.admission = create_admission_controller()
+    
+    # Jobs assíncronos: retomados do banco local após reinícios
+    if settings.JOBS_ENABLED:
+        from app.services.jobs import JobScheduler, JobStore
+        app.state.job_scheduler = JobScheduler(
+            app.state.nlp_service,
+            JobStore(settings.JOBS_DB_PATH, lease_seconds=settings.JOBS_LEASE_SECONDS),
+            concurrency=settings.JOBS_CONCURRENCY,
+            bulk_max_concurrency=settings.JOBS_BULK_MAX_CONCURRENCY,
+            max_attempts=settings.JOBS_MAX_ATTEMPTS,
+            max_windows=settings.JOBS_MAX_WINDOWS,
+            result_ttl_seconds=settings.JOBS_RESULT_TTL_SECONDS,
+            admission=app.state.admission,
+            execute=settings.PRIMARY_WORKER,
+            poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS
+        )
+        await app.state.job_scheduler.start()
+    
+    startup_task = None
+    if settings.STARTUP_IN_BACKGROUND:
+        startup_task = asyncio.create_task(_initialize_in_background(app.state.nlp_service))
+    else:
+        await app.state.nlp_service.initialize()
     
     yield
     
     # Shutdown: Limpar recursos
+    if startup_task and not startup_task.done():
+        startup_task.cancel()
+    if getattr(app.state, 'job_scheduler', None):
+        await app.state.job_scheduler.close()
+    if getattr(app.state, 'admission', None):
+        app.state.admission.close()
     if hasattr(app.state, 'nlp_service'):
         await app.state.nlp_service.cleanup()
 
@@ -33,7 +75,8 @@ app = FastAPI(
     title="Veritas API",
     description="API para análise de confiabilidade de informações usando IA",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS - Permitir requisições do frontend
@@ -45,13 +88,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Duração das requisições por rota (Prometheus)
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 # Handler global de exceções
 @app.exception_handler(VeritasException)
 async def veritas_exception_handler(request, exc: VeritasException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.message, "details": exc.details}
+        content={"error": exc.message, "details": exc.details},
+        headers=exc.headers or None
     )
 
 
@@ -72,8 +119,40 @@ async def health_check():
     return {"status": "healthy", "service": "veritas-api"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: pronto só após carregar o modelo e aquecer"""
+    nlp_service = getattr(app.state, "nlp_service", None)
+    if nlp_service is None or not nlp_service.initialized:
+        return ORJSONResponse(
+            status_code=503,
+            content={
+                "status": "starting",
+                "error": nlp_service.startup_error if nlp_service else None,
+                "startup_ms": nlp_service.startup_timings if nlp_service else {}
+            }
+        )
+    
+    return {"status": "ready", "startup_ms": nlp_service.startup_timings}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métricas no formato de texto do Prometheus"""
+    nlp_service = getattr(app.state, "nlp_service", None)
+    if nlp_service is not None:
+        stats = nlp_service.get_stats()
+        admission = getattr(app.state, "admission", None)
+        stats["admission"] = admission.get_stats() if admission else None
+        metrics.update_service_state(stats)
+    
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
 # Registrar rotas
 app.include_router(analysis.router, prefix="/api/v1", tags=["analysis"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(stream.router, prefix="/api/v1", tags=["stream"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+"""
+Controle de admissão fora de /analyze: submissão de jobs cobrada por item,
+execução dos jobs na fila justa e repontuações do WebSocket de streaming
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import jobs as jobs_routes
+from app.core.exceptions import RateLimitedException, VeritasException
+from app.core.models import JobPriority, JobStatus
+from app.services.admission import AdmissionController, Client, FairScheduler, RateLimiter
+from app.services.jobs import JOBS_CLIENT, JobScheduler, JobStore
+from app.services.nlp_service import NLPService
+from app.services.streaming import StreamingSession
+from main import veritas_exception_handler
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+
+class FakeJobScheduler:
+    def __init__(self):
+        self.submitted = []
+    
+    async def submit(self, items, priority):
+        self.submitted.append(items)
+        return [
+            {"job_id": str(index), "client_id": client_id, "status": JobStatus.QUEUED, "priority": priority}
+            for index, (client_id, _) in enumerate(items)
+        ]
+
+
+def _jobs_app(admission):
+    app = FastAPI()
+    app.add_exception_handler(VeritasException, veritas_exception_handler)
+    app.include_router(jobs_routes.router)
+    app.state.admission = admission
+    app.state.job_scheduler = FakeJobScheduler()
+    return app
+
+
+def test_rate_limiter_charges_costs_above_burst_as_debt():
+    limiter = RateLimiter(rate=10.0, burst=100)
+    client = Client("key:teste")
+    
+    async def run():
+        await limiter.acquire(client, cost=500)
+        with pytest.raises(RateLimitedException) as error:
+            await limiter.acquire(client)
+        return error.value
+    
+    error = asyncio.run(run())
+    assert limiter.admitted == 500
+    assert int(error.headers["Retry-After"]) >= 40
+
+
+def test_job_batch_charges_each_item():
+    app = _jobs_app(AdmissionController(RateLimiter(rate=1.0, burst=5)))
+    client = TestClient(app)
+    
+    response = client.post("/jobs/batch", json={"items": [{"id": str(index), "text": TEXT} for index in range(10)]})
+    assert response.status_code == 202
+    assert len(app.state.job_scheduler.submitted[0]) == 10
+    
+    # Os 10 itens deixaram o cliente em débito: a próxima submissão é recusada
+    response = client.post("/jobs", json={"text": TEXT})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert len(app.state.job_scheduler.submitted) == 1
+
+
+def test_invalid_job_batch_is_not_charged():
+    limiter = RateLimiter(rate=1.0, burst=5)
+    app = _jobs_app(AdmissionController(limiter))
+    client = TestClient(app)
+    
+    response = client.post("/jobs/batch", json={"items": [{"id": "a", "text": TEXT}, {"id": "b", "text": "curto"}]})
+    assert response.status_code == 400
+    assert limiter.admitted == 0
+
+
+def test_jobs_run_in_a_fair_scheduler_slot(tmp_path):
+    fair = FairScheduler(max_concurrency=1)
+    running = []
+    
+    class FakeService:
+        async def analyze_text(self, text, max_windows=None):
+            running.append(fair.get_stats()["running"])
+            raise VeritasException("falha de teste", status_code=400)
+    
+    async def run():
+        scheduler = JobScheduler(
+            FakeService(), JobStore(str(tmp_path / "jobs.db")), concurrency=2,
+            admission=AdmissionController(None, fair)
+        )
+        await scheduler.start()
+        # Outro cliente ocupa a única vaga: os jobs esperam a vez na fila justa
+        async with fair.slot(Client("ip:1.2.3.4")):
+            jobs = await scheduler.submit([(None, TEXT), (None, TEXT)], JobPriority.INTERACTIVE)
+            await asyncio.sleep(0.2)
+            assert running == []
+            assert fair.get_stats()["clients_waiting"] == 1
+        while scheduler.failed_total < len(jobs):
+            await asyncio.sleep(0.01)
+        await scheduler.close()
+    
+    asyncio.run(run())
+    assert running == [1, 1]
+    assert JOBS_CLIENT.key == "jobs"
+
+
+def test_stream_rescore_is_admitted_and_retried_when_rate_limited():
+    service = NLPService()
+    calls = []
+    
+    async def score_windows(text, offset=0):
+        return []
+    
+    service.score_windows = score_windows
+    limited = [True]
+    
+    class Admit:
+        async def __aenter__(self):
+            calls.append("admit")
+            if limited[0]:
+                raise RateLimitedException(retry_after=1, limit_per_second=1.0)
+        
+        async def __aexit__(self, *exc):
+            return False
+    
+    async def run():
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        session = StreamingSession(service, send, debounce_seconds=10.0, admit=Admit)
+        await session.apply_delta(TEXT)
+        await session.flush()
+        # Acima do limite: o trecho continua pendente, com nova tentativa agendada
+        assert session.pending is not None
+        assert session._rescore_task is not None
+        
+        limited[0] = False
+        await session.flush()
+        assert session.pending is None
+        assert sent[-1]["sentiment_pending"] is False
+        await session.close()
+    
+    asyncio.run(run())
+    assert calls == ["admit", "admit"]
@@ -0,0 +1,144 @@
+"""
+Micro-batching da inferência: agrupamento de itens concorrentes, faixa de
+baixa prioridade, fila limitada e submissões tudo ou nada
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.exceptions import ServiceOverloadedException
+from app.services.batching import MicroBatcher, background_priority
+
+
+class GatedInference:
+    """Inferência que registra os lotes e só termina quando `gate` é sinalizado"""
+    
+    def __init__(self):
+        self.batches = []
+        self.gate = asyncio.Event()
+    
+    async def infer(self, items):
+        self.batches.append(list(items))
+        await self.gate.wait()
+        return [item * 10 for item in items]
+
+
+async def _occupy(batcher: MicroBatcher, inference: GatedInference) -> asyncio.Task:
+    """Ocupa a única vaga de execução com um lote que aguarda `gate`"""
+    task = asyncio.create_task(batcher.submit(0))
+    while not inference.batches:
+        await asyncio.sleep(0.001)
+    return task
+
+
+def test_concurrent_items_share_a_batch():
+    async def run():
+        inference = GatedInference()
+        inference.gate.set()
+        batcher = MicroBatcher(inference.infer, max_batch_size=4, max_wait_ms=50.0)
+        results = await asyncio.gather(*[batcher.submit(item) for item in range(6)])
+        await batcher.close()
+        return results, inference.batches, batcher.get_stats()
+    
+    results, batches, stats = asyncio.run(run())
+    assert results == [item * 10 for item in range(6)]
+    assert batches == [[0, 1, 2, 3], [4, 5]]
+    assert stats["batches_total"] == 2
+    assert stats["max_batch_size_seen"] == 4
+
+
+def test_interactive_items_go_before_background_items():
+    async def run():
+        inference = GatedInference()
+        batcher = MicroBatcher(inference.infer, max_batch_size=2, max_wait_ms=0.0)
+        blocker = await _occupy(batcher, inference)
+        
+        # Jobs chegam primeiro, mas só formam lote sem interativos aguardando
+        with background_priority():
+            background = [asyncio.create_task(batcher.submit(item)) for item in (1, 2)]
+        interactive = [asyncio.create_task(batcher.submit(item)) for item in (3, 4)]
+        while batcher.queue_depth < 4:
+            await asyncio.sleep(0.001)
+        assert batcher.get_stats()["queue_depth_background"] == 2
+        
+        inference.gate.set()
+        await asyncio.gather(blocker, *background, *interactive)
+        await batcher.close()
+        return inference.batches
+    
+    assert asyncio.run(run()) == [[0], [3, 4], [1, 2]]
+
+
+def test_bounded_queue_rejects_whole_submission():
+    async def run():
+        inference = GatedInference()
+        batcher = MicroBatcher(inference.infer, max_concurrency=1, max_queue_size=3, retry_after_seconds=2)
+        blocker = await _occupy(batcher, inference)
+        
+        # Não cabe inteiro: nenhum item entra na fila
+        with pytest.raises(ServiceOverloadedException) as error:
+            await batcher.submit_many([1, 2, 3, 4])
+        assert error.value.status_code == 429
+        assert error.value.headers["Retry-After"] == "2"
+        assert batcher.queue_depth == 0
+        
+        accepted = asyncio.create_task(batcher.submit_many([1, 2, 3]))
+        while batcher.queue_depth < 3:
+            await asyncio.sleep(0.001)
+        with pytest.raises(ServiceOverloadedException):
+            await batcher.submit(5)
+        rejected = batcher.rejected_total
+        
+        inference.gate.set()
+        results = await accepted
+        await blocker
+        await batcher.close()
+        return results, rejected
+    
+    results, rejected = asyncio.run(run())
+    assert results == [10, 20, 30]
+    assert rejected == 5
+
+
+def test_background_items_do_not_take_interactive_capacity():
+    async def run():
+        inference = GatedInference()
+        batcher = MicroBatcher(inference.infer, max_queue_size=3)
+        blocker = await _occupy(batcher, inference)
+        
+        with background_priority():
+            background = asyncio.create_task(batcher.submit_many([1, 2, 3]))
+        while batcher.queue_depth < 3:
+            await asyncio.sleep(0.001)
+        
+        # A fila cheia de jobs não recusa interativos...
+        interactive = asyncio.create_task(batcher.submit_many([4, 5, 6]))
+        while batcher.queue_depth < 6:
+            await asyncio.sleep(0.001)
+        # ...mas recusa mais jobs
+        with background_priority():
+            with pytest.raises(ServiceOverloadedException):
+                await batcher.submit(7)
+        
+        inference.gate.set()
+        results = await asyncio.gather(background, interactive, blocker)
+        await batcher.close()
+        return results
+    
+    assert asyncio.run(run()) == [[10, 20, 30], [40, 50, 60], 0]
+
+
+def test_inference_error_fails_every_item_of_the_batch():
+    async def run():
+        def infer(items):
+            raise RuntimeError("falha no modelo")
+        
+        batcher = MicroBatcher(infer, max_batch_size=4, max_wait_ms=50.0)
+        results = await asyncio.gather(*[batcher.submit(item) for item in range(3)], return_exceptions=True)
+        await batcher.close()
+        return results, batcher.errors_total
+    
+    results, errors = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert errors == 1
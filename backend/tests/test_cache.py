@@ -0,0 +1,152 @@
+"""
+Cache de resultados: chave por texto e versão, LRU com TTL em memória e
+segundo nível em SQLite compartilhado entre processos
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.models import ReliabilityLevel
+from app.core.payloads import PhraseMatch
+from app.services.cache import EncodingCache, ResultCache, SQLiteCacheBackend, make_cache_key
+from app.services.nlp_service import NLPService
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+
+def _result(score: int = 80) -> dict:
+    return {
+        "reliability_score": score,
+        "reliability_level": ReliabilityLevel.RELIABLE,
+        "explanation": "teste",
+        "suspicious_phrases": [PhraseMatch("governo", 2, 9, "teste", 0.5)],
+        "confidence": 0.9,
+        "metadata": {"text_length": len(TEXT)}
+    }
+
+
+def test_key_depends_on_text_and_version():
+    key = make_cache_key(TEXT, "v1")
+    assert make_cache_key(f"  {TEXT}\n", "v1") == key
+    assert make_cache_key(TEXT.replace(" ", "  ", 1), "v1") != key
+    # Mesma aparência, outra forma Unicode: posições diferentes no texto
+    assert make_cache_key("Ser\u00e1", "v1") != make_cache_key("Sera\u0301", "v1")
+    assert make_cache_key(TEXT, "v2") != key
+
+
+def test_result_key_separates_windows_explanations_and_scorer():
+    class Scorer:
+        version = "regras"
+    
+    service = NLPService()
+    service.scorer = Scorer()
+    
+    keys = {
+        service._result_key(TEXT, None),
+        service._result_key(TEXT, 64),
+        service._result_key(TEXT, None, explain=True),
+    }
+    Scorer.version = "linear-2"
+    keys.add(service._result_key(TEXT, None))
+    assert len(keys) == 4
+
+
+def test_memory_tier_expires_and_evicts_least_recently_used():
+    async def run():
+        cache = ResultCache(max_entries=2, ttl_seconds=60.0)
+        for key in ("a", "b"):
+            await cache.set(key, _result())
+        await cache.get("a")
+        await cache.set("c", _result())  # "b" é o menos usado
+        present = [key for key in ("a", "b", "c") if await cache.get(key) is not None]
+        
+        short = ResultCache(ttl_seconds=0.05)
+        await short.set("a", _result())
+        await asyncio.sleep(0.1)
+        return present, cache.get_stats(), await short.get("a"), short.get_stats()
+    
+    present, stats, expired, short_stats = asyncio.run(run())
+    assert present == ["a", "c"]
+    assert stats["evictions"] == 1
+    assert expired is None
+    assert short_stats["expirations"] == 1
+
+
+def test_cached_copy_is_marked_without_changing_stored_result():
+    async def run():
+        cache = ResultCache()
+        result = _result()
+        await cache.set("a", result)
+        return result, await cache.get("a")
+    
+    stored, cached = asyncio.run(run())
+    assert cached["metadata"]["cached"] is True
+    assert "cached" not in stored["metadata"]
+
+
+def test_sqlite_tier_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    
+    async def run():
+        # Dois workers com o mesmo arquivo: o segundo lê o que o primeiro gravou
+        first = ResultCache(backend=SQLiteCacheBackend(path))
+        second = ResultCache(backend=SQLiteCacheBackend(path))
+        await first.set("a", _result(42))
+        result = await second.get("a")
+        again = await second.get("a")
+        stats = second.get_stats()
+        first.close()
+        second.close()
+        return result, again, stats
+    
+    result, again, stats = asyncio.run(run())
+    assert result["reliability_score"] == 42
+    assert result["reliability_level"] is ReliabilityLevel.RELIABLE
+    assert result["suspicious_phrases"] == [PhraseMatch("governo", 2, 9, "teste", 0.5)]
+    assert result["metadata"]["cached"] is True
+    assert again is not None
+    # A segunda leitura vem do primeiro nível, já promovida
+    assert stats["backend_hits"] == 1
+    assert stats["hits"] == 1
+
+
+def test_sqlite_tier_drops_expired_entries(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    backend.set("a", "{}", ttl_seconds=0.05)
+    assert backend.get("a") == "{}"
+    time.sleep(0.1)
+    assert backend.get("a") is None
+    backend.close()
+
+
+def test_sqlite_errors_are_counted_not_raised(tmp_path):
+    async def run():
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+        cache = ResultCache(backend=backend)
+        backend.close()
+        await cache.set("a", _result())
+        cache.clear()
+        return await cache.get("a"), cache.get_stats()
+    
+    result, stats = asyncio.run(run())
+    assert result is None
+    assert stats["backend_errors"] == 2
+
+
+def test_encoding_cache_is_bounded_by_tokens():
+    cache = EncodingCache(max_tokens=10)
+    ids = lambda size: (np.arange(size, dtype=np.int32), np.zeros((size, 2), dtype=np.int32))
+    
+    cache.set(cache.key("a"), *ids(4))
+    cache.set(cache.key("b"), *ids(4))
+    cache.set(cache.key("c"), *ids(4))  # passa de 10 tokens: sai "a"
+    cache.set(cache.key("enorme"), *ids(11))  # maior que o limite: não entra
+    
+    assert cache.get(cache.key("a")) is None
+    assert cache.get(cache.key("c")) is not None
+    assert cache.get(cache.key("enorme")) is None
+    assert cache.key("a", "outro-modelo") != cache.key("a")
+    assert cache.get_stats()["tokens"] == 8
@@ -0,0 +1,119 @@
+"""
+Treino e avaliação do pontuador linear: AUC com empates, erro de
+calibração, artefato lido pelo LinearScorer e versão pelos parâmetros
+"""
+
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+from app.services.calibration import (
+    LOG1P_FEATURES,
+    _expected_calibration_error,
+    _roc_auc,
+    _standardize,
+    save_artifact,
+    train_linear_scorer
+)
+from app.services.scorer import FEATURE_NAMES, LinearScorer, ScorerProvider
+
+
+def _dataset(count: int, seed: int):
+    """Características plausíveis; textos confiáveis têm menos padrões e exclamações"""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, 2, size=count)
+    features = np.column_stack([
+        rng.poisson(np.where(labels == 1, 0.5, 3.0)),  # suspicious_count
+        rng.integers(10, 300, size=count),  # word_count
+        rng.integers(1, 20, size=count),  # sentence_count
+        rng.uniform(5, 30, size=count),  # avg_words_per_sentence
+        rng.uniform(0, np.where(labels == 1, 0.1, 0.4)),  # uppercase_ratio
+        rng.poisson(np.where(labels == 1, 0.2, 2.0)),  # exclamation_count
+        rng.poisson(1.0, size=count),  # question_count
+        rng.integers(0, 2, size=count),  # strong_sentiment
+    ]).astype(np.float64)
+    return features, labels
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_roc_auc_matches_sklearn_with_ties(seed):
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, 2, size=200)
+    # Poucos valores distintos: muitos empates, inclusive entre rótulos diferentes
+    values = rng.integers(0, 6, size=200).astype(np.float64) + labels * rng.integers(0, 2, size=200)
+    assert _roc_auc(labels, values) == pytest.approx(roc_auc_score(labels, values))
+
+
+def test_roc_auc_without_both_labels_is_nan():
+    assert np.isnan(_roc_auc(np.ones(5, dtype=np.int64), np.arange(5.0)))
+
+
+def test_expected_calibration_error_on_known_distributions():
+    labels = np.array([1] * 8 + [0] * 2)
+    # Previsto 0,8 e observado 80%: calibrado
+    assert _expected_calibration_error(labels, np.full(10, 0.8)) == pytest.approx(0.0)
+    # Previsto 0,9 para metade positiva: erro de 0,4
+    half = np.array([1, 0] * 5)
+    assert _expected_calibration_error(half, np.full(10, 0.9)) == pytest.approx(0.4)
+    # Duas faixas com pesos diferentes; probabilidade 1,0 cai na última faixa
+    labels = np.array([0, 0, 0, 1, 1, 1, 1, 1, 1, 1])
+    probability = np.array([0.05] * 3 + [1.0] * 7)
+    assert _expected_calibration_error(labels, probability) == pytest.approx(0.3 * 0.05)
+
+
+@pytest.mark.parametrize("calibration", ["none", "platt", "isotonic"])
+def test_artifact_round_trip_through_linear_scorer(tmp_path, calibration):
+    features, labels = _dataset(400, seed=1)
+    artifact = train_linear_scorer(features[:300], labels[:300], features[300:], labels[300:], calibration)
+    path = str(tmp_path / "scorer.json")
+    save_artifact(path, artifact)
+    
+    scorer = LinearScorer.from_file(path)
+    assert scorer.version == artifact["version"]
+    assert scorer.calibration == calibration
+    scores, confidence = scorer.score(features)
+    expected_scores, expected_confidence = LinearScorer(artifact).score(features)
+    np.testing.assert_array_equal(scores, expected_scores)
+    np.testing.assert_array_equal(confidence, expected_confidence)
+    assert ((scores >= 0) & (scores <= 100)).all()
+    
+    # Sem calibração, a probabilidade é a da regressão logística ajustada
+    if calibration == "none":
+        log1p = np.array([name in LOG1P_FEATURES for name in FEATURE_NAMES])
+        x, _, _ = _standardize(features[:300], log1p)
+        model = LogisticRegression(max_iter=1000).fit(x, labels[:300])
+        x_all = (np.where(log1p, np.log1p(features), features) - artifact["mean"]) / artifact["scale"]
+        np.testing.assert_allclose(scorer.probabilities(features), model.predict_proba(x_all)[:, 1], atol=1e-9)
+
+
+def test_version_changes_with_parameters(tmp_path):
+    features, labels = _dataset(400, seed=2)
+    train = (features[:300], labels[:300], features[300:], labels[300:])
+    first = train_linear_scorer(*train)
+    same = train_linear_scorer(*train)
+    other = train_linear_scorer(*train, regularization=0.01)
+    
+    digest = lambda artifact: artifact["version"].rsplit("-", 1)[1]
+    assert digest(first) == digest(same)
+    assert digest(first) != digest(other)
+    
+    # O serviço passa a usar a nova versão (e a chave de cache muda) ao trocar o arquivo
+    path = str(tmp_path / "scorer.json")
+    save_artifact(path, first)
+    provider = ScorerProvider(path, reload_interval=0.0)
+    assert provider.version == first["version"]
+    mtime_ns = os.stat(path).st_mtime_ns
+    save_artifact(path, other)
+    # Sistemas de arquivos com mtime grosseiro: garantir que a troca seja vista
+    os.utime(path, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))
+    provider._reload_if_changed()
+    assert provider.version == other["version"] != first["version"]
+
+
+def test_training_requires_both_labels():
+    features, _ = _dataset(50, seed=3)
+    with pytest.raises(ValueError):
+        train_linear_scorer(features, np.ones(50, dtype=np.int64), features, np.ones(50, dtype=np.int64))
@@ -0,0 +1,80 @@
+"""
+Reprocessamento offline: sobrecarga da fila de inferência não vira
+resultado final nem entra no checkpoint como registro concluído
+"""
+
+import asyncio
+
+import orjson
+import pytest
+
+from app import cli
+from app.core.config import settings
+from app.core.exceptions import ServiceOverloadedException
+from app.core.models import ReliabilityLevel
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+RESULT = {
+    "reliability_score": 80,
+    "reliability_level": ReliabilityLevel.RELIABLE,
+    "explanation": "teste",
+    "suspicious_phrases": [],
+    "confidence": 0.9,
+    "metadata": {}
+}
+
+
+class OverloadedOnceService:
+    """Rejeita a primeira análise como a fila cheia faria"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def initialize(self):
+        pass
+    
+    def linguistic_features_batch(self, texts):
+        return [{} for _ in texts]
+    
+    async def analyze_text(self, text, max_windows=None, linguistic_features=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise ServiceOverloadedException(retry_after=0)
+        return RESULT
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Estado global de um processo de `score` (restaurado ao final)"""
+    for name in ("_service", "_loop", "_options"):
+        monkeypatch.setattr(cli, name, getattr(cli, name))
+    for name in ("INFERENCE_WORKERS", "OVERLOAD_CONTROL_ENABLED", "NEAR_DUPLICATE_ENABLED", "INFERENCE_QUEUE_MAX_SIZE"):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    yield
+    cli._loop.close()
+    asyncio.set_event_loop(None)
+
+
+def test_worker_queue_is_unbounded(monkeypatch, worker):
+    class Service:
+        async def initialize(self):
+            pass
+    
+    monkeypatch.setattr(cli, "_create_service", Service)
+    settings.INFERENCE_QUEUE_MAX_SIZE = 512
+    cli._init_worker(0, None, 1000)
+    assert settings.INFERENCE_QUEUE_MAX_SIZE == 0
+
+
+def test_overloaded_rows_are_retried_not_written(monkeypatch, worker):
+    monkeypatch.setattr(cli, "_create_service", OverloadedOnceService)
+    cli._init_worker(0, None, 1000)
+    
+    lines, errors = cli._score_chunk([("1", TEXT)])
+    assert errors == 0
+    line = orjson.loads(lines)
+    assert line["error"] is None
+    assert line["result"]["reliability_score"] == 80
+    assert cli._service.calls == 2
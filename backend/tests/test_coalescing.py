@@ -0,0 +1,143 @@
+"""
+Single-flight: análises idênticas simultâneas aguardam uma única execução,
+que sobrevive ao cancelamento de quem a iniciou
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.coalescing import SingleFlight
+from app.services.nlp_service import NLPService
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+
+class Execution:
+    """Coroutine contável que só termina quando `release` é sinalizado"""
+    
+    def __init__(self, result="resultado", error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+    
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight, execution = SingleFlight(), Execution()
+        calls = [asyncio.create_task(flight.run("a", execution)) for _ in range(3)]
+        other = asyncio.create_task(flight.run("b", execution))
+        await _settle()
+        assert flight.in_flight == 2
+        execution.release.set()
+        results = await asyncio.gather(*calls, other)
+        
+        # Terminada a execução, a chave volta a executar
+        again = await flight.run("a", execution)
+        return results, again, execution.calls, flight.get_stats()
+    
+    results, again, calls, stats = asyncio.run(run())
+    assert results == [("resultado", True), ("resultado", False), ("resultado", False), ("resultado", True)]
+    assert again == ("resultado", True)
+    assert calls == 3
+    assert stats["coalesced"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_error_reaches_every_waiter():
+    async def run():
+        flight, execution = SingleFlight(), Execution(error=ValueError("falha"))
+        calls = [asyncio.create_task(flight.run("a", execution)) for _ in range(3)]
+        await _settle()
+        execution.release.set()
+        return await asyncio.gather(*calls, return_exceptions=True), execution.calls
+    
+    results, calls = asyncio.run(run())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        flight, execution = SingleFlight(), Execution()
+        leader = asyncio.create_task(flight.run("a", execution))
+        await _settle()
+        follower = asyncio.create_task(flight.run("a", execution))
+        await _settle()
+        
+        leader.cancel()
+        await _settle()
+        execution.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, execution.calls, flight.cancelled
+    
+    result, calls, cancelled = asyncio.run(run())
+    assert result == ("resultado", False)
+    assert calls == 1
+    assert cancelled == 0
+
+
+def test_execution_is_cancelled_when_nobody_waits():
+    async def run():
+        flight, execution = SingleFlight(), Execution()
+        calls = [asyncio.create_task(flight.run("a", execution)) for _ in range(2)]
+        await _settle()
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        assert flight.in_flight == 0
+        
+        # A próxima chamada começa uma execução nova
+        execution.release.set()
+        return await flight.run("a", execution), execution.calls, flight.cancelled
+    
+    result, calls, cancelled = asyncio.run(run())
+    assert result == ("resultado", True)
+    assert calls == 2
+    assert cancelled == 1
+
+
+def test_service_marks_coalesced_results():
+    service = NLPService()
+    service.coalescer = SingleFlight()
+    service.result_cache = None
+    execution = Execution(result={"reliability_score": 80, "metadata": {"text_length": len(TEXT)}})
+    
+    async def analyze_text(text, max_windows, start, timings, key, linguistic_features=None):
+        return await execution()
+    
+    service._analyze_text = analyze_text
+    
+    async def run():
+        calls = [
+            asyncio.create_task(service._analyze_shared(TEXT, None, time.perf_counter(), None))
+            for _ in range(3)
+        ]
+        await _settle()
+        execution.release.set()
+        return await asyncio.gather(*calls)
+    
+    leader, *followers = asyncio.run(run())
+    assert execution.calls == 1
+    assert "coalesced" not in leader["metadata"]
+    for result in followers:
+        assert result["metadata"]["coalesced"] is True
+        assert result["reliability_score"] == 80
+    # Cada resposta tem os próprios metadados: o resultado compartilhado não muda
+    assert "coalesced" not in execution.result["metadata"]
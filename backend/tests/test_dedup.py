@@ -0,0 +1,95 @@
+"""
+Quase-duplicatas (MinHash + LSH): estimativa de Jaccard, busca por bandas,
+descarte LRU e snapshots
+"""
+
+import numpy as np
+import pytest
+
+from app.services.dedup import NearDuplicateIndex, normalize_text, text_id
+
+
+TEXT = (
+    "URGENTE: o governo vai confiscar a poupança de todos os brasileiros a partir "
+    "de segunda-feira, segundo fontes do ministério. Compartilhe antes que apaguem!"
+)
+
+EDITED = (
+    "🚨🚨 urgente!!! O governo vai confiscar a poupança de todos os brasileiros a partir "
+    "de segunda-feira, segundo fontes do ministério... compartilhe antes que apaguem"
+)
+
+UNRELATED = "A prefeitura inaugurou hoje a nova biblioteca municipal no centro da cidade."
+
+
+def _jaccard(first: str, second: str, size: int = 5) -> float:
+    """Similaridade exata entre os k-gramas de caracteres dos textos normalizados"""
+    shingles = [
+        {text[i:i + size] for i in range(len(text) - size + 1)}
+        for text in (normalize_text(first), normalize_text(second))
+    ]
+    return len(shingles[0] & shingles[1]) / len(shingles[0] | shingles[1])
+
+
+def test_normalization_ignores_case_punctuation_and_width():
+    assert normalize_text("  Olá,   MUNDO!!! 🚀 ") == "olá mundo"
+    assert normalize_text("ＡＢＣ ﬁm") == "abc fim"
+    assert NearDuplicateIndex().signature("!!! 🚀 ...") is None
+
+
+def test_signature_estimates_jaccard_similarity():
+    index = NearDuplicateIndex(num_perm=256, bands=64)
+    first, second = index.signature(TEXT), index.signature(UNRELATED[:60] + TEXT[60:])
+    estimate = np.count_nonzero(first == second) / index.num_perm
+    assert estimate == pytest.approx(_jaccard(TEXT, UNRELATED[:60] + TEXT[60:]), abs=0.1)
+    # Mesma semente, mesmas permutações: assinaturas comparáveis entre processos
+    assert np.array_equal(NearDuplicateIndex(num_perm=256, bands=64).signature(TEXT), first)
+
+
+def test_edited_text_matches_and_unrelated_text_does_not():
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add(text_id(TEXT), index.signature(TEXT), {"label": "NEGATIVE"})
+    
+    match = index.query(index.signature(EDITED))
+    assert match["matched_id"] == text_id(TEXT)
+    assert match["payload"] == {"label": "NEGATIVE"}
+    assert match["similarity"] >= 0.7
+    assert index.query(index.signature(UNRELATED)) is None
+    assert index.get_stats()["match_ratio"] == 0.5
+
+
+def test_lru_eviction_removes_buckets():
+    index = NearDuplicateIndex(max_entries=2)
+    texts = [TEXT, UNRELATED, "Texto completamente diferente sobre futebol e o campeonato brasileiro."]
+    for text in texts[:2]:
+        index.add(text_id(text), index.signature(text), {})
+    index.query(index.signature(TEXT))  # TEXT passa a ser o mais usado
+    index.add(text_id(texts[2]), index.signature(texts[2]), {})
+    
+    assert len(index) == 2
+    assert index.evictions == 1
+    assert index.query(index.signature(UNRELATED)) is None
+    bucketed = set().union(*(ids for buckets in index._buckets for ids in buckets.values()))
+    assert bucketed == {text_id(TEXT), text_id(texts[2])}
+
+
+def test_snapshot_round_trip_and_incompatible_parameters(tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    index = NearDuplicateIndex(version="v1")
+    for number, text in enumerate((TEXT, UNRELATED)):
+        index.add(text_id(text), index.signature(text), {"n": number})
+    index.save(path)
+    
+    loaded = NearDuplicateIndex(version="v1")
+    assert loaded.load(path) == 2
+    assert loaded.query(loaded.signature(EDITED))["payload"] == {"n": 0}
+    
+    # Só as entradas mais recentes cabem em um índice menor
+    small = NearDuplicateIndex(version="v1", max_entries=1)
+    assert small.load(path) == 1
+    assert small.query(small.signature(UNRELATED))["payload"] == {"n": 1}
+    
+    # Outra versão do pipeline ou outros parâmetros: snapshot ignorado
+    assert NearDuplicateIndex(version="v2").load(path) == 0
+    assert NearDuplicateIndex(version="v1", num_perm=64, bands=16).load(path) == 0
+    assert NearDuplicateIndex(version="v1").load(str(tmp_path / "ausente.npz")) == 0
@@ -0,0 +1,64 @@
+"""
+Características linguísticas: a extração vetorizada em lote é a mesma do
+caminho texto a texto e das regras originais (str.split, re.split, isupper)
+"""
+
+import re
+
+import pytest
+
+from app.services.features import extract_linguistic_features
+from app.services.nlp_service import NLPService
+
+
+TEXTS = [
+    "O governo anunciou hoje novas medidas para a economia.",
+    "URGENTE!!! Compartilhem antes que APAGUEM... Será verdade?!",
+    "",
+    "   ",
+    "...!!!???",
+    "sem pontuação final e com    espaços   repetidos",
+    "Fim de frase.Começo colado! E mais?Sim",
+    "Números 123 e SIGLAS como STF, PT e CPI. A B C",
+    "ÁGUA É VIDA. Ça va? Straße ÜBER alles",
+    "Emojis 😀😀 no meio 🇧🇷! Tabs\tquebras\nde\r\nlinha",
+    "Привет КАК дела? Γεια ΣΟΥ. 中文文本。",
+    "ǅungla ǈ ǋ título e ﬁ ligaduras",
+    "x" * 500 + " FIM!",
+]
+
+
+def _reference_features(text: str) -> dict:
+    """Regras originais, texto a texto, em Python puro"""
+    words = text.split()
+    word_count = len(words)
+    sentence_count = len([s for s in re.split(r"[.!?]+", text) if s.strip()])
+    uppercase_words = sum(1 for word in words if word.isupper() and len(word) > 1)
+    return {
+        "word_count": word_count,
+        "sentence_count": sentence_count,
+        "avg_words_per_sentence": word_count / sentence_count if sentence_count > 0 else 0,
+        "uppercase_ratio": uppercase_words / word_count if word_count > 0 else 0,
+        "exclamation_count": text.count("!"),
+        "question_count": text.count("?")
+    }
+
+
+def test_batch_matches_reference_rules():
+    rows = extract_linguistic_features(TEXTS).to_dicts()
+    for text, row in zip(TEXTS, rows):
+        expected = _reference_features(text)
+        assert row.keys() == expected.keys()
+        for field, value in expected.items():
+            assert row[field] == pytest.approx(value), (text, field)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_per_text_path_matches_batch(text):
+    service = NLPService.__new__(NLPService)
+    batch = service.linguistic_features_batch(TEXTS)
+    assert service._compute_linguistic_features(text) == batch[TEXTS.index(text)]
+
+
+def test_empty_batch():
+    assert NLPService.__new__(NLPService).linguistic_features_batch([]) == []
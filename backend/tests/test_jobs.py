@@ -0,0 +1,146 @@
+"""
+Jobs assíncronos: vários processos no mesmo banco (leases) e retomada
+só dos jobs cujo dono parou de renovar o prazo
+"""
+
+import asyncio
+import time
+
+from app.core.models import JobPriority, JobStatus, ReliabilityLevel
+from app.services.jobs import JobScheduler, JobStore
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+RESULT = {
+    "reliability_score": 80,
+    "reliability_level": ReliabilityLevel.RELIABLE,
+    "explanation": "teste",
+    "suspicious_phrases": [],
+    "confidence": 0.9,
+    "metadata": {}
+}
+
+
+class BlockingService:
+    """Serviço cujas análises só terminam quando `release` é sinalizado"""
+    
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+    
+    async def analyze_text(self, text, max_windows=None):
+        self.calls.append(text)
+        await self.release.wait()
+        return RESULT
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        await asyncio.sleep(0.01)
+
+
+def test_second_scheduler_does_not_requeue_running_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    
+    async def run():
+        first_service, second_service = BlockingService(), BlockingService()
+        first = JobScheduler(first_service, JobStore(path, lease_seconds=0.3))
+        await first.start()
+        jobs = await first.submit([(None, TEXT)], JobPriority.INTERACTIVE)
+        job_id = jobs[0]["job_id"]
+        await _wait_for(lambda: first_service.calls)
+        
+        # Outro worker (ou um reinício) no mesmo arquivo enquanto o job roda
+        second = JobScheduler(second_service, JobStore(path, lease_seconds=0.3))
+        await second.start()
+        # Vários prazos se passam: o primeiro processo renova a lease
+        await asyncio.sleep(1.0)
+        job = await second.get(job_id)
+        assert job["status"] == JobStatus.RUNNING.value
+        assert job["attempts"] == 1
+        assert second_service.calls == []
+        
+        first_service.release.set()
+        await _wait_for(lambda: first.completed_total == 1)
+        assert (await second.get(job_id))["status"] == JobStatus.COMPLETED.value
+        assert second_service.calls == []
+        await first.close()
+        await second.close()
+    
+    asyncio.run(run())
+
+
+def test_expired_lease_is_recovered_by_another_scheduler(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    
+    async def run():
+        # Processo que iniciou o job e morreu sem renovar o prazo
+        dead = JobStore(path, lease_seconds=0.1)
+        dead.create_many([("job-1", None, JobPriority.INTERACTIVE.value, TEXT)], time.time())
+        assert dead.start("job-1", time.time()) == TEXT
+        
+        # Ainda dentro do prazo: nada a recuperar
+        live = JobStore(path, lease_seconds=0.1)
+        assert live.recover(time.time()) == []
+        await asyncio.sleep(0.2)
+        
+        service = BlockingService()
+        service.release.set()
+        scheduler = JobScheduler(service, live)
+        await scheduler.start()
+        await _wait_for(lambda: scheduler.completed_total == 1)
+        job = await scheduler.get("job-1")
+        assert job["status"] == JobStatus.COMPLETED.value
+        assert job["attempts"] == 2
+        await scheduler.close()
+        dead.close()
+    
+    asyncio.run(run())
+
+
+def test_close_requeues_running_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    
+    async def run():
+        service = BlockingService()
+        scheduler = JobScheduler(service, JobStore(path, lease_seconds=60.0))
+        await scheduler.start()
+        jobs = await scheduler.submit([(None, TEXT)], JobPriority.INTERACTIVE)
+        await _wait_for(lambda: service.calls)
+        await scheduler.close()
+        
+        # O próximo início retoma o job sem esperar o prazo vencer
+        store = JobStore(path, lease_seconds=60.0)
+        assert store.recover(time.time()) == [(jobs[0]["job_id"], JobPriority.INTERACTIVE.value)]
+        store.close()
+    
+    asyncio.run(run())
+
+
+def test_primary_scheduler_picks_up_jobs_submitted_by_other_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    
+    async def run():
+        service = BlockingService()
+        service.release.set()
+        primary = JobScheduler(service, JobStore(path), poll_interval=0.05)
+        await primary.start()
+        
+        # Worker não primário: só grava; quem executa é o primário
+        secondary_service = BlockingService()
+        secondary = JobScheduler(secondary_service, JobStore(path), execute=False)
+        await secondary.start()
+        jobs = await secondary.submit([(None, TEXT), (None, TEXT)], JobPriority.BULK)
+        
+        await _wait_for(lambda: primary.completed_total == 2)
+        for job in jobs:
+            assert (await secondary.get(job["job_id"]))["status"] == JobStatus.COMPLETED.value
+        assert secondary_service.calls == []
+        assert primary.get_stats()["queued"] == {priority.value: 0 for priority in JobPriority}
+        await primary.close()
+        await secondary.close()
+    
+    asyncio.run(run())
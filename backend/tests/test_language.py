@@ -0,0 +1,107 @@
+"""
+Identificação de idioma: textos curtos, gírias e siglas em português ficam
+no idioma padrão; só textos claramente em outro idioma saem dele
+"""
+
+import pytest
+
+from app.core.exceptions import UnsupportedLanguageException
+from app.services.language import UNDETERMINED, LanguageIdentifier
+from app.services.nlp_service import NLPService
+
+
+PORTUGUESE_TEXTS = [
+    "kkkkkkkkkkkkkkkkkkkkkkkkkk muito bom",
+    "zap zap zap zap zap zap zap zap",
+    "Bolsonaro Lula STF PT PSDB MDB CPI PEC",
+    "texto normal de teste aqui",
+    "vc viu isso? mano q absurdo slk",
+    "rsrsrs to nem ai kkkk",
+    "pfv alguém confirma se é vdd??",
+    "STF decide hoje sobre PEC da CPI, diz PT",
+    "Lula e Bolsonaro no debate da Globo",
+    "URGENTE!!! compartilhem antes que apaguem",
+    "bom dia",
+    "ok",
+    "O governo anunciou hoje novas medidas para a economia, segundo especialistas ouvidos pela reportagem."
+]
+
+OTHER_LANGUAGES = {
+    "es": "El gobierno anunció hoy nuevas medidas para la economía, según expertos consultados por el periódico.",
+    "en": "The government announced new measures for the economy today, according to experts interviewed.",
+    "fr": "Le gouvernement a annoncé aujourd'hui de nouvelles mesures pour l'économie, selon des experts interrogés.",
+    "it": "Il governo ha annunciato oggi nuove misure per l'economia, secondo gli esperti intervistati dal giornale.",
+    "de": "Die Regierung hat heute neue Maßnahmen für die Wirtschaft angekündigt, so die befragten Experten."
+}
+
+
+@pytest.fixture(scope="module")
+def identifier():
+    return LanguageIdentifier.from_file(default_language="pt")
+
+
+def _service(identifier, supported=("pt", "es", "en")):
+    """NLPService só com o que a identificação de idioma usa"""
+    service = NLPService.__new__(NLPService)
+    service.language_identifier = identifier
+    service.pattern_engines = {language: None for language in supported}
+    return service
+
+
+@pytest.mark.parametrize("text", PORTUGUESE_TEXTS)
+def test_portuguese_short_slang_and_acronyms_stay_default(identifier, text):
+    assert identifier.identify(text).language == "pt"
+
+
+@pytest.mark.parametrize("language,text", OTHER_LANGUAGES.items())
+def test_clear_texts_leave_default(identifier, language, text):
+    assert identifier.identify(text).language == language
+
+
+OTHER_SCRIPTS = [
+    "Привет как дела это текст на русском языке",
+    "Привет как дела это текст про COVID на русском языке",
+    "Γεια σου τι κάνεις αυτό είναι ελληνικό κείμενο",
+    "这是一个中文文本我们正在测试语言识别"
+]
+
+
+@pytest.mark.parametrize("text", OTHER_SCRIPTS)
+def test_other_scripts_are_undetermined(identifier, text):
+    guess = identifier.identify(text)
+    assert guess.language == UNDETERMINED
+    assert guess.detected == UNDETERMINED
+
+
+@pytest.mark.parametrize("text", ["Привет", "Putin disse Привет ao chegar no Brasil"])
+def test_short_unknown_text_falls_back_to_default(identifier, text):
+    guess = identifier.identify(text)
+    assert guess.language == "pt"
+    assert guess.as_metadata()["code"] == "pt"
+
+
+def test_ambiguous_guess_keeps_detected_profile(identifier):
+    guess = identifier.identify("texto normal de teste aqui")
+    assert guess.language == "pt"
+    assert guess.detected == "es"
+
+
+@pytest.mark.parametrize("text", PORTUGUESE_TEXTS)
+def test_portuguese_texts_are_not_rejected(identifier, text):
+    assert _service(identifier)._identify_language(text).language == "pt"
+
+
+@pytest.mark.parametrize("language", ["fr", "it", "de"])
+def test_clear_unsupported_language_is_rejected(identifier, language):
+    with pytest.raises(UnsupportedLanguageException) as error:
+        _service(identifier)._identify_language(OTHER_LANGUAGES[language])
+    assert error.value.status_code == 422
+    assert error.value.details["language"] == language
+
+
+@pytest.mark.parametrize("text", OTHER_SCRIPTS)
+def test_other_scripts_are_rejected(identifier, text):
+    with pytest.raises(UnsupportedLanguageException) as error:
+        _service(identifier)._identify_language(text)
+    assert error.value.status_code == 422
+    assert error.value.details["language"] == UNDETERMINED
@@ -0,0 +1,115 @@
+"""
+Lote NDJSON: leitura incremental do corpo, linhas inválidas e limite de
+tamanho de linha afetando só o próprio item
+"""
+
+import asyncio
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import analysis
+from app.core.config import settings
+from app.core.exceptions import VeritasException
+from app.core.models import ReliabilityLevel
+from main import veritas_exception_handler
+
+
+TEXT = "O governo anunciou hoje novas medidas para a economia."
+
+RESULT = {
+    "reliability_score": 80,
+    "reliability_level": ReliabilityLevel.RELIABLE,
+    "explanation": "teste",
+    "suspicious_phrases": [],
+    "confidence": 0.9,
+    "metadata": {}
+}
+
+
+class ChunkedRequest:
+    """Requisição cujo corpo chega nos pedaços informados"""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeService:
+    def __init__(self):
+        self.texts = []
+    
+    def linguistic_features_batch(self, texts):
+        return [{} for _ in texts]
+    
+    async def analyze_text(self, text, linguistic_features=None):
+        self.texts.append(text)
+        return RESULT
+
+
+def _items(chunks):
+    async def run():
+        return [item async for item in analysis._iter_ndjson_items(ChunkedRequest(chunks))]
+    
+    return asyncio.run(run())
+
+
+def _line(item_id, text=TEXT) -> bytes:
+    return orjson.dumps({"id": item_id, "text": text}) + b"\n"
+
+
+def test_lines_split_across_chunks():
+    body = _line("a") + b"\n  \n" + _line("b") + orjson.dumps({"id": "c", "text": TEXT})
+    # Pedaços de 7 bytes: linhas cortadas no meio, inclusive em caracteres UTF-8
+    chunks = [body[start:start + 7] for start in range(0, len(body), 7)]
+    assert _items(chunks) == [("a", TEXT), ("b", TEXT), ("c", TEXT)]
+
+
+def test_invalid_line_becomes_error_item():
+    items = _items([_line("a") + b"{nao e json\n" + b'{"text": 1}\n' + _line("d")])
+    assert items[0] == ("a", TEXT)
+    for index in (1, 2):
+        item_id, error = items[index]
+        assert item_id == str(index)
+        assert isinstance(error, VeritasException)
+        assert error.status_code == 400
+        assert error.details["line"] == index
+    assert items[3] == ("d", TEXT)
+
+
+def test_line_above_cap_is_discarded_until_next_newline(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_TEXT_LENGTH", 10)
+    max_line = analysis._max_ndjson_line_bytes()
+    long_line = _line("longa", "x" * (2 * max_line))
+    body = _line("a") + long_line + _line("b")
+    chunks = [body[start:start + 1000] for start in range(0, len(body), 1000)]
+    
+    items = _items(chunks)
+    assert [item_id for item_id, _ in items] == ["a", "1", "b"]
+    error = items[1][1]
+    assert error.status_code == 413
+    assert error.details == {"line": 1, "max_bytes": max_line}
+
+
+def test_ndjson_batch_endpoint_streams_results_per_item():
+    app = FastAPI()
+    app.add_exception_handler(VeritasException, veritas_exception_handler)
+    app.include_router(analysis.router)
+    app.state.nlp_service = FakeService()
+    
+    body = _line("a") + b"{quebrada\n" + _line("c", "curto")
+    response = TestClient(app).post(
+        "/analyze/batch", content=body, headers={"Content-Type": analysis.NDJSON_MEDIA_TYPE}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(analysis.NDJSON_MEDIA_TYPE)
+    
+    lines = {line["id"]: line for line in map(orjson.loads, response.content.splitlines())}
+    assert lines["a"]["result"]["reliability_score"] == 80
+    assert lines["1"]["error"]["status_code"] == 400
+    assert lines["c"]["error"]["status_code"] == 400
+    assert app.state.nlp_service.texts == [TEXT]
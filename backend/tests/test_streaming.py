@@ -0,0 +1,82 @@
+"""
+Documento incremental: depois de cada alteração, frases suspeitas e
+contadores são os mesmos de uma análise completa do texto
+"""
+
+import random
+
+import pytest
+
+from app.services.features import extract_linguistic_features
+from app.services.patterns import PatternEngine
+from app.services.streaming import IncrementalDocument
+
+
+PIECES = [
+    "urgente", "URGENTE", "agora", "não perca", "COMPARTILHE", "compartilhe", "100%",
+    "sem dúvida", "conspiração", "eles não querem que você saiba", "governo", "Lula",
+    "STF", "PT", "!", "!!", "?", ".", "...", " ", "  ", "\n", "a", "de", "cidade",
+    "sem", "dúvida", "perca", "ur", "gente", "É", "Olá!", "fim.", "?!",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return PatternEngine.from_file()
+
+
+def _random_edit(rng: random.Random, text: str):
+    start = rng.randint(0, len(text))
+    end = min(len(text), start + rng.choice([0, 0, 1, 2, 5, 20]))
+    replacement = "".join(rng.choice(PIECES) for _ in range(rng.choice([0, 1, 1, 2, 3])))
+    return start, end, replacement
+
+
+def _assert_matches_full_analysis(document: IncrementalDocument, engine: PatternEngine):
+    assert document.phrases == engine.scan(document.text)
+    expected = extract_linguistic_features([document.text]).row(0)
+    features = document.linguistic_features()
+    for field, value in expected.items():
+        assert features[field] == pytest.approx(value), (field, document.text)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_full_rescan(engine, seed):
+    rng = random.Random(seed)
+    document = IncrementalDocument(engine, rescan_margin=64)
+    
+    for _ in range(300):
+        previous = list(document.phrases)
+        start, end, replacement = _random_edit(rng, document.text)
+        added, removed = document.apply(start, end, replacement)
+        
+        _assert_matches_full_analysis(document, engine)
+        assert all(phrase in document.phrases for phrase in added)
+        assert all(phrase in previous for phrase in removed)
+
+
+def test_typing_a_phrase_reports_it_once(engine):
+    document = IncrementalDocument(engine)
+    document.apply(0, 0, "Isso é ")
+    reported = []
+    for char in "conspiração total":
+        added, removed = document.apply(len(document.text), len(document.text), char)
+        reported.extend(phrase.text for phrase in added)
+        assert removed == [] or [phrase.text for phrase in removed] == reported[-1:]
+    
+    assert [phrase.text for phrase in document.phrases] == ["conspiração"]
+    assert reported.count("conspiração") == 1
+
+
+def test_phrases_after_the_edit_are_shifted(engine):
+    document = IncrementalDocument(engine)
+    document.apply(0, 0, "Texto qualquer. URGENTE: compartilhe agora")
+    before = list(document.phrases)
+    
+    added, removed = document.apply(0, 0, "Novo começo do documento bem longo, " * 5)
+    delta = len(document.text) - len("Texto qualquer. URGENTE: compartilhe agora")
+    assert added == [] and removed == []
+    assert [(phrase.start_index, phrase.text) for phrase in document.phrases] == [
+        (phrase.start_index + delta, phrase.text) for phrase in before
+    ]
+    _assert_matches_full_analysis(document, engine)
@@ -0,0 +1,93 @@
+"""
+Pool de processos de inferência: worker recriado só recebe lotes depois
+de avisar que carregou o modelo
+"""
+
+import asyncio
+import queue
+
+from app.services.workers import InferenceWorkerPool, _Worker
+
+
+class FakeProcess:
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.alive = True
+        self.exitcode = None
+    
+    def is_alive(self):
+        return self.alive
+
+
+def _worker(worker_id: int, ready: bool = True) -> _Worker:
+    worker = _Worker(worker_id, FakeProcess(1000 + worker_id), queue.Queue(), None)
+    worker.ready = ready
+    return worker
+
+
+def _pool(*workers) -> InferenceWorkerPool:
+    pool = InferenceWorkerPool("modelo", num_workers=len(workers), pin_cpus=False)
+    pool._workers = {worker.worker_id: worker for worker in workers}
+    return pool
+
+
+async def _send(pool: InferenceWorkerPool) -> int:
+    """Envia um lote e retorna o worker escolhido (o lote fica pendente)"""
+    asyncio.ensure_future(pool.predict([[1, 2, 3]]))
+    await asyncio.sleep(0)
+    request_id = max(pool._pending)
+    return pool._pending[request_id][2]
+
+
+def test_restarted_worker_is_skipped_until_ready():
+    async def run():
+        busy = _worker(0)
+        busy.in_flight = 5
+        pool = _pool(busy, _worker(1))
+        
+        # O worker 1 morre e é recriado: sem lotes, mas ainda carregando
+        pool._workers[1].process.alive = False
+        pool._spawn = lambda worker_id: _worker(worker_id, ready=False)
+        pool._check_workers()
+        assert pool.restarts == 1
+        assert pool.get_stats()["ready_workers"] == 1
+        chosen = [await _send(pool) for _ in range(3)]
+        
+        pool._mark_ready(1, "torch")
+        chosen.append(await _send(pool))
+        return chosen, pool.get_stats()
+    
+    chosen, stats = asyncio.run(run())
+    assert chosen == [0, 0, 0, 1]
+    assert stats["ready_workers"] == 2
+    assert [worker["ready"] for worker in stats["per_worker"]] == [True, True]
+
+
+def test_batches_wait_on_loading_worker_when_none_is_ready():
+    async def run():
+        pool = _pool(_worker(0, ready=False), _worker(1, ready=False))
+        pool._workers[0].in_flight = 1
+        chosen = await _send(pool)
+        return chosen, pool._workers[1].requests.qsize()
+    
+    assert asyncio.run(run()) == (1, 1)
+
+
+def test_lost_batches_of_dead_worker_fail():
+    async def run():
+        pool = _pool(_worker(0), _worker(1))
+        future = asyncio.ensure_future(pool.predict([[1]]))
+        await asyncio.sleep(0)
+        worker_id = pool._pending[max(pool._pending)][2]
+        
+        pool._workers[worker_id].process.alive = False
+        pool._spawn = lambda worker_id: _worker(worker_id, ready=False)
+        pool._check_workers()
+        try:
+            await future
+        except Exception as error:
+            return error, pool._workers[worker_id].ready
+    
+    error, ready = asyncio.run(run())
+    assert error.details["stage"] == "inference_worker"
+    assert ready is False